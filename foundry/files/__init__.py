@@ -1,10 +1,34 @@
-from .files import FileHandler
+from .files import find_all_files, iter_chunks, iter_files, iter_lines, map_file, read_file, read_many, read_range, write_file, write_many
+from .aio import afind_all_files, aiter_lines, aread_file, awrite_file, set_async_workers
+from .handler import FileHandler
+from .manifest import Manifest, hash_file
+from .watcher import Watcher
 
 # Often modified metadata
 __version__ = "1.0.0"
 __modified__ = "2025-10-16"
 
-__all__ = ["FileHandler"]
+__all__ = [
+    "FileHandler",
+    "Manifest",
+    "Watcher",
+    "afind_all_files",
+    "aiter_lines",
+    "aread_file",
+    "awrite_file",
+    "find_all_files",
+    "hash_file",
+    "iter_chunks",
+    "iter_files",
+    "iter_lines",
+    "map_file",
+    "read_file",
+    "read_many",
+    "read_range",
+    "set_async_workers",
+    "write_file",
+    "write_many",
+]
 
 # Metadata
 __author__ = "LuxForge"
@@ -19,7 +43,7 @@ __created__ = "2025-10-16"
 __module__ = "foundry.files"
 __tags__ = ["file", "io", "read", "write", "append", "export", "foundry"]
 __interface__ = "filesystem,stream"
-__features__ = ["read", "write", "append", "export", "structured archival"]
+__features__ = ["read", "write", "append", "export", "structured archival", "read cache", "streaming reads"]
 __dependencies__ = ["os", "pathlib", "datetime", "json", "csv"]
 __compatibility__ = ["Python 3.8+", "Foundry VTT 0.8+"]
 __repository__ = "https://github.com/LuxForge/LuxForge-Foundry"
\ No newline at end of file
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+
+# aio.py
+# Author: Luxforge
+# asyncio versions of the file functions - blocking work on a dedicated, bounded executor, backoff on the event loop
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import AsyncIterator
+
+from foundry.files.files import LINE_BUFFER_SIZE, PRUNE_DIRS, _backoff, _read, _write, iter_files
+from foundry.logger.logger import logger
+
+# Most blocking file operations the async functions run at once
+ASYNC_WORKERS = 8
+
+# Lines or paths handed over per trip to the executor by the async iterators
+BATCH_SIZE = 500
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _pool() -> ThreadPoolExecutor:
+    # Created on first use - its own threads, so slow file I/O never queues behind (or starves) the loop's default executor
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=ASYNC_WORKERS, thread_name_prefix="foundry-aio")
+    return _executor
+
+
+def set_async_workers(workers: int) -> None:
+    """
+    Change how many blocking file operations may run at once. Work already started finishes on the old threads.
+
+    ARGS:
+        workers (int): Threads in the executor
+    """
+    global _executor, ASYNC_WORKERS
+    with _executor_lock:
+        ASYNC_WORKERS = max(1, int(workers))
+        old, _executor = _executor, None
+    if old is not None:
+        old.shutdown(wait=False)
+
+
+async def _run(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(_pool(), func, *args)
+
+
+async def _log(level: str, message: str) -> None:
+    # Logging can block on file, database or API sinks - do it on the executor, never on the event loop
+    await _run(logger.log, message, level)
+
+
+async def _retrying(func, args: tuple, retries: int, timeout: float, retry_missing: bool):
+    # One attempt per trip to the executor - the wait between attempts is an asyncio.sleep, holding no thread
+    for attempt in range(1, retries + 1):
+        try:
+            return await _run(func, *args)
+        except FileNotFoundError:
+            if not retry_missing or attempt >= retries:
+                raise
+        except Exception:
+            if attempt >= retries:
+                raise
+        await asyncio.sleep(_backoff(attempt, timeout))
+
+
+async def aread_file(filepath: str | Path, encoding: str | None="utf-8", retries: int=5, timeout: int=2) -> str | bytes | None:
+    """
+    Read a whole file without blocking the event loop.
+
+    ARGS:
+        filepath (str or Path): Source file path
+        encoding (str or None): File encoding, or None for bytes (default: utf-8)
+        retries (int): Number of attempts (default: 5)
+        timeout (int or float): Seconds before the first retry, doubling after each (default: 2)
+
+    RETURNS:
+        str or bytes: File contents, or None if read failed
+    """
+    if retries <= 0:
+        await _log("WARNING", f"Retries set to {retries}, no attempts will be made to read the file: {filepath}")
+        return None
+
+    filepath = Path(filepath)
+    try:
+        return await _retrying(_read, (filepath, encoding, 1, 0), retries, timeout, retry_missing=False)
+    except FileNotFoundError:
+        await _log("ERROR", f"File does not exist: {filepath}")
+    except Exception as e:
+        await _log("ERROR", f"Failed to read from {filepath} after {retries} attempt(s). Error: {e}")
+    return None
+
+
+async def awrite_file(filepath: str | Path, data: str | bytes, retries: int=5, timeout: int=2, encoding: str="utf-8",
+                      atomic: bool=False, fsync: bool=False) -> bool:
+    """
+    Write a file without blocking the event loop - arguments as write_file.
+
+    ARGS:
+        filepath (str or Path): Destination file path
+        data (str or bytes): Data to write
+        retries (int): Number of attempts (default: 5)
+        timeout (int or float): Seconds before the first retry, doubling after each (default: 2)
+        encoding (str): File encoding (default: utf-8)
+        atomic (bool): Write a temp file and os.replace it into place (default: False)
+        fsync (bool): Flush the data (and the rename) to disk before returning (default: False)
+
+    RETURNS:
+        bool: True if write succeeded, False otherwise
+    """
+    if retries <= 0:
+        await _log("WARNING", f"Retries set to {retries}, no attempts will be made to write the file: {filepath}")
+        return False
+
+    filepath = Path(filepath)
+    try:
+        await _retrying(_write, (filepath, data, 1, 0, encoding, atomic, fsync), retries, timeout, retry_missing=True)
+    except Exception as e:
+        await _log("ERROR", f"Failed to write to {filepath} after {retries} attempt(s). Error: {e}")
+        return False
+    return True
+
+
+def _open_at(filepath: Path, buffer_size: int, position: int):
+    # Open for aiter_lines and seek to where the last attempt stopped
+    f = open(filepath, "rb", buffering=buffer_size)
+    try:
+        f.seek(position)
+    except Exception:
+        f.close()
+        raise
+    return f
+
+
+def _take(iterator, count: int) -> list:
+    return list(islice(iterator, count))
+
+
+async def aiter_lines(filepath: str | Path, encoding: str | None="utf-8", buffer_size: int=LINE_BUFFER_SIZE, keepends: bool=False,
+                      errors: str="strict", retries: int=5, timeout: int=2) -> AsyncIterator[str | bytes]:
+    """
+    Stream a file line by line without blocking the event loop. Lines are fetched BATCH_SIZE at a time,
+    and a failed read resumes at the byte it stopped at, as iter_lines.
+
+    ARGS:
+        filepath (str or Path): Source file path
+        encoding (str or None): Text encoding, or None for raw bytes lines (default: utf-8)
+        buffer_size (int): Read buffer size in bytes (default: 256 KiB)
+        keepends (bool): Keep the trailing newline on each line (default: False)
+        errors (str): How decoding errors are handled, as for bytes.decode (default: strict)
+        retries (int): Number of attempts (default: 5)
+        timeout (int or float): Seconds before the first retry, doubling after each (default: 2)
+
+    YIELDS:
+        str or bytes: One line at a time - nothing if the file cannot be read
+    """
+    filepath = Path(filepath)
+    position, attempts, f = 0, 0, None
+    try:
+        while True:
+            try:
+                if f is None:
+                    f = await _run(_open_at, filepath, max(1, int(buffer_size)), position)
+                lines = await _run(_take, f, BATCH_SIZE)
+            except FileNotFoundError:
+                await _log("ERROR", f"File does not exist: {filepath}")
+                return
+            except OSError as e:
+                if f is not None:
+                    f.close()
+                    f = None
+                attempts += 1
+                if attempts >= retries:
+                    await _log("ERROR", f"Failed to read from {filepath} at byte {position} after {retries} attempt(s). Error: {e}")
+                    return
+                await asyncio.sleep(_backoff(attempts, timeout))
+                continue
+
+            if not lines:
+                return
+            for raw in lines:
+                position += len(raw)
+                if not keepends:
+                    raw = raw.rstrip(b"\r\n")
+                yield raw if encoding is None else raw.decode(encoding, errors)
+    finally:
+        if f is not None:
+            f.close()
+
+
+async def afind_all_files(directory: str | Path, include: str | list="*", exclude: str | list | None=None, max_depth: int | None=None,
+                          prune=PRUNE_DIRS, follow_symlinks: bool=False) -> AsyncIterator[Path]:
+    """
+    Stream the files under a directory without blocking the event loop - iter_files, handed over BATCH_SIZE paths at a time.
+    Arguments are as iter_files. The walk runs on one thread of the async executor, so it counts against ASYNC_WORKERS
+    rather than starting a pool of its own.
+
+    YIELDS:
+        Path: Each matching file
+    """
+    walker = iter_files(directory, include, exclude, max_depth, prune, 1, follow_symlinks)
+    taking = None
+    try:
+        while True:
+            # Keep hold of the thread's future - cancelling the await does not stop _take running
+            taking = _pool().submit(_take, walker, BATCH_SIZE)
+            batch = await asyncio.wrap_future(taking)
+            taking = None
+            if not batch:
+                return
+            for path in batch:
+                yield path
+    finally:
+        # Closing the walker while _take is still inside it would fail - wait for the batch in flight first
+        if taking is not None:
+            await asyncio.wait([asyncio.wrap_future(taking)])
+        await _run(walker.close)
@@ -4,89 +4,290 @@
 # Author: Luxforge
 # File and directory utilities
 
+import fnmatch
+import mmap
 import os
+import random
+import re
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from contextlib import contextmanager
 from pathlib import Path
 from foundry.logger.logger import logger
-from typing import List
+from typing import Iterator, List
 
-def write_file(filepath, data, retries=5, timeout=2, encoding="utf-8"):
+# Default read sizes for the streaming readers
+CHUNK_SIZE = 1024 * 1024
+LINE_BUFFER_SIZE = 256 * 1024
+
+# Longest wait between two retries, in seconds
+MAX_BACKOFF = 30
+
+# Default threads for write_many and read_many
+MANY_WORKERS = 16
+
+# Directories iter_files never descends into unless told otherwise
+PRUNE_DIRS = frozenset({".git", ".hg", ".svn", "node_modules", "__pycache__", ".venv", ".tox"})
+
+
+def _backoff(attempt: int, timeout: float) -> float:
+    # Exponential backoff with jitter - doubles from timeout each attempt, capped, then a random point in its upper half
+    delay = min(float(timeout) * (2 ** (attempt - 1)), MAX_BACKOFF)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def _fsync_dir(directory: Path) -> None:
+    # Make a rename durable - not possible (or needed) on every platform
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _write_atomic(filepath: Path, data, encoding: str, fsync: bool) -> None:
+    # Write a temp file beside the target, then swap it in - readers see the old content or the new, never half of it.
+    # A symlink is followed, so the file it points at is replaced and the link itself stays a link
+    filepath = Path(os.path.realpath(filepath))
+    temp = filepath.with_name(f".{filepath.name}.{os.getpid()}.{random.getrandbits(32):08x}.tmp")
+    fd = os.open(temp, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666)
+    try:
+        with os.fdopen(fd, "wb" if isinstance(data, bytes) else "w", encoding=None if isinstance(data, bytes) else encoding) as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+
+        # Keep the permissions and, where we are allowed to, the owner of the file being replaced
+        try:
+            existing = os.stat(filepath)
+        except FileNotFoundError:
+            existing = None
+        if existing is not None:
+            if hasattr(os, "chown"):
+                created = os.stat(temp)
+                if (created.st_uid, created.st_gid) != (existing.st_uid, existing.st_gid):
+                    try:
+                        os.chown(temp, existing.st_uid, existing.st_gid)
+                    except PermissionError:
+                        pass
+            os.chmod(temp, existing.st_mode & 0o7777)
+        os.replace(temp, filepath)
+    except BaseException:
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+        raise
+
+    if fsync:
+        _fsync_dir(filepath.parent)
+
+
+def _write(filepath: Path, data, retries: int, timeout: float, encoding: str, atomic: bool, fsync: bool, parents: bool=True) -> None:
+    # Write with retries and backoff - raises the last error once the attempts are used up
+    for attempt in range(1, retries + 1):
+        try:
+            # Inside the loop - a flaky mount may fail this too
+            if parents:
+                filepath.parent.mkdir(parents=True, exist_ok=True)
+
+            if atomic:
+                _write_atomic(filepath, data, encoding, fsync)
+            else:
+                with open(filepath, "wb" if isinstance(data, bytes) else "w", encoding=None if isinstance(data, bytes) else encoding) as f:
+                    f.write(data)
+                    if fsync:
+                        f.flush()
+                        os.fsync(f.fileno())
+            return
+        except Exception:
+            if attempt >= retries:
+                raise
+            time.sleep(_backoff(attempt, timeout))
+
+
+def _read(filepath: Path, encoding: str | None, retries: int, timeout: float):
+    # Read with retries and backoff - a missing file raises straight away, other errors once the attempts are used up
+    for attempt in range(1, retries + 1):
+        try:
+            if encoding is None:
+                with open(filepath, "rb") as f:
+                    return f.read()
+            with open(filepath, "r", encoding=encoding) as f:
+                return f.read()
+        except FileNotFoundError:
+            raise
+        except Exception:
+            if attempt >= retries:
+                raise
+            time.sleep(_backoff(attempt, timeout))
+
+
+def write_file(filepath: str | Path, data: str | bytes, retries: int=5, timeout: int=2, encoding: str="utf-8",
+               atomic: bool=False, fsync: bool=False) -> bool:
     """
-    Write data to a file with retry logic and timeout between attempts.
+    Write data to a file with retry logic and exponential backoff between attempts.
+    With atomic set, the data goes to a temp file in the same directory which then replaces the target,
+    so a crash or a concurrent reader never sees a half-written file. Symlinks are followed and the mode
+    and owner are kept, but the target becomes a new file - other hard links to it keep the old content.
     
     ARGS:
         filepath (str or Path): Destination file path
-        data (str): Data to write
-        retries (int): Number of retry attempts
-        timeout (int or float): Seconds to wait between retries
+        data (str or bytes): Data to write - bytes are written as they are
+        retries (int): Number of attempts (default: 5)
+        timeout (int or float): Seconds before the first retry, doubling after each (default: 2)
         encoding (str): File encoding (default: utf-8)
+        atomic (bool): Write a temp file and os.replace it into place (default: False)
+        fsync (bool): Flush the data (and the rename) to disk before returning (default: False)
     
     RETURNS:
         bool: True if write succeeded, False otherwise
     """
     # VALIDATE INPUTS
-    if retries == 0:
-        logger.warning(f"Retries set to 0, no further attempts will be made to write the file: {filepath}")
+    if retries <= 0:
+        logger.warning(f"Retries set to {retries}, no attempts will be made to write the file: {filepath}")
         return False
 
     # Ensure filepath is a Path object
     filepath = Path(filepath)
 
-    # Ensure the parent directory exists
-    filepath.parent.mkdir(parents=True, exist_ok=True)
-
-    # Recursively attempt to write the file
-
     try:
-        with open(filepath, "w", encoding=encoding) as f:
-            f.write(data)
+        _write(filepath, data, retries, timeout, encoding, atomic, fsync)
     except Exception as e:
-        
-        # Log the error and retry
-        logger.error(f"Failed to write to {filepath}. Retries pending:{retries}. Error: {e}")
-        time.sleep(timeout)
-
-        return write_file(filepath, data, retries - 1, timeout, encoding)
-    logger.info(f"Successfully wrote to {filepath}")
+        # Only the last failure is worth a log line
+        logger.error(f"Failed to write to {filepath} after {retries} attempt(s). Error: {e}")
+        return False
     return True
 
 def read_file(filepath: str | Path, encoding: str="utf-8", retries: int=5, timeout: int=2) -> str | None:
     """
-    Read data from a file.
+    Read data from a file with retry logic and exponential backoff between attempts.
     
     ARGS:
         filepath (str or Path): Source file path
         encoding (str): File encoding (default: utf-8)
-        retries (int): Number of retry attempts (default: 5)
-        timeout (int or float): Seconds to wait between retries (default: 2)
+        retries (int): Number of attempts (default: 5)
+        timeout (int or float): Seconds before the first retry, doubling after each (default: 2)
     RETURNS:
         str: File contents, or None if read failed
 
     """
     # VALIDATE INPUTS
-    
-    if retries == 0:
-        logger.warning(f"Out of retries, no further attempts will be made to read the file: {filepath}")
+    if retries <= 0:
+        logger.warning(f"Retries set to {retries}, no attempts will be made to read the file: {filepath}")
         return None
     
     # Ensure filepath is a Path object
     filepath = Path(filepath)
-    if not filepath.exists():
+
+    try:
+        return _read(filepath, encoding, retries, timeout)
+    except FileNotFoundError:
         logger.error(f"File does not exist: {filepath}")
-        return None
+    except Exception as e:
+        logger.error(f"Failed to read from {filepath} after {retries} attempt(s). Error: {e}")
+    return None
+
+
+def write_many(files: dict, workers: int=MANY_WORKERS, retries: int=5, timeout: int=2, encoding: str="utf-8",
+               atomic: bool=False, fsync: bool=False) -> dict:
+    """
+    Write many files at once on a bounded thread pool - where each write waits on the filesystem
+    (network mounts especially) the waits overlap instead of adding up. Each parent directory is
+    created once, and the batch logs one summary line rather than a line per file.
+
+    ARGS:
+        files (dict): Destination path (str or Path) -> data (str or bytes)
+        workers (int): Most writes in flight at once (default: 16)
+        retries (int): Number of attempts per file (default: 5)
+        timeout (int or float): Seconds before the first retry, doubling after each (default: 2)
+        encoding (str): File encoding (default: utf-8)
+        atomic (bool): Write temp files and os.replace them into place, as write_file (default: False)
+        fsync (bool): Flush each file to disk before it counts as written (default: False)
+
+    RETURNS:
+        dict: Each path as given -> True, or the exception that stopped it being written
+    """
+    started = time.perf_counter()
+    paths = {key: Path(key) for key in files}
+    results = dict.fromkeys(paths)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(paths) or 1)), thread_name_prefix="foundry-write") as pool:
+        # Every distinct parent directory first, once each
+        parents = {path.parent for path in paths.values()}
+        failed_dirs = {}
+        for parent, error in zip(parents, pool.map(_make_dir, parents)):
+            if error is not None:
+                failed_dirs[parent] = error
+
+        pending = {}
+        for key, path in paths.items():
+            if path.parent in failed_dirs:
+                results[key] = failed_dirs[path.parent]
+            else:
+                pending[pool.submit(_write, path, files[key], retries, timeout, encoding, atomic, fsync, False)] = key
+        for future in as_completed(pending):
+            error = future.exception()
+            results[pending[future]] = True if error is None else error
+
+    _summarize("Wrote", results, started)
+    return results
+
 
-    # Recursively attempt to read the file    
+def read_many(paths, workers: int=MANY_WORKERS, encoding: str | None="utf-8", retries: int=5, timeout: int=2) -> dict:
+    """
+    Read many files at once on a bounded thread pool, logging one summary line for the batch.
+
+    ARGS:
+        paths (iterable): Source paths (str or Path)
+        workers (int): Most reads in flight at once (default: 16)
+        encoding (str or None): File encoding, or None for bytes (default: utf-8)
+        retries (int): Number of attempts per file (default: 5)
+        timeout (int or float): Seconds before the first retry, doubling after each (default: 2)
+
+    RETURNS:
+        dict: Each path as given -> its content, or the exception that stopped it being read
+    """
+    started = time.perf_counter()
+    # Results come back in the order the paths were given
+    results = dict.fromkeys(paths)
+    paths = list(results)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(paths) or 1)), thread_name_prefix="foundry-read") as pool:
+        pending = {pool.submit(_read, Path(key), encoding, retries, timeout): key for key in paths}
+        for future in as_completed(pending):
+            error = future.exception()
+            results[pending[future]] = future.result() if error is None else error
+
+    _summarize("Read", results, started)
+    return results
+
+
+def _make_dir(directory: Path) -> Exception | None:
+    # Create a directory for write_many - the error is handed back, not raised
     try:
-        with open(filepath, "r", encoding=encoding) as f:
-            return f.read()
+        directory.mkdir(parents=True, exist_ok=True)
     except Exception as e:
+        return e
+    return None
 
-        logger.error(f"Failed to read from {filepath}. Error: {e}")
-        time.sleep(timeout)
-        return read_file(filepath, encoding, retries - 1, timeout)
 
-    logger.info(f"Successfully read from {filepath}")
-    return True
+def _summarize(action: str, results: dict, started: float) -> None:
+    # One line for a whole batch - the first few failures are named, the rest only counted
+    failures = [(key, result) for key, result in results.items() if isinstance(result, Exception)]
+    message = f"{action} {len(results) - len(failures)}/{len(results)} files in {time.perf_counter() - started:.2f}s"
+    if not failures:
+        logger.info(message)
+        return
+    shown = "; ".join(f"{key}: {error}" for key, error in failures[:3])
+    more = f" (+{len(failures) - 3} more)" if len(failures) > 3 else ""
+    logger.error(f"{message} - {len(failures)} failed: {shown}{more}")
 
 def find_all_files(directory: str | Path, pattern: str="*") -> List[Path]:
     """
@@ -105,4 +306,281 @@ def find_all_files(directory: str | Path, pattern: str="*") -> List[Path]:
         return []
     
     logger.info(f"Searching for files in {directory} matching pattern '{pattern}'")
-    return [p.resolve() for p in directory.rglob(pattern)]
\ No newline at end of file
+    return [p.resolve() for p in directory.rglob(pattern)]
+
+
+def _glob_matcher(patterns, root: str):
+    # One compiled regex for name patterns and one for path patterns ("a/*.py") - None when nothing is given
+    if not patterns:
+        return None
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    names = [fnmatch.translate(os.path.normcase(p)) for p in patterns if "/" not in p]
+    paths = [fnmatch.translate(os.path.normcase(p.strip("/"))) for p in patterns if "/" in p]
+    by_name = re.compile("|".join(names)).match if names else None
+    by_path = re.compile("|".join(paths)).match if paths else None
+    skip = len(os.path.join(root, ""))
+
+    def matches(name: str, path: str) -> bool:
+        if by_name is not None and by_name(os.path.normcase(name)):
+            return True
+        # Path patterns see the path relative to the root, with forward slashes
+        return by_path is not None and by_path(os.path.normcase(path[skip:]).replace(os.sep, "/")) is not None
+
+    return matches
+
+
+def iter_files(directory: str | Path, include: str | list="*", exclude: str | list | None=None, max_depth: int | None=None,
+               prune=PRUNE_DIRS, workers: int=8, follow_symlinks: bool=False) -> Iterator[Path]:
+    """
+    Stream the files under a directory as they are found. Built on os.scandir, so file types come from the
+    directory listing rather than a stat per entry, and directories are listed in parallel on a thread pool.
+    Results are not resolved or sorted, and arrive in no particular order.
+
+    ARGS:
+        directory (str or Path): Root directory to search
+        include (str or list): Glob(s) a file must match - against its name, or its relative path if the glob has a "/" (default: "*")
+        exclude (str or list or None): Glob(s) for files and directories to skip, matched the same way (default: None)
+        max_depth (int or None): Levels of sub-directories to descend, 0 for the root only (default: None, no limit)
+        prune (set): Directory names never descended into (default: PRUNE_DIRS - .git, node_modules, caches and venvs)
+        workers (int): Threads listing directories, 1 to scan on the calling thread (default: 8)
+        follow_symlinks (bool): Descend into symlinked directories - beware of loops (default: False)
+
+    YIELDS:
+        Path: Each matching file
+    """
+    root = Path(directory)
+    if not root.is_dir():
+        logger.error(f"Directory does not exist or is not a directory: {directory}")
+        return
+
+    root_path = os.path.abspath(root)
+    includes = _glob_matcher(include, root_path)
+    excludes = _glob_matcher(exclude, root_path)
+    prune = frozenset(prune or ())
+
+    def scan(path: str, depth: int) -> tuple:
+        # List one directory - returns (matching files, directories to descend into)
+        files, dirs = [], []
+        descend = max_depth is None or depth < max_depth
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=follow_symlinks):
+                            if descend and entry.name not in prune and not (excludes and excludes(entry.name, entry.path)):
+                                dirs.append(entry.path)
+                        elif entry.is_file():
+                            if (includes is None or includes(entry.name, entry.path)) and not (excludes and excludes(entry.name, entry.path)):
+                                files.append(Path(entry.path))
+                    except OSError:
+                        # Vanished or unreadable between listing and checking
+                        continue
+        except OSError as e:
+            logger.warning(f"Could not scan {path}: {e}")
+        return files, dirs
+
+    # Small jobs (or callers that want no threads) scan depth-first on this thread
+    if workers <= 1:
+        stack = [(root_path, 0)]
+        while stack:
+            path, depth = stack.pop()
+            files, dirs = scan(path, depth)
+            yield from files
+            stack.extend((child, depth + 1) for child in dirs)
+        return
+
+    # Keep a few listings per thread in flight - the rest wait in a stack, so memory follows depth rather than breadth
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="foundry-scan")
+    waiting, running = [(root_path, 0)], {}
+    try:
+        while waiting or running:
+            while waiting and len(running) < workers * 2:
+                path, depth = waiting.pop()
+                running[pool.submit(scan, path, depth)] = depth
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                depth = running.pop(future)
+                files, dirs = future.result()
+                waiting.extend((child, depth + 1) for child in dirs)
+                yield from files
+    finally:
+        # The caller may stop early - drop listings that have not started
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_chunks(filepath: str | Path, chunk_size: int=CHUNK_SIZE, start: int=0, end: int | None=None,
+                retries: int=5, timeout: int=2) -> Iterator[bytes]:
+    """
+    Stream a file as bytes, one chunk at a time - memory use stays at one chunk whatever the file size.
+    A failed read is retried from the byte it stopped at, so nothing is repeated or skipped.
+
+    ARGS:
+        filepath (str or Path): Source file path
+        chunk_size (int): Bytes per chunk (default: 1 MiB)
+        start (int): Byte offset to start at (default: 0)
+        end (int or None): Byte offset to stop before (default: None, end of file)
+        retries (int): Number of attempts (default: 5)
+        timeout (int or float): Seconds before the first retry, doubling after each (default: 2)
+
+    YIELDS:
+        bytes: Chunks of at most chunk_size bytes - nothing if the file cannot be read
+    """
+    filepath = Path(filepath)
+    chunk_size = max(1, int(chunk_size))
+    position, attempts = max(0, int(start)), 0
+
+    while attempts < retries:
+        try:
+            # Unbuffered - each read goes straight into the chunk handed out, no second copy
+            with open(filepath, "rb", buffering=0) as f:
+                f.seek(position)
+                while end is None or position < end:
+                    chunk = f.read(chunk_size if end is None else min(chunk_size, end - position))
+                    if not chunk:
+                        return
+                    position += len(chunk)
+                    yield chunk
+                return
+        except FileNotFoundError:
+            logger.error(f"File does not exist: {filepath}")
+            return
+        except OSError as e:
+            attempts += 1
+            if attempts == retries:
+                logger.error(f"Failed to read from {filepath} at byte {position} after {retries} attempt(s). Error: {e}")
+                return
+            time.sleep(_backoff(attempts, timeout))
+
+
+def iter_lines(filepath: str | Path, encoding: str | None="utf-8", buffer_size: int=LINE_BUFFER_SIZE, keepends: bool=False,
+               errors: str="strict", retries: int=5, timeout: int=2) -> Iterator[str | bytes]:
+    """
+    Stream a file line by line. Lines are split on b"\n" before decoding, which is what lets a failed read
+    resume at the exact byte it stopped at - use an ASCII-compatible encoding (utf-8, latin-1, cp1252...).
+
+    ARGS:
+        filepath (str or Path): Source file path
+        encoding (str or None): Text encoding, or None for raw bytes lines (default: utf-8)
+        buffer_size (int): Read buffer size in bytes (default: 256 KiB)
+        keepends (bool): Keep the trailing newline on each line (default: False)
+        errors (str): How decoding errors are handled, as for bytes.decode (default: strict)
+        retries (int): Number of attempts (default: 5)
+        timeout (int or float): Seconds before the first retry, doubling after each (default: 2)
+
+    YIELDS:
+        str or bytes: One line at a time - nothing if the file cannot be read
+    """
+    filepath = Path(filepath)
+    position, attempts = 0, 0
+
+    while attempts < retries:
+        try:
+            with open(filepath, "rb", buffering=max(1, int(buffer_size))) as f:
+                f.seek(position)
+                for raw in f:
+                    position += len(raw)
+                    if not keepends:
+                        raw = raw.rstrip(b"\r\n")
+                    yield raw if encoding is None else raw.decode(encoding, errors)
+                return
+        except FileNotFoundError:
+            logger.error(f"File does not exist: {filepath}")
+            return
+        except OSError as e:
+            attempts += 1
+            if attempts == retries:
+                logger.error(f"Failed to read from {filepath} at byte {position} after {retries} attempt(s). Error: {e}")
+                return
+            time.sleep(_backoff(attempts, timeout))
+
+
+def read_range(filepath: str | Path, offset: int, length: int, retries: int=5, timeout: int=2) -> bytes | None:
+    """
+    Read a byte range without touching the rest of the file.
+
+    ARGS:
+        filepath (str or Path): Source file path
+        offset (int): First byte to read
+        length (int): Number of bytes to read
+        retries (int): Number of attempts (default: 5)
+        timeout (int or float): Seconds before the first retry, doubling after each (default: 2)
+
+    RETURNS:
+        bytes: Up to length bytes - fewer if the range runs past the end of the file. None if the read failed
+    """
+    filepath = Path(filepath)
+    offset, length = max(0, int(offset)), max(0, int(length))
+
+    for attempt in range(1, retries + 1):
+        try:
+            with open(filepath, "rb", buffering=0) as f:
+                # pread where the platform has it - no seek, and no buffer filled past the range
+                if not hasattr(os, "pread"):
+                    f.seek(offset)
+                    return f.read(length)
+                parts, position, remaining = [], offset, length
+                while remaining:
+                    part = os.pread(f.fileno(), remaining, position)
+                    if not part:
+                        break
+                    parts.append(part)
+                    position += len(part)
+                    remaining -= len(part)
+                return b"".join(parts)
+        except FileNotFoundError:
+            logger.error(f"File does not exist: {filepath}")
+            return None
+        except OSError as e:
+            if attempt == retries:
+                logger.error(f"Failed to read from {filepath} after {retries} attempt(s). Error: {e}")
+                return None
+            time.sleep(_backoff(attempt, timeout))
+    return None
+
+
+@contextmanager
+def map_file(filepath: str | Path, retries: int=5, timeout: int=2):
+    """
+    Read-only memory map of a file, for random access and search without reading it in.
+    The OS pages in only what is touched - slice it like bytes, or search with .find()/.rfind().
+
+    ARGS:
+        filepath (str or Path): Source file path
+        retries (int): Number of attempts (default: 5)
+        timeout (int or float): Seconds before the first retry, doubling after each (default: 2)
+
+    YIELDS:
+        mmap.mmap or bytes: The mapping - b"" for an empty file, which cannot be mapped. None if the file could not be opened
+
+    EXAMPLE:
+        with map_file("big.log") as view:
+            if view is not None:
+                at = view.find(b"Traceback")
+    """
+    filepath = Path(filepath)
+    view = None
+
+    for attempt in range(1, retries + 1):
+        try:
+            with open(filepath, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    view = b""
+                else:
+                    # The mapping keeps its own reference to the file, so the handle can close straight away
+                    view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            break
+        except FileNotFoundError:
+            logger.error(f"File does not exist: {filepath}")
+            break
+        except (OSError, ValueError) as e:
+            if attempt == retries:
+                logger.error(f"Failed to map {filepath} after {retries} attempt(s). Error: {e}")
+                break
+            time.sleep(_backoff(attempt, timeout))
+
+    try:
+        yield view
+    finally:
+        if isinstance(view, mmap.mmap):
+            view.close()
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+
+# handler.py
+# Author: Luxforge
+# FileHandler - read, write, append, export and archive files, with a validated read cache and pooled append handles
+
+import csv
+import io
+import json
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+
+from foundry.files.files import _backoff, write_file
+from foundry.logger.logger import logger
+
+
+def _close_handles(handles: OrderedDict, lock: threading.Lock) -> None:
+    # Flush and close pooled handles - also run at exit for handlers never closed
+    with lock:
+        for handle in handles.values():
+            try:
+                handle.close()
+            except (OSError, ValueError):
+                pass
+        handles.clear()
+
+
+class FileHandler:
+    """
+    File I/O for Foundry tools. Reads go through an LRU cache of file contents keyed by path - each hit costs one
+    os.stat, and the entry is only used while the file's (mtime_ns, size) still match what was read, so edits made
+    by anyone are picked up. Appends share a pool of open handles that are flushed every flush_interval seconds,
+    rather than opening, writing and closing the file for every line.
+    ARGS:
+        base_dir: Directory relative paths are resolved against (default: current directory)
+        cache_max_bytes: Most content the cache may hold, in bytes - 0 disables it (default: 64 MiB)
+        cache_max_entries: Most files the cache may hold (default: 1024)
+        max_handles: Append handles kept open at once, least recently used closed first (default: 32)
+        flush_interval: Seconds between flushes of the append handles (default: 1)
+        archive_dir: Where archive() files records, relative to base_dir (default: "archive")
+        encoding: Text encoding (default: utf-8)
+        retries: Attempts per read or write (default: 5)
+        timeout: Seconds before the first retry, doubling after each (default: 2)
+    METHODS:
+        read(path, binary, cache): File content, from the cache while the file is unchanged
+        write(path, data, atomic, fsync): Replace a file's content
+        append(path, data): Add to the end of a file through a pooled handle
+        export(path, data, fmt): Write data as json, jsonl, csv or text, picked by fmt or the file extension
+        archive(name, data, category, when): File a record under archive_dir/category/YYYY/YYYY-MM/YYYY-MM-DD
+        invalidate(path): Drop one file, or everything, from the cache
+        flush(): Flush every append handle now
+        close(): Flush and close the append handles
+        cache_info(): Cache hits, misses, entries and bytes
+    """
+
+    def __init__(self, base_dir: str | Path = None, cache_max_bytes: int = 64 * 1024 * 1024, cache_max_entries: int = 1024,
+                 max_handles: int = 32, flush_interval: float = 1.0, archive_dir: str | Path = "archive",
+                 encoding: str = "utf-8", retries: int = 5, timeout: float = 2):
+
+        self.base_dir = Path(base_dir) if base_dir is not None else Path.cwd()
+        self.archive_dir = self.base_dir / archive_dir
+        self.cache_max_bytes = max(0, int(cache_max_bytes))
+        self.cache_max_entries = max(1, int(cache_max_entries))
+        self.max_handles = max(1, int(max_handles))
+        self.flush_interval = max(0.05, float(flush_interval))
+        self.encoding = encoding
+        self.retries = retries
+        self.timeout = timeout
+
+        # Cache - (path, binary) -> ((mtime_ns, size), content), least recently used first
+        self.__cache = OrderedDict()
+        self.__cache_bytes = 0
+        self.__cache_lock = threading.Lock()
+        self.__hits = 0
+        self.__misses = 0
+
+        # Append handles - path -> open file, least recently used first, and the paths written since the last flush
+        self.__handles = OrderedDict()
+        self.__dirty = set()
+        self.__handle_lock = threading.Lock()
+        self.__flusher = None
+        self.__stop = threading.Event()
+
+        # Handles are flushed and closed at exit even if close() is never called
+        self.__finalizer = weakref.finalize(self, _close_handles, self.__handles, self.__handle_lock)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __path(self, path: str | Path) -> str:
+        # Absolute path string - the cache and pool key
+        return os.path.abspath(self.base_dir / path)
+
+    # Reads
+
+    def read(self, path: str | Path, binary: bool = False, cache: bool = True) -> str | bytes | None:
+        """
+        Read a whole file, answering from the cache while the file is unchanged.
+        ARGS:
+            path: File to read, relative to base_dir
+            binary: Return bytes instead of text (default: False)
+            cache: Use and fill the cache (default: True)
+        RETURNS:
+            str | bytes: File content, or None if it could not be read
+        """
+        path = self.__path(path)
+
+        # Pending appends must reach the file before its content is judged
+        if path in self.__dirty:
+            self.__flush_one(path)
+
+        key = (path, binary)
+        if cache and self.cache_max_bytes:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                self.invalidate(path)
+                logger.error(f"File does not exist: {path}")
+                return None
+            except OSError:
+                stat = None
+
+            if stat is not None:
+                with self.__cache_lock:
+                    entry = self.__cache.get(key)
+                    if entry is not None and entry[0] == (stat.st_mtime_ns, stat.st_size):
+                        self.__cache.move_to_end(key)
+                        self.__hits += 1
+                        return entry[1]
+                    self.__misses += 1
+
+        result = self.__load(path, binary)
+        if result is None:
+            return None
+        version, content = result
+        if cache:
+            self.__store(key, version, content)
+        return content
+
+    def __load(self, path: str, binary: bool):
+        # Read a file with retries - returns ((mtime_ns, size), content) taken from the handle the content came from
+        for attempt in range(1, self.retries + 1):
+            try:
+                with open(path, "rb") as f:
+                    stat = os.fstat(f.fileno())
+                    data = f.read()
+                if not binary:
+                    # Same newline handling as reading in text mode
+                    data = data.decode(self.encoding).replace("\r\n", "\n").replace("\r", "\n")
+                return (stat.st_mtime_ns, stat.st_size), data
+            except FileNotFoundError:
+                logger.error(f"File does not exist: {path}")
+                return None
+            except Exception as e:
+                if attempt >= self.retries:
+                    logger.error(f"Failed to read from {path} after {self.retries} attempt(s). Error: {e}")
+                    return None
+                time.sleep(_backoff(attempt, self.timeout))
+        return None
+
+    def __store(self, key, version, content) -> None:
+        # Size is counted as the file's size on disk - close enough, and known without measuring the content
+        size = version[1]
+        if not self.cache_max_bytes or size > self.cache_max_bytes:
+            return
+        with self.__cache_lock:
+            old = self.__cache.pop(key, None)
+            if old is not None:
+                self.__cache_bytes -= old[0][1]
+            self.__cache[key] = (version, content)
+            self.__cache_bytes += size
+
+            # Evict the least recently used until both limits hold
+            while self.__cache_bytes > self.cache_max_bytes or len(self.__cache) > self.cache_max_entries:
+                _, (evicted, _) = self.__cache.popitem(last=False)
+                self.__cache_bytes -= evicted[1]
+
+    def invalidate(self, path: str | Path = None) -> None:
+        # One file (both text and binary entries), or the whole cache
+        with self.__cache_lock:
+            if path is None:
+                self.__cache.clear()
+                self.__cache_bytes = 0
+                return
+            path = self.__path(path)
+            for key in ((path, False), (path, True)):
+                entry = self.__cache.pop(key, None)
+                if entry is not None:
+                    self.__cache_bytes -= entry[0][1]
+
+    def cache_info(self) -> dict:
+        """
+        Cache counters.
+        RETURNS:
+            dict: hits, misses, entries, bytes and max_bytes
+        """
+        with self.__cache_lock:
+            return {"hits": self.__hits, "misses": self.__misses, "entries": len(self.__cache),
+                    "bytes": self.__cache_bytes, "max_bytes": self.cache_max_bytes}
+
+    # Writes
+
+    def write(self, path: str | Path, data: str | bytes, atomic: bool = False, fsync: bool = False) -> bool:
+        """
+        Replace a file's content - atomically if asked, see write_file.
+        ARGS:
+            path: File to write, relative to base_dir
+            data: Text or bytes
+            atomic: Write a temp file and swap it into place (default: False)
+            fsync: Flush to disk before returning (default: False)
+        RETURNS:
+            bool: True if the write succeeded
+        """
+        path = self.__path(path)
+
+        # An open append handle would keep writing to the replaced file
+        self.__close_one(path)
+        self.invalidate(path)
+        return write_file(path, data, self.retries, self.timeout, self.encoding, atomic=atomic, fsync=fsync)
+
+    def append(self, path: str | Path, data: str) -> bool:
+        """
+        Add text to the end of a file. The handle stays open for the next append and is flushed
+        within flush_interval, on read() of the same file, or on flush()/close().
+        ARGS:
+            path: File to append to, relative to base_dir - created with its directory if missing
+            data: Text to add
+        RETURNS:
+            bool: True if the text was written
+        """
+        path = self.__path(path)
+        for attempt in range(1, self.retries + 1):
+            try:
+                with self.__handle_lock:
+                    handle = self.__handles.get(path)
+                    if handle is None:
+                        handle = self.__open(path)
+                    else:
+                        self.__handles.move_to_end(path)
+                    handle.write(data)
+                    self.__dirty.add(path)
+                self.__start_flusher()
+                return True
+            except Exception as e:
+                # A failed handle is not reused
+                self.__close_one(path)
+                if attempt >= self.retries:
+                    logger.error(f"Failed to append to {path} after {self.retries} attempt(s). Error: {e}")
+                    return False
+                time.sleep(_backoff(attempt, self.timeout))
+        return False
+
+    def __open(self, path: str):
+        # Open an append handle, closing the least recently used one if the pool is full - called holding the lock
+        while len(self.__handles) >= self.max_handles:
+            old_path, old = self.__handles.popitem(last=False)
+            self.__dirty.discard(old_path)
+            try:
+                old.close()
+            except (OSError, ValueError) as e:
+                logger.error(f"Failed to close {old_path}. Error: {e}")
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle = open(path, "a", encoding=self.encoding)
+        self.__handles[path] = handle
+        return handle
+
+    def __close_one(self, path: str) -> None:
+        with self.__handle_lock:
+            handle = self.__handles.pop(path, None)
+            self.__dirty.discard(path)
+        if handle is not None:
+            try:
+                handle.close()
+            except (OSError, ValueError):
+                pass
+
+    def __flush_one(self, path: str) -> None:
+        with self.__handle_lock:
+            handle = self.__handles.get(path)
+            self.__dirty.discard(path)
+            if handle is not None:
+                try:
+                    handle.flush()
+                except (OSError, ValueError) as e:
+                    logger.error(f"Failed to flush {path}. Error: {e}")
+
+    def flush(self) -> None:
+        # Flush every handle written since the last flush
+        with self.__handle_lock:
+            dirty, self.__dirty = self.__dirty, set()
+            for path in dirty:
+                handle = self.__handles.get(path)
+                if handle is None:
+                    continue
+                try:
+                    handle.flush()
+                except (OSError, ValueError) as e:
+                    logger.error(f"Failed to flush {path}. Error: {e}")
+
+    def __start_flusher(self) -> None:
+        # The flush thread starts with the first append
+        if self.__flusher is not None and self.__flusher.is_alive():
+            return
+        self.__stop.clear()
+        self.__flusher = threading.Thread(target=self.__run, args=(weakref.ref(self), self.__stop, self.flush_interval),
+                                          name="foundry-files-flush", daemon=True)
+        self.__flusher.start()
+
+    @staticmethod
+    def __run(ref, stop, interval):
+        # Holds only a weak reference, so a forgotten handler can still be collected
+        while not stop.wait(interval):
+            handler = ref()
+            if handler is None:
+                return
+            handler.flush()
+            del handler
+
+    def close(self) -> None:
+        # Stop the flush thread, then flush and close every handle
+        self.__stop.set()
+        if self.__flusher is not None and self.__flusher is not threading.current_thread():
+            self.__flusher.join(5)
+        self.__dirty.clear()
+        _close_handles(self.__handles, self.__handle_lock)
+
+    # Export and archival
+
+    def export(self, path: str | Path, data, fmt: str = None, atomic: bool = False) -> bool:
+        """
+        Write structured data in a file format.
+        ARGS:
+            path: File to write, relative to base_dir
+            data: For json any JSON-able value; for jsonl an iterable of values, one per line; for csv an iterable
+                  of dicts (header from the first) or of rows; for txt anything str() can show
+            fmt: "json", "jsonl", "csv" or "txt" (default: taken from the extension, txt if unknown)
+            atomic: Write a temp file and swap it into place (default: False)
+        RETURNS:
+            bool: True if the file was written
+        """
+        fmt = (fmt or Path(path).suffix.lstrip(".") or "txt").lower()
+        try:
+            if fmt == "json":
+                text = json.dumps(data, indent=2, default=str, ensure_ascii=False) + "\n"
+            elif fmt in ("jsonl", "ndjson"):
+                text = "".join(json.dumps(item, default=str, ensure_ascii=False) + "\n" for item in data)
+            elif fmt == "csv":
+                text = self.__csv(data)
+            else:
+                text = data if isinstance(data, (str, bytes)) else str(data)
+        except (TypeError, ValueError) as e:
+            logger.error(f"Could not export {path} as {fmt}. Error: {e}")
+            return False
+        return self.write(path, text, atomic=atomic)
+
+    @staticmethod
+    def __csv(data) -> str:
+        # Rows of dicts get a header from the first row's keys, other rows are written as they are
+        buffer = io.StringIO()
+        rows = iter(data)
+        first = next(rows, None)
+        if first is None:
+            return ""
+        if isinstance(first, dict):
+            writer = csv.DictWriter(buffer, fieldnames=list(first), extrasaction="ignore")
+            writer.writeheader()
+        else:
+            writer = csv.writer(buffer)
+        writer.writerow(first)
+        writer.writerows(rows)
+        return buffer.getvalue()
+
+    def archive(self, name: str, data, category: str = "general", when: datetime = None, fmt: str = "json") -> Path | None:
+        """
+        File a record under archive_dir/<category>/YYYY/YYYY-MM/YYYY-MM-DD/<name>_<HHMMSS_microseconds>.<fmt>,
+        the same year/month/day layout the logger uses, so old records can be pruned by directory.
+        ARGS:
+            name: Short name for the record
+            data: Content, exported as for export()
+            category: Sub-directory grouping related records (default: "general")
+            when: Time the record is filed under (default: now)
+            fmt: Export format (default: "json")
+        RETURNS:
+            Path: The archived file, or None if it could not be written
+        """
+        when = when or datetime.now()
+        target = self.archive_dir / category / when.strftime("%Y/%Y-%m/%Y-%m-%d") / f"{name}_{when.strftime('%H%M%S_%f')}.{fmt}"
+        return target if self.export(target, data, fmt) else None
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+
+# manifest.py
+# Author: Luxforge
+# Content-hash manifest of a directory tree - only files whose size or mtime changed are hashed again
+
+import hashlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from foundry.files.files import PRUNE_DIRS, iter_files, write_file
+from foundry.logger.logger import logger
+
+# Files at least this big are hashed in worker processes - below it, threads (hashlib releases the GIL) are cheaper
+LARGE_FILE = 16 * 1024 * 1024
+
+# First line of a manifest file: "# foundry-manifest <version> blake2b/<digest size> <scan time ns>"
+HEADER = "# foundry-manifest 1"
+
+# An mtime this close to the last scan may hide a change made in the same clock tick - such files are hashed again
+RACY_WINDOW_NS = 2 * 10**9
+
+# Hashing processes are never forked from this one - a fork could copy a lock held by a logger, watcher or
+# retention thread into a child that then waits on it for ever
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def hash_file(path: str, digest_size: int = 16, chunk_size: int = 1024 * 1024) -> str | None:
+    """
+    blake2b of a file's content, read in chunks into one reused buffer.
+    ARGS:
+        path: File to hash
+        digest_size: Digest length in bytes (default: 16)
+        chunk_size: Bytes read at a time (default: 1 MiB)
+    RETURNS:
+        str: Hex digest, or None if the file could not be read
+    """
+    digest = hashlib.blake2b(digest_size=digest_size)
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    try:
+        with open(path, "rb", buffering=0) as f:
+            while True:
+                count = f.readinto(buffer)
+                if not count:
+                    break
+                digest.update(view[:count])
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def _escape(path: str) -> str:
+    # Keep one entry per line whatever the file is called
+    return path.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _unescape(path: str) -> str:
+    if "\\" not in path:
+        return path
+    out, chars = [], iter(path)
+    for char in chars:
+        if char == "\\":
+            char = next(chars, "")
+            out.append("\n" if char == "n" else char)
+        else:
+            out.append(char)
+    return "".join(out)
+
+
+class Manifest:
+    """
+    Record of every file under a directory - relative path, size, mtime_ns and blake2b hash - kept in a
+    compact text file. Each update() walks the tree with iter_files, hashes only files that are new or whose
+    size or mtime changed, and reports what was added, removed and modified since the last run.
+    Files of LARGE_FILE bytes or more are hashed across a process pool, smaller ones on threads.
+    ARGS:
+        root: Directory to describe
+        path: Manifest file (default: <root>/.foundry-manifest)
+        include / exclude / prune: Which files to cover, as for iter_files (default: everything bar PRUNE_DIRS)
+        digest_size: blake2b digest length in bytes (default: 16)
+        workers: Threads for walking and hashing small files (default: 8)
+        processes: Worker processes for large files (default: one per CPU)
+    METHODS:
+        update(save): Walk, hash what changed, save, and return the differences
+        load(): Read the manifest file
+        save(): Write the manifest file
+    PROPERTIES:
+        entries: Relative path -> (size, mtime_ns, hex digest)
+    """
+
+    def __init__(self, root: str | Path, path: str | Path = None, include="*", exclude=None, prune=PRUNE_DIRS,
+                 digest_size: int = 16, workers: int = 8, processes: int = None):
+
+        self.root = Path(root)
+        self.path = Path(path) if path is not None else self.root / ".foundry-manifest"
+        self.include = include
+        self.exclude = exclude
+        self.prune = prune
+        self.digest_size = int(digest_size)
+        self.workers = max(1, int(workers))
+        self.processes = processes
+        self.entries = {}
+        self.scanned = 0
+
+        self.__loaded = False
+
+    def load(self) -> dict:
+        """
+        Read the manifest file - a missing, unreadable or foreign file gives an empty manifest.
+        RETURNS:
+            dict: Relative path -> (size, mtime_ns, hex digest)
+        """
+        self.__loaded = True
+        self.entries, self.scanned = {}, 0
+        try:
+            with open(self.path, "r", encoding="utf-8", errors="surrogateescape", newline="\n") as f:
+                header = f.readline().split()
+                if " ".join(header[:3]) != HEADER or header[3:4] != [f"blake2b/{self.digest_size}"]:
+                    logger.warning(f"Ignoring manifest {self.path} - not a version 1 blake2b/{self.digest_size} manifest")
+                    return self.entries
+                self.scanned = int(header[4])
+
+                entries = {}
+                for line in f:
+                    digest, size, mtime, name = line.rstrip("\n").split("\t", 3)
+                    entries[_unescape(name)] = (int(size), int(mtime), digest)
+                self.entries = entries
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, IndexError) as e:
+            logger.warning(f"Ignoring manifest {self.path} - could not be read: {e}")
+            self.entries, self.scanned = {}, 0
+        return self.entries
+
+    def save(self) -> bool:
+        # Sorted, so manifests of the same tree are identical and diff cleanly - written atomically
+        lines = [f"{HEADER} blake2b/{self.digest_size} {self.scanned}\n"]
+        lines.extend(f"{digest}\t{size}\t{mtime}\t{_escape(name)}\n" for name, (size, mtime, digest) in sorted(self.entries.items()))
+        return write_file(self.path, "".join(lines).encode("utf-8", "surrogateescape"), atomic=True)
+
+    def update(self, save: bool = True) -> dict:
+        """
+        Bring the manifest up to date with the tree.
+        ARGS:
+            save: Write the manifest file if anything changed (default: True)
+        RETURNS:
+            dict: added, removed and modified (sets of relative paths) and hashed (files read this run)
+        """
+        if not self.__loaded:
+            self.load()
+        started = time.time_ns()
+        old, racy = self.entries, self.scanned - RACY_WINDOW_NS
+
+        # Walk the tree - unchanged entries carry over, the rest are queued for hashing
+        root = os.path.abspath(self.root)
+        skip = len(os.path.join(root, ""))
+        manifest = os.path.abspath(self.path)
+        current, queued = {}, []
+        for path in iter_files(root, self.include, self.exclude, prune=self.prune, workers=self.workers):
+            full = str(path)
+            if full == manifest:
+                continue
+            try:
+                stat = os.stat(full)
+            except OSError:
+                continue
+            name = full[skip:].replace(os.sep, "/")
+            previous = old.get(name)
+            if previous is not None and previous[:2] == (stat.st_size, stat.st_mtime_ns) and stat.st_mtime_ns < racy:
+                current[name] = previous
+            else:
+                queued.append((name, full, stat.st_size, stat.st_mtime_ns))
+
+        # Hash what changed - a file that cannot be read keeps its old entry rather than showing up as removed
+        digests = self.__hash_all(queued)
+        for name, full, size, mtime in queued:
+            digest = digests.get(name)
+            if digest is not None:
+                current[name] = (size, mtime, digest)
+            elif name in old:
+                current[name] = old[name]
+
+        added = current.keys() - old.keys()
+        removed = old.keys() - current.keys()
+        modified = {name for name in current.keys() & old.keys() if current[name][2] != old[name][2]}
+
+        self.entries, self.scanned = current, started
+        if save and (queued or removed):
+            self.save()
+
+        logger.info(f"Manifest of {self.root}: {len(current)} files, {len(queued)} hashed - "
+                    f"{len(added)} added, {len(removed)} removed, {len(modified)} modified")
+        return {"added": added, "removed": removed, "modified": modified, "hashed": len(queued)}
+
+    def __hash_all(self, queued: list) -> dict:
+        # Small files on threads, large ones on processes - each pool only started if it has work
+        small = [(name, full) for name, full, size, _ in queued if size < LARGE_FILE]
+        large = [(name, full) for name, full, size, _ in queued if size >= LARGE_FILE]
+        digests = {}
+
+        pools = []
+        try:
+            futures = {}
+            if small:
+                threads = ThreadPoolExecutor(max_workers=min(self.workers, len(small)), thread_name_prefix="foundry-hash")
+                pools.append(threads)
+                futures.update({threads.submit(hash_file, full, self.digest_size): name for name, full in small})
+            if len(large) > 1:
+                processes = ProcessPoolExecutor(max_workers=min(self.processes or os.cpu_count() or 1, len(large)),
+                                                mp_context=multiprocessing.get_context(START_METHOD))
+                pools.append(processes)
+                futures.update({processes.submit(hash_file, full, self.digest_size): name for name, full in large})
+            elif large:
+                # A single large file is not worth starting a process for
+                name, full = large[0]
+                digests[name] = hash_file(full, self.digest_size)
+
+            for future in as_completed(futures):
+                try:
+                    digests[futures[future]] = future.result()
+                except Exception as e:
+                    logger.error(f"Could not hash {futures[future]}: {e}")
+        finally:
+            for pool in pools:
+                pool.shutdown()
+        return digests
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+
+# watcher.py
+# Author: Luxforge
+# Watch a directory tree for changes by polling - os.scandir snapshots, diffed and delivered in debounced batches
+
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Iterator
+
+from foundry.files.files import PRUNE_DIRS, _glob_matcher
+from foundry.logger.logger import logger
+
+# Handed to iterators when the watcher stops
+_STOPPED = object()
+
+
+def _empty_batch() -> dict:
+    return {"created": set(), "modified": set(), "deleted": set(), "moved": {}}
+
+
+def diff_snapshots(root: Path, old: dict, new: dict) -> dict:
+    """
+    Differences between two snapshots. A file that vanished under one name and appeared under another with
+    the same device, inode, size and mtime is reported as moved rather than deleted and created.
+    ARGS:
+        root: Directory the snapshot names are relative to
+        old / new: Snapshots - relative name -> (device, inode, size, mtime_ns)
+    RETURNS:
+        dict: created, modified and deleted (sets of Path) and moved (dict of old Path -> new Path)
+    """
+    batch = _empty_batch()
+    if old is new or old == new:
+        return batch
+
+    created = new.keys() - old.keys()
+    deleted = old.keys() - new.keys()
+    batch["modified"] = {root / name for name in old.keys() & new.keys() if old[name][2:] != new[name][2:]}
+
+    # Renames keep the inode and the content - pair them up before calling anything created or deleted
+    if created and deleted:
+        gone = {old[name]: name for name in deleted}
+        for name in list(created):
+            source = gone.pop(new[name], None)
+            if source is not None:
+                batch["moved"][root / source] = root / name
+                created.discard(name)
+                deleted.discard(source)
+
+    batch["created"] = {root / name for name in created}
+    batch["deleted"] = {root / name for name in deleted}
+    return batch
+
+
+class Watcher:
+    """
+    Polls a directory tree and reports what changed - no third-party packages or OS notification APIs needed.
+    Each poll is one os.scandir walk, keeping the stat results scandir hands back as a snapshot, and comparing it
+    with the last one is a dict comparison. While nothing changes the interval backs off towards max_interval;
+    the first change brings it back down. Changes are held until the tree has been quiet for `debounce` seconds
+    (or `max_delay` has passed), then the snapshot from the last batch is diffed against the current one - so a
+    burst of writes arrives as one batch, and a file created and deleted within it never shows up at all.
+    ARGS:
+        root: Directory to watch
+        include / exclude / prune: Which files to watch, as for iter_files (default: everything bar PRUNE_DIRS)
+        interval: Shortest time between polls, in seconds (default: 1)
+        max_interval: Longest time between polls once things are quiet (default: 10)
+        debounce: Quiet time before a batch is delivered (default: 0.5)
+        max_delay: Longest a change waits for the tree to go quiet (default: 5)
+    METHODS:
+        subscribe(callback): Call callback(batch) for every batch, from the watcher thread
+        unsubscribe(callback): Stop calling a callback
+        events(timeout): Iterate over batches as they come - also `for batch in watcher`
+        check(): Poll now and return everything changed since the last batch, skipping the debounce
+        start() / stop(): Run or stop the polling thread - events() and subscribe() start it themselves
+    PROPERTIES:
+        interval_now: Seconds until the next poll
+        batch: dict of created, modified and deleted (sets of Path) and moved (dict of old Path -> new Path)
+    """
+
+    def __init__(self, root: str | Path, include="*", exclude=None, prune=PRUNE_DIRS, interval: float = 1.0,
+                 max_interval: float = 10.0, debounce: float = 0.5, max_delay: float = 5.0):
+
+        self.root = Path(os.path.abspath(root))
+        self.prune = frozenset(prune or ())
+        self.interval = max(0.05, float(interval))
+        self.max_interval = max(self.interval, float(max_interval))
+        self.debounce = max(0.0, float(debounce))
+        self.max_delay = max(self.debounce, float(max_delay))
+        self.interval_now = self.interval
+
+        root_path = str(self.root)
+        self.__includes = _glob_matcher(include, root_path)
+        self.__excludes = _glob_matcher(exclude, root_path)
+        self.__skip = len(os.path.join(root_path, ""))
+
+        self.__callbacks = []
+        self.__queues = []
+        self.__lock = threading.Lock()
+        self.__thread = None
+        self.__stop = threading.Event()
+
+        # The snapshot the last batch was cut from, and the latest one
+        self.__base = self.__snapshot()
+        self.__last = self.__base
+
+    def __snapshot(self) -> dict:
+        # One scandir walk - relative name -> (device, inode, size, mtime_ns)
+        snapshot = {}
+        includes, excludes, prune, skip = self.__includes, self.__excludes, self.prune, self.__skip
+        stack = [str(self.root)]
+        while stack:
+            path = stack.pop()
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if entry.name not in prune and not (excludes and excludes(entry.name, entry.path)):
+                                    stack.append(entry.path)
+                            elif entry.is_file():
+                                if (includes is None or includes(entry.name, entry.path)) and not (excludes and excludes(entry.name, entry.path)):
+                                    stat = entry.stat()
+                                    snapshot[entry.path[skip:].replace(os.sep, "/")] = (stat.st_dev, entry.inode(), stat.st_size, stat.st_mtime_ns)
+                        except OSError:
+                            # Gone between listing and stat - the next poll will see it properly
+                            continue
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                logger.warning(f"Could not scan {path}: {e}")
+        return snapshot
+
+    def check(self) -> dict:
+        """
+        Poll now and take everything changed since the last batch, whether or not the tree has gone quiet.
+        Subscribers are not called - the batch is only returned.
+        RETURNS:
+            dict: created, modified, deleted and moved
+        """
+        with self.__lock:
+            self.__last = self.__snapshot()
+            batch = diff_snapshots(self.root, self.__base, self.__last)
+            self.__base = self.__last
+        return batch
+
+    # Subscribers
+
+    def subscribe(self, callback):
+        # Returns the callback, so this can be used as a decorator
+        with self.__lock:
+            self.__callbacks.append(callback)
+        self.start()
+        return callback
+
+    def unsubscribe(self, callback) -> None:
+        with self.__lock:
+            if callback in self.__callbacks:
+                self.__callbacks.remove(callback)
+
+    def __iter__(self) -> Iterator[dict]:
+        return self.events()
+
+    def events(self, timeout: float = None) -> Iterator[dict]:
+        """
+        Batches as they are delivered - ends when the watcher stops, or after `timeout` seconds without one.
+        ARGS:
+            timeout: Seconds to wait for a batch before giving up (default: None, wait for ever)
+        YIELDS:
+            dict: created, modified, deleted and moved
+        """
+        waiting = queue.SimpleQueue()
+        with self.__lock:
+            self.__queues.append(waiting)
+        self.start()
+        try:
+            while True:
+                try:
+                    batch = waiting.get(timeout=timeout)
+                except queue.Empty:
+                    return
+                if batch is _STOPPED:
+                    return
+                yield batch
+        finally:
+            with self.__lock:
+                if waiting in self.__queues:
+                    self.__queues.remove(waiting)
+
+    def __deliver(self, batch: dict) -> None:
+        with self.__lock:
+            callbacks, queues = list(self.__callbacks), list(self.__queues)
+        for waiting in queues:
+            waiting.put(batch)
+        for callback in callbacks:
+            try:
+                callback(batch)
+            except Exception as e:
+                logger.error(f"Watcher callback {getattr(callback, '__name__', callback)} failed: {e}")
+
+    # Polling thread
+
+    def start(self) -> None:
+        if self.__thread is not None and self.__thread.is_alive():
+            return
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self.__run, name="foundry-files-watch", daemon=True)
+        self.__thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self.__stop.set()
+        if self.__thread is not None and self.__thread is not threading.current_thread():
+            self.__thread.join(timeout)
+
+        # Iterators finish rather than wait for ever
+        with self.__lock:
+            queues = list(self.__queues)
+        for waiting in queues:
+            waiting.put(_STOPPED)
+
+    def __run(self):
+        first_change = last_change = None
+        self.interval_now = self.interval
+        while not self.__stop.wait(self.interval_now):
+            try:
+                started = time.monotonic()
+                snapshot = self.__snapshot()
+                now = time.monotonic()
+
+                with self.__lock:
+                    changed = snapshot != self.__last
+                    self.__last = snapshot
+                if changed:
+                    last_change = now
+                    first_change = first_change or now
+
+                # Something is waiting - poll often enough to notice it going quiet
+                if first_change is not None:
+                    if now - last_change >= self.debounce or now - first_change >= self.max_delay:
+                        with self.__lock:
+                            batch = diff_snapshots(self.root, self.__base, self.__last)
+                            self.__base = self.__last
+                        first_change = last_change = None
+                        if any(batch.values()):
+                            self.__deliver(batch)
+                    self.interval_now = min(self.interval, max(self.debounce, 0.05))
+                elif not changed:
+                    self.interval_now = min(self.interval_now * 1.5, self.max_interval)
+
+                # Never spend more than about a third of the time scanning, however big the tree
+                self.interval_now = max(self.interval_now, (now - started) * 2)
+            except Exception as e:
+                logger.error(f"Watching {self.root} failed: {e}")
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+
+# __main__.py
+# Author: Luxforge
+# Command line entry point: python -m foundry.logger <command>
+
+import argparse
+import sys
+
+from foundry.logger import query, retention
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m foundry.logger", description="Foundry logger tools.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    # Search and tail the archive
+    query.build_parser(commands.add_parser("query", help="Search or tail the log archive"))
+
+    # Compress and prune the archive once - what LOG_COMPRESS and friends do in the background
+    retention.build_parser(commands.add_parser("maintain", help="Compress finished hours and prune old logs"))
+
+    args = parser.parse_args(argv)
+    if args.command == "query":
+        return query.run(args)
+    if args.command == "maintain":
+        return retention.run(args)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
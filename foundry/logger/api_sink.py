@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+
+# api_sink.py
+# Author: Luxforge
+# Batched HTTP sink for LOG_TO_API - keep-alive connection, gzip bodies, backoff and on-disk spill
+
+import gzip
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+from foundry.logger.forking import at_fork
+from foundry.logger.writer import AsyncWriter
+
+
+class ApiSink:
+    """
+    Ship log records to an HTTP endpoint in gzip-compressed JSON batches from a background thread.
+    Records are queued without blocking the caller. Batches go out when they reach batch_size or
+    after max_latency seconds. A failed batch is retried with exponential backoff; once retries run
+    out it is spilled to spool_dir and replayed, oldest first, after the endpoint recovers.
+    The spool is capped at max_spool_mb - the oldest batches are dropped to make room. Several processes
+    may share a spool: each batch is claimed by renaming it before it is sent, so only one of them replays it.
+    ARGS:
+        endpoint: URL to POST batches to, http:// or https://
+        api_key: Sent as a Bearer token when set (default: None)
+        batch_size: Records per request (default: 200)
+        max_latency: Seconds a partial batch may wait before being sent (default: 2)
+        max_queue: Records held in memory before the oldest are dropped (default: 10000)
+        timeout: Socket timeout per request in seconds (default: 5)
+        max_retries: Attempts per batch before spilling it to disk (default: 4)
+        backoff: First retry delay in seconds, doubled per attempt with jitter (default: 0.5)
+        max_backoff: Cap on the retry delay and on the pause after an outage (default: 30)
+        spool_dir: Directory for spilled batches (default: ./logs/.api_spool)
+        max_spool_mb: Most the spool may hold on disk, 0 for no limit (default: 100)
+    METHODS:
+        emit(record): Queue a record dict - never blocks
+        replay(): Resend spilled batches now
+        flush(timeout): Wait until queued records have been sent or spilled
+        close(timeout): Flush and close the connection
+    PROPERTIES:
+        sent / spilled / failed: Record counters
+    """
+
+    def __init__(self, endpoint: str, api_key: str = None, batch_size: int = 200, max_latency: float = 2.0,
+                 max_queue: int = 10000, timeout: float = 5.0, max_retries: int = 4, backoff: float = 0.5,
+                 max_backoff: float = 30.0, spool_dir: str = None, max_spool_mb: float = 100):
+
+        url = urlsplit(endpoint)
+        if url.scheme not in ("http", "https") or not url.hostname:
+            raise ValueError(f"API endpoint must be an http(s) URL, got '{endpoint}'")
+
+        self.endpoint = endpoint
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_retries = max(1, int(max_retries))
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.spool_dir = spool_dir or os.path.join(".", "logs", ".api_spool")
+        self.max_spool_bytes = int(float(max_spool_mb or 0) * 1024 * 1024)
+
+        # Connection details - one persistent connection reused for every request, one request at a time:
+        # replay() may be called by the user while the writer thread is sending
+        self.__scheme = url.scheme
+        self.__host = url.hostname
+        self.__port = url.port
+        self.__path = (url.path or "/") + (f"?{url.query}" if url.query else "")
+        self.__connection = None
+        self.__connection_lock = threading.RLock()
+
+        # While the endpoint is down, batches go straight to disk until this monotonic time
+        self.__down_until = 0.0
+        self.__spool_seq = 0
+
+        # Batches left over from an earlier run are replayed after the first successful send - including
+        # any a crashed process had claimed and never finished
+        self.__release_stale_claims()
+        self.__backlog = bool(self.__spooled())
+
+        self.sent = 0
+        self.spilled = 0
+        self.failed = 0
+
+        # Drop the oldest records rather than ever stalling the caller
+        self.__writer = AsyncWriter(self.__send_batch, max_queue=max_queue, overflow="drop_oldest",
+                                    batch_size=batch_size, max_latency=max_latency, name="foundry-log-api")
+        at_fork(after_in_child=self.__after_fork_child)
+
+    @property
+    def dropped(self) -> int:
+        return self.__writer.dropped
+
+    def emit(self, record: dict) -> None:
+        self.__writer.put(record)
+
+    def flush(self, timeout: float = None) -> bool:
+        return self.__writer.flush(timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        self.__writer.close(timeout)
+        self.__disconnect()
+
+    def replay(self) -> int:
+        """
+        Resend spilled batches, oldest first, stopping at the first failure. Safe to call while the writer thread
+        is sending - requests take turns on the connection.
+        RETURNS:
+            int: Number of batches delivered
+        """
+        delivered = 0
+        for path in self.__spooled():
+            # Claim the batch first - if another process renamed it away, it is theirs to send
+            claim = self.__claim_path(path)
+            try:
+                os.rename(path, claim)
+            except OSError:
+                continue
+
+            try:
+                with open(claim, "rb") as f:
+                    body = f.read()
+            except OSError:
+                self.__unclaim(claim, path)
+                continue
+
+            result = self.__post(body)
+            if result is False:
+                # Still down - hand it back for whoever tries next
+                self.__unclaim(claim, path)
+                break
+
+            # Delivered, or rejected outright - either way it must not block the rest of the spool
+            try:
+                os.remove(claim)
+            except OSError:
+                pass
+            if result:
+                delivered += 1
+
+        self.__backlog = bool(self.__spooled())
+        return delivered
+
+    def __claim_path(self, path: str) -> str:
+        # Hidden name carrying the claimer's pid - __spooled() skips it, __release_stale_claims() can undo it
+        return os.path.join(self.spool_dir, f".claim-{os.getpid()}-{os.path.basename(path)}")
+
+    @staticmethod
+    def __unclaim(claim: str, path: str):
+        try:
+            os.rename(claim, path)
+        except OSError:
+            pass
+
+    def __release_stale_claims(self):
+        # Batches claimed by processes that are no longer running go back into the spool
+        try:
+            with os.scandir(self.spool_dir) as entries:
+                claims = [entry.name for entry in entries if entry.name.startswith(".claim-")]
+        except OSError:
+            return
+        for name in claims:
+            try:
+                pid, original = name[len(".claim-"):].split("-", 1)
+                os.kill(int(pid), 0)
+                continue
+            except ProcessLookupError:
+                pass
+            except (ValueError, PermissionError, OSError):
+                # Malformed, or a live process we may not signal - leave it alone
+                continue
+            self.__unclaim(os.path.join(self.spool_dir, name), os.path.join(self.spool_dir, original))
+
+    def __send_batch(self, records: list):
+        # Writer thread sink - serialise once, compress, and deliver or spill
+        body = gzip.compress(json.dumps(records, default=str, separators=(",", ":")).encode("utf-8"))
+
+        # Endpoint recently failed - don't hold up the queue retrying, spill straight away
+        if time.monotonic() < self.__down_until:
+            self.__spill(body, len(records))
+            return
+
+        for attempt in range(self.max_retries):
+            result = self.__post(body)
+            if result:
+                self.sent += len(records)
+                # The endpoint is healthy - catch up on anything spilled during an outage
+                if self.__backlog:
+                    self.replay()
+                return
+            if result is None:
+                # Rejected outright - retrying the same body cannot help
+                self.failed += len(records)
+                return
+            if attempt < self.max_retries - 1:
+                time.sleep(self.__delay(attempt))
+
+        # Out of retries - keep the batch on disk and back off for a while
+        self.__down_until = time.monotonic() + self.max_backoff
+        self.__spill(body, len(records))
+
+    def __delay(self, attempt: int) -> float:
+        # Exponential backoff with full jitter, capped
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    def __connect(self):
+        if self.__connection is None:
+            cls = http.client.HTTPSConnection if self.__scheme == "https" else http.client.HTTPConnection
+            self.__connection = cls(self.__host, self.__port, timeout=self.timeout)
+        return self.__connection
+
+    def __disconnect(self):
+        with self.__connection_lock:
+            if self.__connection is not None:
+                try:
+                    self.__connection.close()
+                finally:
+                    self.__connection = None
+
+    def __after_fork_child(self):
+        # Never talk over the parent's socket - the child opens its own connection when it first sends
+        self.__connection = None
+        self.__connection_lock = threading.RLock()
+
+    def __post(self, body: bytes):
+        """
+        POST one compressed batch.
+        RETURNS:
+            True on success, False on a retryable failure, None if the server rejected the batch
+        """
+        headers = {
+            "Content-Type": "application/json",
+            "Content-Encoding": "gzip",
+            "Connection": "keep-alive",
+        }
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+
+        with self.__connection_lock:
+            try:
+                connection = self.__connect()
+                connection.request("POST", self.__path, body=body, headers=headers)
+                response = connection.getresponse()
+
+                # Always read the body so the connection can be reused
+                response.read()
+                if response.will_close:
+                    self.__disconnect()
+            except (OSError, http.client.HTTPException) as e:
+                print(f"[FoundryLogger] API send failed: {e}", file=sys.stderr)
+                self.__disconnect()
+                return False
+
+        if 200 <= response.status < 300:
+            return True
+        if response.status in (408, 429) or response.status >= 500:
+            print(f"[FoundryLogger] API endpoint returned {response.status}, will retry", file=sys.stderr)
+            return False
+        print(f"[FoundryLogger] API endpoint rejected batch with {response.status}", file=sys.stderr)
+        return None
+
+    def __spill(self, body: bytes, count: int):
+        # Write the compressed batch to the spool - named so lexical order is arrival order
+        try:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            if self.max_spool_bytes:
+                self.__make_room(len(body))
+            self.__spool_seq += 1
+            name = f"{time.time_ns():020d}-{os.getpid()}-{self.__spool_seq:06d}-{count}.json.gz"
+            temp = os.path.join(self.spool_dir, f".{name}.tmp")
+            with open(temp, "wb") as f:
+                f.write(body)
+            os.replace(temp, os.path.join(self.spool_dir, name))
+            self.spilled += count
+            self.__backlog = True
+        except OSError as e:
+            print(f"[FoundryLogger] Could not spill {count} API record(s): {e}", file=sys.stderr)
+            self.failed += count
+
+    def __make_room(self, incoming: int):
+        # Drop the oldest spilled batches until the new one fits under the cap - the newest records matter most
+        spooled = []
+        for path in self.__spooled():
+            try:
+                spooled.append((path, os.path.getsize(path)))
+            except OSError:
+                continue
+        total = sum(size for _, size in spooled)
+        dropped = 0
+        for path, size in spooled:
+            if total + incoming <= self.max_spool_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            dropped += self.__spooled_count(path)
+        if dropped:
+            self.failed += dropped
+            print(f"[FoundryLogger] API spool full - dropped {dropped} of the oldest spilled record(s)", file=sys.stderr)
+
+    @staticmethod
+    def __spooled_count(path: str) -> int:
+        # Records in a spilled batch, from its name - batches from older versions do not say
+        try:
+            return int(os.path.basename(path).split(".", 1)[0].split("-")[3])
+        except (IndexError, ValueError):
+            return 0
+
+    def __spooled(self) -> list:
+        # Spilled batches, oldest first
+        try:
+            with os.scandir(self.spool_dir) as entries:
+                return sorted(entry.path for entry in entries if entry.name.endswith(".json.gz") and not entry.name.startswith("."))
+        except FileNotFoundError:
+            return []
+        except OSError as e:
+            # Unreadable or not a directory - nothing to replay, and no reason to stop the logger starting
+            print(f"[FoundryLogger] Could not read the API spool {self.spool_dir}: {e}", file=sys.stderr)
+            return []
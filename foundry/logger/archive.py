@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+# archive.py
+# Author: Luxforge
+# Layout of the log archive (log_dir/task/yyyy/yyyy-mm/yyyy-mm-dd) - file names, partitions and compressed files
+
+import gzip
+import io
+import lzma
+import os
+import re
+from datetime import datetime, timedelta
+
+# Hourly files, their numbered size-rotation backups and compressed copies: task_YYYYMMDD_HH00.log[.N][.gz|.xz]
+HOURLY_FILE = re.compile(r"_(?P<day>\d{8})_(?P<hour>\d{2})00\.log(?:\.(?P<backup>\d+))?(?:\.(?P<compressed>gz|xz))?$")
+
+# Supported compression - method name -> (file suffix, opener)
+COMPRESSORS = {
+    "gzip": (".gz", gzip.open),
+    "lzma": (".xz", lzma.open),
+}
+OPENERS = {suffix: opener for suffix, opener in COMPRESSORS.values()}
+
+# What reading a damaged or truncated compressed file can raise
+READ_ERRORS = (OSError, EOFError, lzma.LZMAError)
+
+
+def partition_span(name: str, depth: int):
+    """
+    Time span covered by a partition directory name.
+    ARGS:
+        name: Directory name - "yyyy", "yyyy-mm" or "yyyy-mm-dd"
+        depth: 0 for years, 1 for months, 2 for days
+    RETURNS:
+        tuple: (start, end) datetimes, end exclusive - None if the name is not a partition
+    """
+    try:
+        if depth == 0:
+            start = datetime.strptime(name, "%Y")
+            return start, start.replace(year=start.year + 1)
+        if depth == 1:
+            start = datetime.strptime(name, "%Y-%m")
+            return start, (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+        start = datetime.strptime(name, "%Y-%m-%d")
+        return start, start + timedelta(days=1)
+    except ValueError:
+        return None
+
+
+def hour_span(match) -> tuple:
+    # (start, end) of the hour an HOURLY_FILE match belongs to
+    start = datetime.strptime(match["day"] + match["hour"], "%Y%m%d%H")
+    return start, start + timedelta(hours=1)
+
+
+def open_log(path: str, offset: int = 0, encoding: str = "utf-8"):
+    """
+    Open a log file for reading as text, decompressing .gz and .xz files on the fly.
+    ARGS:
+        path: Plain or compressed log file
+        offset: Byte offset into the (uncompressed) content to start from
+        encoding: Text encoding (default: "utf-8")
+    RETURNS:
+        Text file object - undecodable bytes are replaced rather than raising
+    """
+    opener = OPENERS.get(os.path.splitext(path)[1])
+    raw = opener(path, "rb") if opener else open(path, "rb")
+    try:
+        if offset:
+            # Compressed streams seek by decompressing forward - still cheaper than parsing every line
+            raw.seek(offset)
+    except Exception:
+        raw.close()
+        raise
+    return io.TextIOWrapper(raw, encoding=encoding, errors="replace")
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+
+# config.py
+# Author: Luxforge
+# Logger settings from logger.env and the environment - parsed once, cached by mtime and reloadable while running
+
+import os
+import threading
+
+# Parsed env files - path -> ((mtime ns, size), values)
+_PARSED = {}
+_PARSED_LOCK = threading.Lock()
+
+# Values meaning "not set"
+_EMPTY = ("", "none", "null")
+
+
+def parse_env_text(text: str) -> dict:
+    """
+    Parse env file text - KEY=value and KEY: value lines, # comments, optional quotes and "export".
+    ARGS:
+        text: File content
+    RETURNS:
+        dict: Upper-case key -> value string
+    """
+    values = {}
+    for number, raw in enumerate(text.splitlines(), 1):
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("export "):
+            line = line[7:].lstrip()
+
+        # Whichever separator comes first - values may contain the other one (URLs, times)
+        positions = [p for p in (line.find("="), line.find(":")) if p > 0]
+        if not positions:
+            print(f"[FoundryLogger] Ignoring line {number} of env file: {raw!r}")
+            continue
+        split = min(positions)
+        key, value = line[:split].strip().upper(), line[split + 1:].strip()
+
+        # Quoted values are taken as they are, otherwise a " #" starts a comment
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+            value = value[1:-1]
+        elif " #" in value:
+            value = value.split(" #", 1)[0].rstrip()
+        values[key] = value
+    return values
+
+
+def read_env_file(path: str) -> dict:
+    """
+    Values from an env file, parsed only when the file has changed since it was last read.
+    ARGS:
+        path: Env file - missing files give no values
+    RETURNS:
+        dict: Upper-case key -> value string
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return {}
+    version = (stat.st_mtime_ns, stat.st_size)
+
+    with _PARSED_LOCK:
+        cached = _PARSED.get(path)
+        if cached is not None and cached[0] == version:
+            return dict(cached[1])
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            values = parse_env_text(f.read())
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"[FoundryLogger] Could not read {path}: {e}")
+        return dict(cached[1]) if cached is not None else {}
+
+    with _PARSED_LOCK:
+        _PARSED[path] = (version, values)
+    return dict(values)
+
+
+class LoggerConfig:
+    """
+    Settings for the logger - the environment overrides logger.env, which overrides the logger's defaults.
+    The file is only parsed again when its mtime or size changes, so checking for changes costs one stat.
+    ARGS:
+        env_path: Path to logger.env (default: None, environment only)
+        environ: Mapping read for overrides (default: os.environ)
+    METHODS:
+        get(name, default): Raw string value, or default when unset or "None"
+        get_bool(name, default) / get_int(name, default) / get_float(name, default): Typed values
+        reload(): Re-read the file and environment, returning the names whose values changed
+        watch(callback, interval): Poll for changes on a background thread, calling callback(changed names)
+        stop(): Stop watching
+    """
+
+    def __init__(self, env_path: str = None, environ=None):
+        self.env_path = env_path
+        self.environ = os.environ if environ is None else environ
+        self.values = self.__merge()
+
+        self.__thread = None
+        self.__stop = threading.Event()
+
+    def __merge(self) -> dict:
+        # File first, then the environment on top
+        values = read_env_file(self.env_path) if self.env_path else {}
+        values.update(self.environ)
+        return values
+
+    def get(self, name: str, default=None):
+        value = self.values.get(name)
+        if value is None or str(value).strip().lower() in _EMPTY:
+            return default
+        return str(value).strip()
+
+    def get_bool(self, name: str, default: bool = False) -> bool:
+        value = self.get(name)
+        if value is None:
+            return default
+        return value.lower() in ("true", "1", "yes", "on")
+
+    def get_int(self, name: str, default: int = 0) -> int:
+        return int(self.get_float(name, default))
+
+    def get_float(self, name: str, default: float = 0.0) -> float:
+        value = self.get(name)
+        if value is None:
+            return default
+        try:
+            return float(value)
+        except ValueError:
+            print(f"[FoundryLogger] {name}={value!r} is not a number - using {default}")
+            return default
+
+    def reload(self) -> set:
+        """
+        Pick up changes to the env file and environment.
+        RETURNS:
+            set: Names whose values were added, changed or removed
+        """
+        values = self.__merge()
+        old = self.values
+        changed = {name for name in values.keys() | old.keys() if values.get(name) != old.get(name)}
+        self.values = values
+        return changed
+
+    def watch(self, callback, interval: float = 5.0) -> None:
+        # Poll on a daemon thread - not carried into forked children, which keep the settings they started with
+        if self.__thread is not None and self.__thread.is_alive():
+            return
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self.__run, args=(callback, max(0.1, float(interval))), name="foundry-log-config", daemon=True)
+        self.__thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self.__stop.set()
+        if self.__thread is not None and self.__thread is not threading.current_thread():
+            self.__thread.join(timeout)
+
+    def __run(self, callback, interval):
+        while not self.__stop.wait(interval):
+            try:
+                changed = self.reload()
+                if changed:
+                    callback(changed)
+            except Exception as e:
+                print(f"[FoundryLogger] Configuration reload failed: {e}")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+
+# console.py
+# Author: Luxforge
+# Console output for the logger - colour codes worked out once per level, flushing only where someone is watching
+
+import os
+import sys
+import time
+
+from foundry.colours.colours import Colours
+
+
+class Console:
+    """
+    Writes log lines to stdout. Each level's ANSI prefix and suffix are built once, not per line.
+    On a terminal every line is flushed as it is written. Anywhere else (a pipe, a file, a collector) colour codes
+    are left out and lines are buffered - flushed at ERROR and above, once `flush_interval` has passed, or on flush().
+    ARGS:
+        levels: Level name -> (number, colour name), as Logger.LEVELS
+        colour: "auto" to colour terminals only, or True/False to force it (default: "auto") - NO_COLOR always wins in auto
+        flush_interval: Longest buffered lines may wait when not on a terminal, in seconds (default: 1)
+        flush_level: Lines at or above this level number are flushed straight away (default: 40)
+    METHODS:
+        write(line, level): Write one line
+        flush(): Push buffered lines out
+    PROPERTIES:
+        tty: Whether stdout is a terminal
+        coloured: Whether lines are being coloured
+    """
+
+    def __init__(self, levels: dict, colour="auto", flush_interval: float = 1.0, flush_level: int = 40):
+        self.levels = levels
+        self.colour = colour
+        self.flush_interval = max(0.0, float(flush_interval))
+        self.flush_level = flush_level
+        self.tty = False
+        self.coloured = False
+
+        # Settings for the stream last written to - worked out again if sys.stdout is swapped
+        self.__stream = None
+        self.__styles = {}
+        self.__urgent = frozenset()
+        self.__last_flush = 0.0
+
+    def __attach(self, stream):
+        # Decide colour and flushing for a stream once, then build every level's prefix and suffix
+        try:
+            self.tty = stream.isatty()
+        except (AttributeError, ValueError, OSError):
+            self.tty = False
+
+        if self.colour == "auto":
+            self.coloured = self.tty and not os.getenv("NO_COLOR")
+        else:
+            self.coloured = bool(self.colour)
+
+        styles = {}
+        for level, (number, colour) in self.levels.items():
+            if self.coloured:
+                styles[level] = (Colours.style(colour, bold=level == "CRITICAL"), f"{Colours.RESET}\n")
+            else:
+                styles[level] = ("", "\n")
+        self.__styles = styles
+        self.__urgent = frozenset(level for level, (number, _) in self.levels.items() if number >= self.flush_level)
+        self.__stream = stream
+
+    def write(self, line: str, level: str) -> None:
+        # sys.stdout is looked up each time so redirects (tests, the menu) are followed
+        stream = sys.stdout
+        if stream is None:
+            return
+        if stream is not self.__stream:
+            self.__attach(stream)
+
+        prefix, suffix = self.__styles.get(level, ("", "\n"))
+        stream.write(f"{prefix}{line}{suffix}")
+
+        # Someone is watching a terminal - show it now. Otherwise let lines gather, bar serious ones
+        if self.tty or level in self.__urgent:
+            stream.flush()
+            return
+        now = time.monotonic()
+        if now - self.__last_flush >= self.flush_interval:
+            self.__last_flush = now
+            stream.flush()
+
+    def flush(self) -> None:
+        stream = self.__stream
+        if stream is not None and stream is sys.stdout:
+            try:
+                stream.flush()
+            except (OSError, ValueError):
+                pass
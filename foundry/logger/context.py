@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+# context.py
+# Author: Luxforge
+# Context-local task tagging - each thread or asyncio task logs to its own task files
+
+import functools
+import inspect
+from contextvars import ContextVar
+
+# Task of the running context - None falls back to the logger's global task
+current_task = ContextVar("foundry_logger_task", default=None)
+
+# (TaskContext, token) of each `with` block entered in the running context, innermost last
+_entered = ContextVar("foundry_logger_task_tokens", default=())
+
+
+def task_tag(name) -> str:
+    """
+    Task name as used for log directories, file names and record tags - one spelling for every way a task is set.
+    ARGS:
+        name: Task name as given
+    RETURNS:
+        str: Stripped, spaces as underscores, "untagged" if empty
+    """
+    return str(name or "").strip().replace(" ", "_") or "untagged"
+
+
+class TaskContext:
+    """
+    Tag every record logged inside a block, function or coroutine with a task name.
+    Records are routed to that task's files without touching the logger's global task, so threads
+    and asyncio tasks each keep their own. Contexts nest - the innermost task wins.
+    ARGS:
+        name: Task name used for the log directory and file name
+    USAGE:
+        with logger.task_context("export"):
+            logger.info("Routed to export_YYYYMMDD_HH00.log")
+
+        @logger.task_context("nightly")
+        async def nightly(): ...
+    """
+
+    def __init__(self, name: str):
+        self.name = task_tag(name)
+
+    def __enter__(self):
+        # The token is kept in the running context, not on the instance - one instance may be entered
+        # from several threads or asyncio tasks at once, and each must reset its own
+        _entered.set(_entered.get() + ((self, current_task.set(self.name)),))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        entered = _entered.get()
+        for position in range(len(entered) - 1, -1, -1):
+            if entered[position][0] is self:
+                current_task.reset(entered[position][1])
+                _entered.set(entered[:position] + entered[position + 1:])
+                break
+        return False
+
+    def __call__(self, func):
+        # Decorator - every call gets its own token so concurrent calls never share state
+        name = self.name
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                token = current_task.set(name)
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    current_task.reset(token)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                token = current_task.set(name)
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    current_task.reset(token)
+        return wrapper
+
+    def __repr__(self):
+        return f"TaskContext({self.name!r})"
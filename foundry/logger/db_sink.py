@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+
+# db_sink.py
+# Author: Luxforge
+# SQLite sink for LOG_TO_DB - batched transactional inserts from a worker thread, plus chunked retention
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from foundry.logger.forking import at_fork
+from foundry.logger.structured import RECORD_FIELDS
+from foundry.logger.writer import AsyncWriter
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS logs (
+        id INTEGER PRIMARY KEY,
+        ts REAL NOT NULL,
+        timestamp TEXT,
+        level TEXT NOT NULL,
+        task TEXT,
+        node TEXT,
+        user TEXT,
+        message TEXT,
+        extra TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_logs_task_ts ON logs (task, ts)",
+    "CREATE INDEX IF NOT EXISTS idx_logs_level_ts ON logs (level, ts)",
+)
+
+INSERT = "INSERT INTO logs (ts, timestamp, level, task, node, user, message, extra) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+
+# Oldest rows have the lowest ids, so walking ids finds expired rows without a ts-only index
+PURGE = "DELETE FROM logs WHERE id IN (SELECT id FROM logs WHERE ts < ? ORDER BY id LIMIT ?)"
+
+
+def parse_connection_string(connection_string: str) -> str:
+    """
+    Resolve DB_CONNECTION_STRING to a SQLite database path.
+    ARGS:
+        connection_string: "sqlite:///relative/or/absolute.db", "sqlite:///:memory:" or a plain file path
+    RETURNS:
+        str: Path (or ":memory:") for sqlite3.connect
+    """
+    value = (connection_string or "").strip()
+    if "://" not in value:
+        if not value:
+            raise ValueError("DB_CONNECTION_STRING is empty")
+        return value
+
+    scheme, _, rest = value.partition("://")
+    if scheme.lower() not in ("sqlite", "sqlite3"):
+        raise ValueError(f"Unsupported database '{scheme}' - only sqlite is available")
+
+    # sqlite:///path keeps the path as written; sqlite:////abs/path gives an absolute path
+    path = rest[1:] if rest.startswith("/") else rest
+    return path or ":memory:"
+
+
+class DatabaseSink:
+    """
+    Store log records in SQLite, inserted in batched transactions on a dedicated worker thread.
+    The database runs in WAL mode with indexes on (task, ts) and (level, ts). If retention_days is
+    set, expired rows are deleted in small chunks between batches so inserts are never held up.
+    ARGS:
+        connection_string: See parse_connection_string
+        batch_size: Records per transaction (default: 1000)
+        max_latency: Seconds a partial batch may wait before it is committed (default: 1)
+        max_queue: Records held in memory before the overflow policy applies (default: 100000)
+        overflow: Queue overflow policy - drop_oldest keeps the caller from ever waiting (default: "drop_oldest")
+        retention_days: Delete rows older than this many days, 0 keeps everything (default: 0)
+        retention_chunk: Rows deleted per retention step (default: 5000)
+        retention_interval: Seconds between retention passes (default: 3600)
+    METHODS:
+        emit(record): Queue a record dict
+        purge(older_than): Delete rows older than an epoch time, chunk by chunk, from the calling thread
+        query(task, level, since, until, limit): Read rows back using the indexes
+        flush(timeout): Wait until queued records are committed
+        close(timeout): Flush and close the database
+    """
+
+    def __init__(self, connection_string: str, batch_size: int = 1000, max_latency: float = 1.0, max_queue: int = 100000,
+                 overflow: str = "drop_oldest", retention_days: float = 0, retention_chunk: int = 5000, retention_interval: float = 3600):
+        self.path = parse_connection_string(connection_string)
+        self.retention_days = float(retention_days or 0)
+        self.retention_chunk = max(1, int(retention_chunk))
+        self.retention_interval = retention_interval
+        self.inserted = 0
+        self.failed = 0
+        self.purged = 0
+
+        # The connection belongs to the worker thread - only a :memory: database shares it, under the lock
+        self.__connection = None
+        self.__lock = threading.Lock()
+        self.__inherited = []
+        self.__next_retention = 0.0
+        self.__retention_pending = False
+
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        self.__writer = AsyncWriter(self.__insert_batch, max_queue=max_queue, overflow=overflow,
+                                    batch_size=batch_size, max_latency=max_latency, name="foundry-log-db")
+        at_fork(after_in_child=self.__after_fork_child)
+
+    @property
+    def dropped(self) -> int:
+        return self.__writer.dropped
+
+    def emit(self, record: dict) -> None:
+        self.__writer.put(record)
+
+    def flush(self, timeout: float = None) -> bool:
+        return self.__writer.flush(timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        self.__writer.close(timeout)
+        if self.__connection is not None:
+            self.__connection.close()
+            self.__connection = None
+
+    def __after_fork_child(self):
+        # SQLite connections must not cross a fork - keep the parent's open (closing it could touch its locks) and start afresh
+        if self.__connection is not None:
+            self.__inherited.append(self.__connection)
+            self.__connection = None
+
+        # A parent thread may have held the lock at the fork - the child has no such thread to release it
+        self.__lock = threading.Lock()
+
+    def __connect(self, path: str = None) -> sqlite3.Connection:
+        # Open a connection with the pragmas we rely on and make sure the schema exists
+        # Cross-thread use is limited to close() after the worker has stopped
+        connection = sqlite3.connect(path or self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        for statement in SCHEMA:
+            connection.execute(statement)
+        return connection
+
+    def __insert_batch(self, records: list):
+        # Worker thread sink - one transaction per batch
+        with self.__lock:
+            if self.__connection is None:
+                try:
+                    self.__connection = self.__connect()
+                except sqlite3.Error as e:
+                    # No database, no insert - the batch counts as failed rather than vanishing
+                    self.failed += len(records)
+                    print(f"[FoundryLogger] Database connection failed, {len(records)} record(s) lost: {e}", file=sys.stderr)
+                    return
+            self.__insert_rows(records)
+            self.__retention_step()
+
+    def __insert_rows(self, records: list):
+        rows = []
+        for record in records:
+            extra = {k: v for k, v in record.items() if k not in RECORD_FIELDS}
+            rows.append((
+                record.get("epoch") or time.time(),
+                record.get("ts"),
+                record.get("level"),
+                record.get("task"),
+                record.get("node"),
+                record.get("user"),
+                str(record.get("message")),
+                json.dumps(extra, default=str) if extra else None,
+            ))
+
+        try:
+            self.__connection.execute("BEGIN")
+            self.__connection.executemany(INSERT, rows)
+            self.__connection.execute("COMMIT")
+            self.inserted += len(rows)
+        except sqlite3.Error as e:
+            if self.__connection.in_transaction:
+                self.__connection.execute("ROLLBACK")
+            self.failed += len(rows)
+            print(f"[FoundryLogger] Database insert of {len(rows)} record(s) failed: {e}", file=sys.stderr)
+
+    def __retention_step(self):
+        # Delete at most one chunk of expired rows per batch so inserts stay fast
+        if not self.retention_days:
+            return
+
+        now = time.time()
+        if not self.__retention_pending and now < self.__next_retention:
+            return
+
+        deleted = self.__purge_chunk(self.__connection, now - self.retention_days * 86400)
+        self.__retention_pending = deleted >= self.retention_chunk
+        if not self.__retention_pending:
+            self.__next_retention = now + self.retention_interval
+
+    def __purge_chunk(self, connection: sqlite3.Connection, cutoff: float) -> int:
+        try:
+            connection.execute("BEGIN")
+            deleted = connection.execute(PURGE, (cutoff, self.retention_chunk)).rowcount
+            connection.execute("COMMIT")
+        except sqlite3.Error as e:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            print(f"[FoundryLogger] Database retention failed: {e}", file=sys.stderr)
+            return 0
+        self.purged += deleted
+        return deleted
+
+    def __borrow(self) -> sqlite3.Connection:
+        # A :memory: database exists only in the connection that created it - lend out the sink's, holding the lock
+        if self.path != ":memory:":
+            return self.__connect()
+        self.__lock.acquire()
+        try:
+            if self.__connection is None:
+                self.__connection = self.__connect()
+        except BaseException:
+            self.__lock.release()
+            raise
+        return self.__connection
+
+    def __give_back(self, connection: sqlite3.Connection):
+        if self.path != ":memory:":
+            connection.close()
+        else:
+            self.__lock.release()
+
+    def purge(self, older_than: float = None) -> int:
+        """
+        Delete expired rows now, in chunks, on the calling thread - a one-shot maintenance pass.
+        ARGS:
+            older_than: Epoch cutoff (default: now minus retention_days)
+        RETURNS:
+            int: Rows deleted
+        """
+        if older_than is None:
+            if not self.retention_days:
+                return 0
+            older_than = time.time() - self.retention_days * 86400
+
+        connection = self.__borrow()
+        total = 0
+        try:
+            while True:
+                deleted = self.__purge_chunk(connection, older_than)
+                total += deleted
+                if deleted < self.retention_chunk:
+                    break
+        finally:
+            self.__give_back(connection)
+        return total
+
+    def query(self, task: str = None, level: str = None, since: float = None, until: float = None, limit: int = 1000) -> list:
+        """
+        Read records back, newest first.
+        ARGS:
+            task / level: Exact matches - each has its own (column, ts) index
+            since / until: Epoch window
+            limit: Maximum rows returned
+        RETURNS:
+            list of dict: Rows as dicts
+        """
+        clauses, params = [], []
+        for column, value in (("task", task), ("level", level)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts <= ?")
+            params.append(until)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        connection = self.__borrow()
+        try:
+            # Row factory on the cursor only - the connection may be the sink's own
+            cursor = connection.cursor()
+            cursor.row_factory = sqlite3.Row
+            rows = cursor.execute(f"SELECT * FROM logs {where} ORDER BY ts DESC LIMIT ?", (*params, int(limit))).fetchall()
+        finally:
+            self.__give_back(connection)
+        return [dict(row) for row in rows]
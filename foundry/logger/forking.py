@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+
+# forking.py
+# Author: Luxforge
+# Fork hooks for objects holding threads, locks or open handles
+
+import os
+import threading
+import weakref
+
+# Live objects -> their hook functions by phase. Weak keys, so an entry goes when its object does -
+# os.register_at_fork is called once for the module, never per object, and its hook list stays fixed
+_HOOKS = weakref.WeakKeyDictionary()
+_HOOKS_LOCK = threading.Lock()
+_registered = False
+
+
+def at_fork(before=None, after_in_parent=None, after_in_child=None) -> None:
+    """
+    Register bound methods to run around os.fork() without keeping their object alive.
+    Hooks of objects that have been garbage collected are forgotten. Does nothing where fork is unavailable.
+    ARGS:
+        before: Called in the parent just before forking
+        after_in_parent: Called in the parent once the fork is done
+        after_in_child: Called in the new child process
+    """
+    global _registered
+    if not hasattr(os, "register_at_fork"):
+        return
+
+    owner = None
+    with _HOOKS_LOCK:
+        for when, method in (("before", before), ("after_in_parent", after_in_parent), ("after_in_child", after_in_child)):
+            if method is None:
+                continue
+            owner = method.__self__
+            _HOOKS.setdefault(owner, {}).setdefault(when, []).append(method.__func__)
+
+        if owner is not None and not _registered:
+            os.register_at_fork(before=lambda: _run("before"), after_in_parent=lambda: _run("after_in_parent"),
+                                after_in_child=lambda: _run("after_in_child"))
+            _registered = True
+
+
+def _run(when: str) -> None:
+    # Same order as os.register_at_fork - "before" hooks newest first, the others oldest first.
+    # No lock - a thread that held it at the fork would leave it locked in the child, which gets a fresh one
+    global _HOOKS_LOCK
+    if when == "after_in_child":
+        _HOOKS_LOCK = threading.Lock()
+    entries = list(_HOOKS.items())
+    if when == "before":
+        entries.reverse()
+    for owner, hooks in entries:
+        for function in hooks.get(when, ()):
+            # A failing hook must never break the fork
+            try:
+                function(owner)
+            except Exception as e:
+                print(f"[FoundryLogger] Fork hook {function.__qualname__} failed: {e}")
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+
+# handles.py
+# Author: Luxforge
+# Persistent, buffered log file handles with size-based rotation
+
+import os
+import threading
+from pathlib import Path
+from foundry.logger.forking import at_fork
+from foundry.logger.structured import LogIndex, index_path
+
+# File locking is POSIX only - on Windows shared appends fall back to the in-process lock
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class RotatingFile:
+    """
+    Keep a single handle open for a log file and rotate it by size.
+    In the default mode the handle is buffered and the size is tracked in memory.
+    In shared mode the file is opened O_APPEND without a user-space buffer so several processes
+    can append to it safely. Each call's lines go out in one write() under an exclusive flock, so
+    appends from different processes never interleave. The size is read back from the descriptor after
+    each append (no stat), and rotation happens under the same lock so a file rotated by one process is
+    reopened by the others.
+    Handles are fork aware: the buffer is flushed before a fork and the child reopens the file on its
+    next write instead of sharing the parent's handle.
+    ARGS:
+        path: Path of the active log file
+        max_bytes: Rotate once the file would grow past this many bytes (default: 0, never rotate)
+        backup_count: Number of numbered backups to keep - path.1 is the newest (default: 5)
+        encoding: Text encoding for written content (default: "utf-8")
+        buffer_size: Size of the write buffer in bytes (default: 64KB)
+        index_interval: Records per side-index entry - 0 disables the index (default: 0)
+        shared: Multi-process safe appends as described above (default: False)
+    METHODS:
+        write(content): Append text, rotating first if the size limit would be crossed
+        write_lines(lines, entries): Append lines, recording (epoch, level) entries in the side index
+        flush(): Push buffered bytes to the OS
+        rotate(): Shift the numbered backups and start a fresh file
+        close(): Flush and close the handle - the next write reopens it
+    PROPERTIES:
+        size: Current size of the active file in bytes
+    """
+
+    def __init__(self, path, max_bytes: int = 0, backup_count: int = 5, encoding: str = "utf-8", buffer_size: int = 65536,
+                 index_interval: int = 0, shared: bool = False):
+        self.path = str(path)
+        self.max_bytes = max(0, int(max_bytes))
+        self.backup_count = max(0, int(backup_count))
+        self.encoding = encoding
+        self.buffer_size = buffer_size
+        self.index_interval = max(0, int(index_interval))
+        self.shared = shared
+        self.size = 0
+        self.__index = None
+
+        # The handle is opened lazily so closing is always safe, even between writes
+        self.__file = None
+        self.__fd = None
+        self.__lock = threading.RLock()
+        at_fork(before=self.__before_fork, after_in_parent=self.__after_fork_parent, after_in_child=self.__after_fork_child)
+
+    def __open(self):
+        # One stat per open, not per write
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        if self.shared:
+            self.__fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            self.size = os.fstat(self.__fd).st_size
+        else:
+            # Binary append mode so the byte count is exact
+            self.__file = open(self.path, "ab", buffering=self.buffer_size)
+            self.size = os.fstat(self.__file.fileno()).st_size
+        if self.index_interval:
+            self.__index = LogIndex(self.path, self.index_interval, shared=self.shared)
+
+    @property
+    def is_open(self) -> bool:
+        return self.__file is not None or self.__fd is not None
+
+    def write(self, content: str) -> int:
+        """
+        Append content to the file.
+        ARGS:
+            content: Text to append - usually one or more complete lines
+        RETURNS:
+            int: Number of bytes written
+        """
+        return self.write_lines([content])
+
+    def write_lines(self, lines: list, entries: list = None) -> int:
+        """
+        Append several lines in one write.
+        ARGS:
+            lines: Complete lines of text, newline included
+            entries: Optional (epoch, level) per line for the side index
+        RETURNS:
+            int: Number of bytes written
+        """
+        chunks = [line.encode(self.encoding) for line in lines]
+        total = sum(len(chunk) for chunk in chunks)
+        if self.__index is None and not self.index_interval:
+            entries = None
+
+        with self.__lock:
+            if not self.is_open:
+                self.__open()
+
+            # Rotate before the write so a single record never straddles two files
+            if self.max_bytes and self.size and self.size + total > self.max_bytes:
+                if self.shared:
+                    self.__rotate_shared()
+                else:
+                    self.rotate()
+
+            if self.shared:
+                self.__write_shared(chunks, entries)
+                return total
+
+            # Record where each line lands before the bytes go out
+            if self.__index is not None and entries:
+                offset = self.size
+                for chunk, (epoch, level) in zip(chunks, entries):
+                    self.__index.add(offset, len(chunk), epoch, level)
+                    offset += len(chunk)
+
+            self.__file.write(chunks[0] if len(chunks) == 1 else b"".join(chunks))
+            self.size += total
+        return total
+
+    def __write_shared(self, chunks: list, entries: list = None):
+        # One write() per call under the file lock - with O_APPEND the descriptor offset afterwards is the true end of file
+        if not chunks:
+            return
+        data = chunks[0] if len(chunks) == 1 else b"".join(chunks)
+
+        if fcntl is not None:
+            fcntl.flock(self.__fd, fcntl.LOCK_EX)
+        try:
+            written = 0
+            while written < len(data):
+                written += os.write(self.__fd, data[written:])
+            end = os.lseek(self.__fd, 0, os.SEEK_CUR)
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self.__fd, fcntl.LOCK_UN)
+
+        self.size = end
+        if self.__index is not None and entries and entries[0] is not None:
+            offset = end - len(data)
+            for chunk, (epoch, level) in zip(chunks, entries):
+                self.__index.add(offset, len(chunk), epoch, level)
+                offset += len(chunk)
+
+    def flush(self) -> None:
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.flush()
+
+    def rotate(self) -> None:
+        """
+        Rename path -> path.1 -> path.2 ... dropping anything past backup_count, then reopen.
+        """
+        with self.__lock:
+            self.close()
+            self.__shift_backups()
+            self.__open()
+
+    def __rotate_shared(self):
+        # Rotate under an exclusive lock - if another process got there first, just follow it to the new file
+        if fcntl is not None:
+            fcntl.flock(self.__fd, fcntl.LOCK_EX)
+        try:
+            try:
+                rotated_elsewhere = os.stat(self.path).st_ino != os.fstat(self.__fd).st_ino
+            except FileNotFoundError:
+                rotated_elsewhere = True
+            if not rotated_elsewhere:
+                self.__shift_backups()
+        finally:
+            # Closing the descriptor releases the lock
+            self.close()
+        self.__open()
+
+    def __shift_backups(self):
+        if self.backup_count > 0:
+            # Only the unbroken run of backups from .1 needs to move - stop looking at the first gap
+            last = 1
+            while last < self.backup_count and os.path.exists(f"{self.path}.{last}"):
+                last += 1
+
+            # Shift the existing backups up by one, oldest first - indexes travel with their files
+            for index in range(last - 1, 0, -1):
+                source = f"{self.path}.{index}"
+                self.__move(source, f"{self.path}.{index + 1}")
+            self.__move(self.path, f"{self.path}.1")
+        else:
+            # No backups wanted - just start again
+            for path in (self.path, index_path(self.path)):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    @staticmethod
+    def __move(source, target):
+        # Rename a log file and its side index if present
+        if not os.path.exists(source):
+            return
+        os.replace(source, target)
+        if os.path.exists(index_path(source)):
+            os.replace(index_path(source), index_path(target))
+        elif os.path.exists(index_path(target)):
+            # Never leave a stale index describing a different file
+            os.remove(index_path(target))
+
+    def close(self) -> None:
+        with self.__lock:
+            if self.__index is not None:
+                self.__index.close()
+                self.__index = None
+            if self.__fd is not None:
+                try:
+                    os.close(self.__fd)
+                finally:
+                    self.__fd = None
+            if self.__file is not None:
+                try:
+                    self.__file.close()
+                finally:
+                    self.__file = None
+
+    def __before_fork(self):
+        # Hold the lock across the fork so no write is half done, and leave nothing buffered to be written twice
+        self.__lock.acquire()
+        if self.__file is not None:
+            self.__file.flush()
+
+    def __after_fork_parent(self):
+        self.__lock.release()
+
+    def __after_fork_child(self):
+        # Drop the inherited handle - the buffer is empty, so closing only releases the child's descriptor
+        # The pending index block belongs to the parent and is dropped with it
+        self.__lock = threading.RLock()
+        if self.__index is not None:
+            self.__index.discard()
+            self.__index = None
+        if self.__fd is not None:
+            try:
+                os.close(self.__fd)
+            except OSError:
+                pass
+            self.__fd = None
+        if self.__file is not None:
+            try:
+                self.__file.close()
+            except OSError:
+                pass
+            self.__file = None
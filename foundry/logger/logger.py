@@ -4,41 +4,110 @@
 # Author: Luxforge
 # Modular logging setup for Python applications
 
+import signal
 import socket
-from pathlib import Path
-from datetime import datetime
-from time import sleep
+import sys
+import traceback
+from time import perf_counter_ns, sleep, strftime, time_ns
 import os
-from foundry.colours.colours import Colours
+import atexit
+import threading
+from collections import OrderedDict
+from itertools import count
+from foundry.logger.writer import AsyncWriter
+from foundry.logger.handles import RotatingFile
+from foundry.logger.timestamps import TimestampCache
+from foundry.logger.structured import build_record, format_record
+from foundry.logger.api_sink import ApiSink
+from foundry.logger.db_sink import DatabaseSink
+from foundry.logger.forking import at_fork
+from foundry.logger.context import TaskContext, current_task, task_tag
+from foundry.logger.throttle import RateLimiter, Deduplicator, parse_level_settings
+from foundry.logger.retention import Retention
+from foundry.logger.stats import LoggerStats
+from foundry.logger.console import Console
+from foundry.logger.ring import RingBuffer
+from foundry.logger.config import LoggerConfig
+
+# Code in this module is skipped when working out which call site logged a record
+_MODULE_FILE = sys._getframe(0).f_code.co_filename
 
 class Logger:
     """
     Logger sets up a standardized logging configuration.
     ARGS:
         name: Logger name (default: "luxforge")
-        env_path: Path to the .env file for configuration (default: None, uses ./logger.env)
+        env_path: Path to the .env file for configuration (default: None, uses foundry/logger.env) - KEY=value or KEY: value lines,
+                  overridden by the same names in the environment
     METHODS:
         info(msg): Log an info message
         warning(msg): Log a warning message
         error(msg): Log an error message
         debug(msg): Log a debug message
         exception(msg): Log an exception message
+        task(name): Switch the global task - records go to LOG_DIR/task/yyyy/yyyy-mm/yyyy-mm-dd/task_YYYYMMDD_HH00.log
+        task_context(name): Context manager / decorator tagging records with a task for the current thread or asyncio task only
+        set_rate_limit(level, rate, burst): Limit how fast each call site may log at a level - rate 0 removes the limit
+        set_deduplicate(levels, window): Choose the levels whose repeated records are collapsed
+        stats(): Records per level, bytes, write latency, retries, queue depth and drops so far
+        reset_stats(): Start the figures from zero
+        set_stats_summary(interval, level): Log a "Logger stats" line every interval seconds
+        set_ring(size, level): Keep the last records in memory, including levels not written anywhere
+        dump_ring(path, reason): Write the in-memory records to a file
+        reload_config(): Re-read logger.env and the environment and apply what changed
+        is_enabled_for(level): Cheap check for whether a level would be logged
+        set_async(enabled, queue_size, overflow): Toggle the background writer thread
+        flush(timeout): Wait for queued lines to reach disk
+        close(): Drain the background writer, close open log files and shut down sinks
+        add_sink(sink, level): Send structured records to an extra destination (API, database...)
+        remove_sink(sink): Stop sending records to a sink
     PROPERTIES:
         logger: The underlying logging.Logger instance
     ENVIRONMENT VARIABLES:
+        LOG_CONFIG_RELOAD_INTERVAL: Seconds between checks of logger.env for changes, 0 to read it once (default: 5)
+        TASK_NAME: Task at start-up (default: "init")
         LOG_DIR: Directory to store log files (default: "./logs")
         LOG_TO_FILE: Whether to log to a file (default: "True")
         LOG_TO_CONSOLE: Whether to log to console (default: "True")
         LOG_TO_API: Whether to log to API endpoints (default: "False")
         API_ENDPOINT: API endpoint URL (default: None)
         API_KEY: API key for authentication (default: None)
+        API_LOG_LEVEL: Minimum level sent to the API (default: "INFO")
+        API_BATCH_SIZE: Records per API request (default: 200)
+        API_BATCH_LATENCY: Seconds a partial batch may wait before it is sent (default: 2)
+        API_SPOOL_DIR: Where undeliverable batches are kept for replay (default: LOG_DIR/.api_spool)
+        API_SPOOL_MAX_MB: Most the spool may hold - the oldest batches are dropped beyond it, 0 for no limit (default: 100)
         LOG_TO_DB: Whether to log to a database (default: "False")
-        DB_CONNECTION_STRING: Database connection string (default: None)
-        LOGLEVEL: Logging level (default: "DEBUG")
+        DB_CONNECTION_STRING: Database connection string, e.g. sqlite:///logs/foundry.db (default: None)
+        DB_LOG_LEVEL: Minimum level stored in the database (default: "DEBUG")
+        DB_BATCH_SIZE: Records inserted per transaction (default: 1000)
+        DB_RETENTION_DAYS: Delete database rows older than this many days, 0 keeps everything (default: 0)
+        LOGLEVEL: Logging level, LOG_LEVEL works too (default: "DEBUG")
         DATE_FORMAT: Date format for timestamps (default: "%Y-%m-%d %H:%M:%S.%f")
         NUMBER_OF_DIGITS_AFTER_DECIMAL: Number of decimal digits in timestamps (default: 3)
         MAX_LOG_SIZE_MB: Maximum log file size in MB before rotation (default: 5)
         MAX_LOG_BACKUP_COUNT: Number of backup log files to keep (default: 5)
+        LOG_ASYNC: Write files from a background thread instead of the caller (default: "False")
+        LOG_QUEUE_SIZE: Maximum lines waiting for the background writer (default: 10000)
+        LOG_OVERFLOW_POLICY: What to do when the queue is full - block, drop_oldest or drop_new (default: "block")
+        LOG_FORMAT: File output format - "text" or "json" for one JSON object per line (default: "text")
+        LOG_INDEX_INTERVAL: Records per entry in the .idx side index written next to JSON log files, 0 disables it (default: 1000)
+        LOG_CONCURRENT: Several processes write the same task files - every record is one atomic append (default: "False")
+        LOG_MAX_OPEN_FILES: Task files kept open at once - the least recently used is closed past this (default: 32)
+        LOG_RATE_LIMIT: Records per second per call site, as LEVEL:rate[:burst] pairs or one number for every level (default: "off")
+        LOG_DEDUPLICATE: Levels whose identical records from one call site collapse into "repeated N times" (default: "off")
+        LOG_DEDUPLICATE_WINDOW: Seconds a run of repeats may be held back before its count is written (default: 30)
+        LOG_COMPRESS: Compress hourly files once their hour is over - "gzip", "lzma" or "none" (default: "none")
+        LOG_COMPRESS_AFTER: Seconds after an hour ends before its files are compressed (default: 300)
+        LOG_RETENTION_DAYS: Remove log partitions older than this many days, 0 keeps everything (default: 0)
+        LOG_MAX_TOTAL_MB: Remove the oldest days of logs until LOG_DIR fits, 0 for no limit (default: 0)
+        LOG_MAINTENANCE_INTERVAL: Seconds between compression and retention passes (default: 600)
+        LOG_CONSOLE_COLOUR: "auto" colours terminals only (and honours NO_COLOR), "true" or "false" force it (default: "auto")
+        LOG_RING_SIZE: Recent records kept in memory and dumped on a crash or SIGUSR1, 0 disables it (default: 0)
+        LOG_RING_LEVEL: Lowest level kept in memory - may be below LOGLEVEL (default: "DEBUG")
+        LOG_RING_DUMP_DIR: Where ring dumps are written (default: LOG_DIR/.dumps)
+        LOG_STATS_INTERVAL: Seconds between "Logger stats" summary lines, 0 for none (default: 0)
+        LOG_STATS_LEVEL: Level the summary lines are logged at (default: "INFO")
     """
     # Standard logging levels, can be expanded if needed - add colours 
     LEVELS = {
@@ -50,6 +119,33 @@ class Logger:
         "CRITICAL": (50, "red")
     }
 
+    # Level methods and their aliases - rebound to no-ops while their level is disabled
+    LEVEL_METHODS = {
+        "DEBUG": ("debug", "dbg", "d"),
+        "INFO": ("info", "i", "inf", "information"),
+        "WARNING": ("warning", "warn", "w"),
+        "ERROR": ("error", "err", "e", "exception", "exc", "ex"),
+        "CRITICAL": ("critical", "crit", "c"),
+    }
+
+    # Settings by what has to be redone when they change - applied in this order at start-up, and group by group on reload
+    SETTING_GROUPS = {
+        "paths": frozenset({"LOG_DIR", "DATE_FORMAT", "NUMBER_OF_DIGITS_AFTER_DECIMAL", "LOG_FORMAT", "LOG_INDEX_INTERVAL", "LOG_CONCURRENT"}),
+        "files": frozenset({"LOG_TO_FILE", "MAX_LOG_SIZE_MB", "MAX_LOG_BACKUP_COUNT", "LOG_MAX_OPEN_FILES"}),
+        "console": frozenset({"LOG_TO_CONSOLE", "LOG_CONSOLE_COLOUR", "NO_COLOR"}),
+        "throttle": frozenset({"LOG_RATE_LIMIT", "LOG_DEDUPLICATE", "LOG_DEDUPLICATE_WINDOW"}),
+        "level": frozenset({"LOGLEVEL", "LOG_LEVEL"}),
+        "ring": frozenset({"LOG_RING_SIZE", "LOG_RING_LEVEL", "LOG_RING_DUMP_DIR"}),
+        "async": frozenset({"LOG_ASYNC", "LOG_QUEUE_SIZE", "LOG_OVERFLOW_POLICY"}),
+        "api": frozenset({"LOG_TO_API", "API_ENDPOINT", "API_KEY", "API_LOG_LEVEL", "API_BATCH_SIZE", "API_BATCH_LATENCY", "API_SPOOL_DIR", "API_SPOOL_MAX_MB", "LOG_DIR"}),
+        "db": frozenset({"LOG_TO_DB", "DB_CONNECTION_STRING", "DB_LOG_LEVEL", "DB_BATCH_SIZE", "DB_RETENTION_DAYS"}),
+        "retention": frozenset({"LOG_COMPRESS", "LOG_COMPRESS_AFTER", "LOG_RETENTION_DAYS", "LOG_MAX_TOTAL_MB", "LOG_MAINTENANCE_INTERVAL", "LOG_DIR"}),
+        "stats": frozenset({"LOG_STATS_INTERVAL", "LOG_STATS_LEVEL"}),
+    }
+
+    # Level names as callers tend to pass them, resolved once instead of upper-casing per call
+    LEVEL_NAMES = {**{k: k for k in LEVELS}, **{k.lower(): k for k in LEVELS}, **{k.capitalize(): k for k in LEVELS}}
+
     def __init__(self, env_path=None):
         # Initialize logger settings using environment variables
         
@@ -76,48 +172,105 @@ class Logger:
             "max_log_size_mb": 5,
             "max_log_backup_count": 5,
             "task_name": "init",
+            "log_async": False,
+            "log_queue_size": 10000,
+            "log_overflow_policy": "block",
+            "log_format": "text",
+            "log_index_interval": 1000,
+            "log_concurrent": False,
+            "log_max_open_files": 32,
+            "log_rate_limit": "off",
+            "log_deduplicate": "off",
+            "log_deduplicate_window": 30,
+            "log_compress": "none",
+            "log_compress_after": 300,
+            "log_retention_days": 0,
+            "log_max_total_mb": 0,
+            "log_maintenance_interval": 600,
+            "log_stats_interval": 0,
+            "log_stats_level": "INFO",
+            "log_console_colour": "auto",
+            "log_ring_size": 0,
+            "log_ring_level": "DEBUG",
+            "log_ring_dump_dir": None,
+            "log_config_reload_interval": 5,
         }
 
         # Apply them to the class
         for var, default in self.local_vars.items():
             setattr(self, var, default)
 
-        # Load environment variables from the specified .env file if it exists - despite the name, we won't inject into environment
-        if os.path.exists(env_path):
-            # Load the .env file
-            for line in open(env_path):
-                # Skip comments and empty lines
-                if line.strip() and not line.startswith('#'):
+        # No background writer until async mode is requested
+        self.__writer = None
 
-                    # Load in the values
-                    key, value = line.strip().split('=', 1)
-                    self.__load_vars(key, value)
-        
-        # Create the dir if it does not exist
-        os.makedirs(self.log_dir, exist_ok=True)
+        # No archive maintenance until compression or retention is configured
+        self.__retention = None
 
-        # Set the base directory for logs
-        self.base_dir = self.log_dir
+        # What logging costs - queue figures of writers already stopped are carried over here
+        self.__stats = LoggerStats(self.LEVELS)
+        self.__queue_dropped = 0
+        self.__queue_peak = 0
+        self.__started_ns = time_ns()
 
-        # Read configuration from environment variables with defaults
-        self.date_format = os.getenv("DATE_FORMAT", "%Y-%m-%d %H:%M:%S.%f")
-        self.decimal_digits = int(os.getenv("NUMBER_OF_DIGITS_AFTER_DECIMAL", 3))
+        # No summary lines until an interval is set
+        self.__next_summary = float("inf")
+        self.__last_summary = (self.__started_ns, 0)
 
-        # Set the log to file and console flags
-        self.__log_to_file = os.getenv("LOG_TO_FILE", "True").lower() == "true"
-        self.__log_to_console = os.getenv("LOG_TO_CONSOLE", "True").lower() == "true"
+        # Extra destinations receiving structured records, as (minimum level, sink)
+        self.__sinks = []
 
-        # Set the log level
-        self.set_level(self.log_level)
-        # Update the actual log directory
-        self.__update_directory()
+        # No ring buffer until one is sized - records below the output level are then kept down to ring_level
+        self.__ring = None
+        self.__ring_level = float("inf")
+        self.__dump_hooks = None
+        self.__dump_numbers = count(1)
 
-        # Set the initial log filename
-        self.__update_filename()
-        
-        # Load max log size and backup settings
-        self.max_log_size = int(os.getenv("MAX_LOG_SIZE_MB", 5))
-        self.max_log_backup = int(os.getenv("MAX_LOG_BACKUP_COUNT", 5))
+        # Nothing is throttled until the settings are read - the first lines are always written
+        self.__limiter = RateLimiter()
+        self.__dedup = Deduplicator()
+        self.__repeats_timer = None
+
+        # Open log file handles keyed by path, least recently used first - kept open between writes
+        self.__handles = OrderedDict()
+
+        # File path per task for the current hour, so switching tasks costs a dict lookup
+        self.__paths = {}
+        self.__handles_lock = threading.Lock()
+
+        # Held while a record is written and while settings are re-applied - a reload never swaps the clock,
+        # handles, writer or sinks out from under a record half way through. Re-entrant: applying settings logs too
+        self.__config_lock = threading.RLock()
+        atexit.register(self.close)
+
+        # Forked children start with their own lock - handles, writer and sinks reset themselves
+        at_fork(after_in_child=self.__after_fork_child)
+
+        # One configuration layer - logger.env with the environment on top, parsed once and cached by mtime
+        self.config = LoggerConfig(env_path)
+        self.task_name = self.config.get("TASK_NAME", self.task_name)
+        self.__config_sinks = {}
+
+        # Apply every group of settings - the same methods re-apply a group when its settings change
+        self.__setting_groups = [
+            (self.SETTING_GROUPS["paths"], self.__apply_paths),
+            (self.SETTING_GROUPS["files"], self.__apply_files),
+            (self.SETTING_GROUPS["console"], self.__apply_console),
+            (self.SETTING_GROUPS["throttle"], self.__apply_throttle),
+            (self.SETTING_GROUPS["level"], self.__apply_level),
+            (self.SETTING_GROUPS["ring"], self.__apply_ring),
+            (self.SETTING_GROUPS["async"], self.__apply_async),
+            (self.SETTING_GROUPS["api"], self.__apply_api),
+            (self.SETTING_GROUPS["db"], self.__apply_db),
+            (self.SETTING_GROUPS["retention"], self.__apply_retention),
+            (self.SETTING_GROUPS["stats"], self.__apply_stats),
+        ]
+        for _, apply in self.__setting_groups:
+            apply()
+
+        # Pick up edits to logger.env while running
+        self.log_config_reload_interval = self.config.get_float("LOG_CONFIG_RELOAD_INTERVAL", self.log_config_reload_interval)
+        if self.log_config_reload_interval > 0 and os.path.exists(env_path):
+            self.config.watch(self.__reload_config, self.log_config_reload_interval)
 
         # Post a log entry indicating initialization
         self.i(f"Logger initialized for node '{self.node}' by user '{self.user}'")
@@ -126,131 +279,794 @@ class Logger:
         # Show the current taskname
         self.task(self.task_name)
 
-    def __load_vars(self,k,v):
-        # Tie an environment variable to a class attribute with type conversion - ignore if not in our list
-        k = k.lower()
-        if k in self.local_vars:
-            if v.lower() in ["true", "false"]:
-                self[k] = v.lower() == "true"
-            elif v.isdigit():
-                self[k] = int(v)
-            else:
-                try:
-                    self[k] = float(v)
-                except ValueError:
-                    setattr(self, k, v)
-            
-            # Apply this to dev only
-            print(f"[FoundryLogger] Set {k} to {getattr(self, k)}")
-
-    def __write(self, path, content, retries=3, timeout=1, encoding="utf-8"):
+    def reload_config(self) -> set:
+        """
+        Re-read logger.env and the environment now, applying whatever changed - the watcher thread does this every LOG_CONFIG_RELOAD_INTERVAL seconds.
+        RETURNS:
+            set: Names of the settings that changed
+        """
+        changed = self.config.reload()
+        if changed:
+            self.__reload_config(changed)
+        return changed
+
+    def __reload_config(self, changed):
+        # Re-apply only the groups touched by the change - records being written finish first, new ones wait
+        applied = set()
+        with self.__config_lock:
+            for keys, apply in self.__setting_groups:
+                if changed & keys:
+                    try:
+                        apply()
+                        applied |= changed & keys
+                    except Exception as e:
+                        print(f"[FoundryLogger] Could not apply {', '.join(sorted(changed & keys))}: {e}")
+        if applied:
+            self.i("Configuration reloaded - %s changed", ", ".join(sorted(applied)))
+
+    def __apply_paths(self):
+        # Where files go and how lines look - open files are released so the next line picks the change up
+        self.base_dir = self.config.get("LOG_DIR", self.local_vars["log_dir"])
+        self.date_format = self.config.get("DATE_FORMAT", self.local_vars["date_format"])
+        self.decimal_digits = self.config.get_int("NUMBER_OF_DIGITS_AFTER_DECIMAL", self.local_vars["number_of_digits_after_decimal"])
+        self.log_format = self.config.get("LOG_FORMAT", self.local_vars["log_format"]).lower()
+        self.log_index_interval = self.config.get_int("LOG_INDEX_INTERVAL", self.local_vars["log_index_interval"])
+
+        # Open files for multi-process appends instead of private buffered handles
+        self.log_concurrent = self.config.get_bool("LOG_CONCURRENT", self.local_vars["log_concurrent"])
+
+        # Cache the rendered timestamp per second and the date partition per hour
+        self.__clock = TimestampCache(self.date_format, self.decimal_digits)
+        self.__roll_over()
+
+    def __apply_files(self):
+        # Rotation and open file limits only apply to newly opened files - release the open ones
+        self.log_to_file = self.config.get_bool("LOG_TO_FILE", self.local_vars["log_to_file"])
+        self.max_log_size = self.config.get_float("MAX_LOG_SIZE_MB", self.local_vars["max_log_size_mb"])
+        self.max_log_backup = self.config.get_int("MAX_LOG_BACKUP_COUNT", self.local_vars["max_log_backup_count"])
+
+        # Cap on open task files - each task context keeps its file open until it is the least recently used
+        self.log_max_open_files = max(1, self.config.get_int("LOG_MAX_OPEN_FILES", self.local_vars["log_max_open_files"]))
+        self.__close_handles()
+
+    def __apply_console(self):
+        # Console writer - plain, buffered text unless stdout is a terminal
+        self.log_to_console = self.config.get_bool("LOG_TO_CONSOLE", self.local_vars["log_to_console"])
+        self.log_console_colour = self.config.get("LOG_CONSOLE_COLOUR", self.local_vars["log_console_colour"]).lower()
+        colour = {"true": True, "always": True, "false": False, "never": False}.get(self.log_console_colour, "auto")
+        self.__console = Console(self.LEVELS, colour=colour)
+
+    def __apply_throttle(self):
+        # Hold noisy call sites to a rate and collapse repeated records, per level
+        self.log_rate_limit = self.config.get("LOG_RATE_LIMIT", self.local_vars["log_rate_limit"])
+        self.log_deduplicate = self.config.get("LOG_DEDUPLICATE", self.local_vars["log_deduplicate"])
+        self.log_deduplicate_window = self.config.get_float("LOG_DEDUPLICATE_WINDOW", self.local_vars["log_deduplicate_window"])
+        self.__limiter = RateLimiter(parse_level_settings(self.log_rate_limit, self.LEVELS, default=(0,)))
+        self.__drain_repeats()
+        self.set_deduplicate(parse_level_settings(self.log_deduplicate, self.LEVELS, default=()), self.log_deduplicate_window)
+
+    def __apply_level(self):
+        # LOGLEVEL, or LOG_LEVEL as the other settings are spelt
+        self.log_level = self.config.get("LOGLEVEL", self.config.get("LOG_LEVEL", self.local_vars["log_level"]))
+        self.set_level(self.log_level)
+
+    def __apply_ring(self):
+        # Keep recent records in memory, ready to dump when something goes wrong
+        self.log_ring_level = self.config.get("LOG_RING_LEVEL", self.local_vars["log_ring_level"])
+        self.log_ring_dump_dir = self.config.get("LOG_RING_DUMP_DIR", self.local_vars["log_ring_dump_dir"])
+        size = self.config.get_int("LOG_RING_SIZE", self.local_vars["log_ring_size"])
+        if size > 0 or self.log_ring_size:
+            self.set_ring(size, self.log_ring_level)
+
+    def __apply_async(self):
+        # Optionally hand file writes to a background thread - restarting it drains what is queued first
+        self.log_queue_size = self.config.get_int("LOG_QUEUE_SIZE", self.local_vars["log_queue_size"])
+        self.log_overflow_policy = self.config.get("LOG_OVERFLOW_POLICY", self.local_vars["log_overflow_policy"])
+        enabled = self.config.get_bool("LOG_ASYNC", self.local_vars["log_async"])
+        if enabled or self.__writer is not None:
+            self.set_async(enabled)
+        self.log_async = enabled
+
+    def __replace_sink(self, name, sink, level):
+        # Swap the sink a setting group owns - the old one delivers what it holds before closing
+        old = self.__config_sinks.pop(name, None)
+        if old is not None:
+            self.remove_sink(old)
+            try:
+                old.close()
+            except Exception as e:
+                print(f"[FoundryLogger] Failed to close sink {old!r}: {e}")
+        if sink is not None:
+            self.__config_sinks[name] = self.add_sink(sink, level=level)
+
+    def __apply_api(self):
+        # Ship records to an HTTP endpoint if configured
+        self.log_to_api = self.config.get_bool("LOG_TO_API", self.local_vars["log_to_api"])
+        self.api_endpoint = self.config.get("API_ENDPOINT", self.local_vars["api_endpoint"])
+        self.api_key = self.config.get("API_KEY", self.local_vars["api_key"])
+        sink = None
+        if self.log_to_api and self.api_endpoint:
+            try:
+                sink = ApiSink(
+                    self.api_endpoint,
+                    api_key=self.api_key,
+                    batch_size=self.config.get_int("API_BATCH_SIZE", 200),
+                    max_latency=self.config.get_float("API_BATCH_LATENCY", 2),
+                    spool_dir=self.config.get("API_SPOOL_DIR", os.path.join(self.base_dir, ".api_spool")),
+                    max_spool_mb=self.config.get_float("API_SPOOL_MAX_MB", 100),
+                )
+            except ValueError as e:
+                print(f"[FoundryLogger] API logging disabled: {e}")
+        self.__replace_sink("api", sink, self.config.get("API_LOG_LEVEL", "INFO"))
+
+    def __apply_db(self):
+        # Store records in a database if configured - SQLite for now
+        self.log_to_db = self.config.get_bool("LOG_TO_DB", self.local_vars["log_to_db"])
+        self.db_connection_string = self.config.get("DB_CONNECTION_STRING", self.local_vars["db_connection_string"])
+        sink = None
+        if self.log_to_db and self.db_connection_string:
+            try:
+                sink = DatabaseSink(
+                    self.db_connection_string,
+                    batch_size=self.config.get_int("DB_BATCH_SIZE", 1000),
+                    retention_days=self.config.get_float("DB_RETENTION_DAYS", 0),
+                )
+            except ValueError as e:
+                print(f"[FoundryLogger] Database logging disabled: {e}")
+        self.__replace_sink("db", sink, self.config.get("DB_LOG_LEVEL", "DEBUG"))
+
+    def __apply_retention(self):
+        # Compress finished hours and prune old days in the background if configured - forked children leave it to the parent
+        self.log_compress = self.config.get("LOG_COMPRESS", self.local_vars["log_compress"])
+        self.log_compress_after = self.config.get_float("LOG_COMPRESS_AFTER", self.local_vars["log_compress_after"])
+        self.log_retention_days = self.config.get_float("LOG_RETENTION_DAYS", self.local_vars["log_retention_days"])
+        self.log_max_total_mb = self.config.get_float("LOG_MAX_TOTAL_MB", self.local_vars["log_max_total_mb"])
+        self.log_maintenance_interval = self.config.get_float("LOG_MAINTENANCE_INTERVAL", self.local_vars["log_maintenance_interval"])
+
+        old, self.__retention = self.__retention, None
+        if old is not None:
+            old.stop()
+        try:
+            retention = Retention(
+                self.base_dir,
+                compress=self.log_compress,
+                compress_after=self.log_compress_after,
+                max_age_days=self.log_retention_days,
+                max_size_mb=self.log_max_total_mb,
+                interval=self.log_maintenance_interval,
+            )
+            if retention.enabled:
+                self.__retention = retention
+                retention.start()
+        except ValueError as e:
+            print(f"[FoundryLogger] Log maintenance disabled: {e}")
+
+    def __apply_stats(self):
+        # Optionally log a summary of the logger's own figures every so often
+        self.log_stats_interval = self.config.get_float("LOG_STATS_INTERVAL", self.local_vars["log_stats_interval"])
+        self.log_stats_level = self.config.get("LOG_STATS_LEVEL", self.local_vars["log_stats_level"])
+        self.set_stats_summary(self.log_stats_interval, self.log_stats_level)
+
+    def __handle(self, path, encoding="utf-8") -> RotatingFile:
+        # Fetch the open handle for a log file, creating it on first use and marking it most recently used.
+        # Callers hold __handles_lock for as long as they use the handle, so it cannot be closed under them
+        handle = self.__handles.get(path)
+        if handle is not None:
+            self.__handles.move_to_end(path)
+            return handle
+
+        handle = RotatingFile(
+            path,
+            max_bytes=int(self.max_log_size * 1024 * 1024),
+            backup_count=self.max_log_backup,
+            encoding=encoding,
+            index_interval=self.log_index_interval if self.log_format == "json" else 0,
+            shared=self.log_concurrent,
+        )
+        self.__handles[path] = handle
+
+        # Too many files open - close the least recently used, it reopens if written to again
+        while len(self.__handles) > self.log_max_open_files:
+            _, oldest = self.__handles.popitem(last=False)
+            oldest.close()
+        return handle
+
+    def __close_handles(self):
+        # Close every open handle - queued or later lines simply reopen their files
+        with self.__handles_lock:
+            while self.__handles:
+                _, handle = self.__handles.popitem(last=False)
+                handle.close()
+
+    def __after_fork_child(self):
+        # The parent's locks may have been held mid-fork by a thread the child does not have
+        self.__handles_lock = threading.Lock()
+        self.__config_lock = threading.RLock()
+
+        # The child counts its own records from here
+        self.__stats.after_fork()
+        self.__repeats_timer = None
+        self.__queue_dropped = self.__queue_peak = 0
+        self.__started_ns = time_ns()
+        self.__last_summary = (self.__started_ns, 0)
+
+    def __write(self, path, content, retries=3, timeout=1, encoding="utf-8", flush=True, entries=None):
+        # Content is a string or a list of lines - entries are (epoch, level) per line for the side index
+        lines = content if isinstance(content, list) else [content]
         for attempt in range(retries):
             try:
-                with open(path, "a", encoding=encoding) as f:
-                    f.write(content)
+                started = perf_counter_ns()
+                with self.__handles_lock:
+                    handle = self.__handle(path, encoding)
+                    written = handle.write_lines(lines, entries)
+                    if flush:
+                        handle.flush()
+                self.__stats.wrote(written, perf_counter_ns() - started)
                 return True
             except Exception as e:
                 print(f"[luxforgeLogger] Write failed (attempt {attempt+1}): {e}")
+                if attempt + 1 < retries:
+                    self.__stats.retried()
+
+                # Evict the handle so the next attempt reopens the file from scratch and tracks it again
+                with self.__handles_lock:
+                    handle = self.__handles.pop(path, None)
+                    if handle is not None:
+                        try:
+                            handle.close()
+                        except Exception:
+                            pass
                 sleep(timeout)
+        self.__stats.failed()
         return False
 
-    def __update_filename(self):
+    def __write_batch(self, batch):
+        # Writer thread sink - group consecutive lines for the same file into a single write
+        touched = set()
+        start = 0
+        while start < len(batch):
+            path = batch[start][0]
+            end = start
+            while end < len(batch) and batch[end][0] == path:
+                end += 1
 
-        # Set the timestamped log filename based on current task and time - it returns YYYYMMDD_HH00
-        timestamp = datetime.now().strftime("%Y%m%d_%H00")
+            # Leave the bytes in the buffer - flushed once per batch below
+            group = batch[start:end]
+            entries = [entry for _, _, entry in group]
+            if None in entries:
+                entries = None
+            self.__write(path, [line for _, line, _ in group], retries=5, timeout=1, encoding="utf-8", flush=False, entries=entries)
+            touched.add(path)
+            start = end
 
-        # Update the log dir - just in case
-        self.__update_directory()
+        with self.__handles_lock:
+            for path in touched:
+                handle = self.__handles.get(path)
+                if handle is None:
+                    continue
+                try:
+                    handle.flush()
+                except Exception as e:
+                    print(f"[FoundryLogger] Flush failed for {path}: {e}")
+                    self.__handles.pop(path, None)
+                    try:
+                        handle.close()
+                    except Exception:
+                        pass
 
-        # Create a safe task tag for the filename
-        task_tag = self.task_name.replace(" ", "_") if self.task_name else "untagged"
-        self.filename = os.path.join(self.log_dir, f"{task_tag}_{timestamp}.log")
-    
-    def __update_directory(self):
+    def set_async(self, enabled: bool = True, queue_size: int = None, overflow: str = None) -> None:
+        """
+        Turn the background writer on or off.
+        ARGS:
+            enabled: Whether file writes should go through the writer thread
+            queue_size: Maximum lines waiting to be written (default: LOG_QUEUE_SIZE)
+            overflow: Policy when the queue is full - block, drop_oldest or drop_new (default: LOG_OVERFLOW_POLICY)
+        """
+        with self.__config_lock:
+            if queue_size is not None:
+                self.log_queue_size = int(queue_size)
+            if overflow is not None:
+                self.log_overflow_policy = overflow
+
+            # Always drain the current writer first so lines stay in order
+            self.__stop_writer()
+            self.log_async = enabled
+            if enabled:
+                self.__writer = AsyncWriter(
+                    self.__write_batch,
+                    max_queue=self.log_queue_size,
+                    overflow=self.log_overflow_policy,
+                )
+
+    def __stop_writer(self, timeout: float = 5.0) -> None:
+        # Drain and stop the background writer - later lines are written synchronously
+        writer, self.__writer = self.__writer, None
+        if writer is not None:
+            writer.close(timeout)
+            self.__queue_dropped += writer.dropped
+            self.__queue_peak = max(self.__queue_peak, writer.peak)
+
+    def add_sink(self, sink, level=None):
+        """
+        Send every record at or above a level to an extra destination.
+        ARGS:
+            sink: Object with emit(record), flush(timeout) and close(timeout) - emit must not block
+            level: Minimum level name or number (default: every record the logger writes)
+        RETURNS:
+            The sink, for chaining
+        """
+        min_level = level if isinstance(level, int) else (self.LEVELS[self.__resolve_level(level)][0] if level else 0)
+        self.__sinks = self.__sinks + [(min_level, sink)]
+        return sink
+
+    def remove_sink(self, sink) -> None:
+        # Detach a sink without closing it
+        self.__sinks = [(lvl, s) for lvl, s in self.__sinks if s is not sink]
+
+    def set_rate_limit(self, level, rate: float, burst: float = None) -> None:
+        """
+        Limit how many records a second each call site may log at a level. Dropped records are counted
+        and the count is appended to the next record that site gets through.
+        ARGS:
+            level: Level name or number
+            rate: Records per second per call site - 0 or None removes the limit
+            burst: Records a site may log in a quick burst before the rate applies (default: rate)
+        """
+        self.__limiter.set_limit(self.__resolve_level(level), rate, burst)
+
+    def set_deduplicate(self, levels, window: float = None) -> None:
+        """
+        Collapse repeated identical records from the same call site into "Last message repeated N more times".
+        ARGS:
+            levels: Level names to collapse - empty turns collapsing off
+            window: Seconds a run may be held back before its count is written (default: LOG_DEDUPLICATE_WINDOW)
+        """
+        self.__drain_repeats()
+        if window is not None:
+            self.log_deduplicate_window = float(window)
+        self.__dedup = Deduplicator({self.__resolve_level(level) for level in levels}, self.log_deduplicate_window)
+
+    def __arm_repeats(self):
+        # A held-back count goes out within the window even if its site never logs again
+        if self.__repeats_timer is not None:
+            return
+        timer = threading.Timer(max(0.05, self.log_deduplicate_window), self.__repeats_due)
+        timer.daemon = True
+        self.__repeats_timer = timer
+        timer.start()
+
+    def __repeats_due(self):
+        self.__repeats_timer = None
+        self.__drain_repeats()
+
+    def __drain_repeats(self):
+        # Write out the counts of any runs still being collapsed
+        for summary in self.__dedup.drain():
+            self.__emit_repeats(summary)
+
+    def __emit_repeats(self, summary):
+        # One line standing in for the collapsed repeats, written where the original went
+        (task, level, message), count = summary
+        self.__emit(f"Last message repeated {count} more time{'s' if count != 1 else ''}: {message}", level, {"repeated": count}, task, time_ns())
+
+    def flush(self, timeout: float = None) -> bool:
+        # Wait for queued lines to reach disk and sinks to deliver - no-op when everything is synchronous
+        self.__drain_repeats()
+        self.__console.flush()
+        done = True
+        if self.__writer is not None:
+            done = self.__writer.flush(timeout)
+        for _, sink in self.__sinks:
+            done = sink.flush(timeout) and done
+        return done
+
+    def close(self, timeout: float = 5.0) -> None:
+        # Drain everything, close files and sinks - later lines are written synchronously and reopen their files
+        timer, self.__repeats_timer = self.__repeats_timer, None
+        if timer is not None:
+            timer.cancel()
+        self.__drain_repeats()
+        self.config.stop(timeout)
+        if self.__retention is not None:
+            self.__retention.stop(timeout)
+        self.__stop_writer(timeout)
+        self.__close_handles()
+        self.__console.flush()
+        sinks, self.__sinks = self.__sinks, []
+        for _, sink in sinks:
+            try:
+                sink.close(timeout)
+            except Exception as e:
+                print(f"[FoundryLogger] Failed to close sink {sink!r}: {e}")
+
+    def stats(self) -> dict:
+        """
+        Snapshot of what logging has cost since the logger started or reset_stats() was called.
+        RETURNS:
+            dict: records per level, bytes, writes and write latency (p50/p99 in microseconds), retries, failed writes,
+                  queue depth, peak and dropped records, records rate limited or collapsed, sink errors and per-sink figures
+        """
+        snapshot = self.__stats.snapshot()
+        writer = self.__writer
+        snapshot["uptime_s"] = (time_ns() - self.__started_ns) / 1_000_000_000
+        snapshot["queue"] = {
+            "depth": writer.depth if writer is not None else 0,
+            "peak": max(self.__queue_peak, writer.peak if writer is not None else 0),
+            "dropped": self.__queue_dropped + (writer.dropped if writer is not None else 0),
+        }
 
-        # Rebuild the log directory path based on base_dir / task / yyyy / yyyy-mm / yyyy-mm-dd
-        year_path = datetime.now().strftime("%Y")
-        month_path = datetime.now().strftime("%Y-%m")
-        day_path = datetime.now().strftime("%Y-%m-%d")
-        date_path = os.path.join(year_path, month_path, day_path)
-        self.log_dir = os.path.join(self.base_dir, self.task_name, date_path)
+        # Sinks keep their own delivery counts
+        snapshot["sinks"] = [
+            {"sink": type(sink).__name__, **{k: getattr(sink, k) for k in ("sent", "failed", "dropped") if hasattr(sink, k)}}
+            for _, sink in self.__sinks
+        ]
+        return snapshot
 
-        # Ensure the log directory exists
-        os.makedirs(self.log_dir, exist_ok=True)
+    def reset_stats(self) -> None:
+        # Start counting from zero - e.g. just before an action being measured
+        self.__stats.reset()
+        writer = self.__writer
+        self.__queue_peak = 0
+        self.__queue_dropped = -writer.dropped if writer is not None else 0
+        if writer is not None:
+            writer.peak = writer.depth
+        self.__started_ns = time_ns()
+        self.__last_summary = (self.__started_ns, 0)
+
+    def set_stats_summary(self, interval: float, level=None) -> None:
+        """
+        Log a "Logger stats" line every so often - the line carries the full stats() snapshot as extra["stats"].
+        ARGS:
+            interval: Seconds between summaries, 0 to stop them
+            level: Level the summary is logged at (default: LOG_STATS_LEVEL)
+        """
+        self.log_stats_interval = max(0.0, float(interval or 0))
+        if level is not None:
+            self.log_stats_level = self.__resolve_level(level)
+        self.__next_summary = time_ns() + int(self.log_stats_interval * 1_000_000_000) if self.log_stats_interval else float("inf")
+
+    def __summarize(self, now):
+        # One line of the figures that matter for sizing volumes - counted like any other record
+        self.__next_summary = now + int(self.log_stats_interval * 1_000_000_000)
+        level = self.__resolve_level(self.log_stats_level)
+        if self.LEVELS[level][0] < self.__level[0]:
+            return
+
+        snapshot = self.stats()
+        total = snapshot["total_records"]
+        last_ns, last_total = self.__last_summary
+        self.__last_summary = (now, total)
+        rate = (total - last_total) / max((now - last_ns) / 1_000_000_000, 0.001)
+
+        latency, queue = snapshot["write_latency_us"], snapshot["queue"]
+        levels = ", ".join(f"{name} {count}" for name, count in snapshot["records"].items() if count)
+        message = (
+            f"Logger stats: {total} records ({levels}), {rate:.1f}/s since last summary, "
+            f"{snapshot['bytes'] / 1048576:.2f} MB in {snapshot['writes']} writes, "
+            f"write p50 {latency['p50']:.0f}us p99 {latency['p99']:.0f}us, {snapshot['retries']} retries, "
+            f"queue {queue['depth']} (peak {queue['peak']}, {queue['dropped']} dropped), "
+            f"{snapshot['rate_limited']} rate limited, {snapshot['collapsed']} collapsed"
+        )
+        self.__emit(message, level, {"stats": snapshot}, current_task.get() or self.task_name, now)
+
+    def set_ring(self, size: int, level=None) -> None:
+        """
+        Keep the last records in memory - dumped to a file on an unhandled exception, on SIGUSR1 or by dump_ring().
+        Records below the output level are kept unformatted, so running at INFO with a DEBUG ring costs no disk I/O.
+        ARGS:
+            size: Records kept, 0 to turn the ring off
+            level: Lowest level kept (default: LOG_RING_LEVEL)
+        """
+        if level is not None:
+            self.log_ring_level = self.__resolve_level(level)
+        self.log_ring_size = max(0, int(size))
+
+        if self.log_ring_size:
+            self.__ring = RingBuffer(self.log_ring_size)
+            self.__ring_level = self.LEVELS[self.__resolve_level(self.log_ring_level)][0]
+            self.__install_dump_hooks()
+        else:
+            self.__ring_level = float("inf")
+            self.__ring = None
+
+        # Rebind the level methods for the new threshold
+        self.level = self.__level
+
+    def dump_ring(self, path: str = None, reason: str = "on demand", exc_info: tuple = None) -> str:
+        """
+        Write the records held in the ring to a file, oldest first. Safe to call from a signal handler - no locks are taken.
+        ARGS:
+            path: File to write (default: LOG_RING_DUMP_DIR/ring_<time>_<pid>_<n>.log)
+            reason: Why the dump was taken - written at the top
+            exc_info: (type, value, traceback) to append, if the dump is for an exception
+        RETURNS:
+            str: Path written, or None if there is no ring or the dump failed
+        """
+        ring = self.__ring
+        if ring is None:
+            return None
+        records = ring.items()
+
+        # A clock of our own - the shared one may be mid-update on another thread
+        clock = TimestampCache(self.date_format, self.decimal_digits)
+        if path is None:
+            dump_dir = self.log_ring_dump_dir or os.path.join(self.base_dir, ".dumps")
+            path = os.path.join(dump_dir, f"ring_{strftime('%Y%m%d_%H%M%S')}_{os.getpid()}_{next(self.__dump_numbers)}.log")
+
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(f"# Ring dump ({reason}) - last {len(records)} of {ring.total} records on {self.node}, pid {os.getpid()}\n")
+                for now, level, task, message, args in records:
+                    try:
+                        text = self.__render(message, args)
+                    except Exception as e:
+                        text = f"{message!r} (could not format: {e})"
+                    f.write(f"[{clock.render(now)}] [{self.node}] [{level}] [{task}] {text}\n")
+                if exc_info is not None:
+                    f.write("".join(traceback.format_exception(*exc_info)))
+        except OSError as e:
+            print(f"[FoundryLogger] Could not dump the ring buffer to {path}: {e}")
+            return None
+        return path
+
+    def __install_dump_hooks(self):
+        # Chain onto the exception hooks and SIGUSR1 once - the hooks do nothing while the ring is off
+        if self.__dump_hooks is not None:
+            return
+        self.__dump_hooks = {"excepthook": sys.excepthook, "threading": threading.excepthook, "signal": None}
+        sys.excepthook = self.__excepthook
+        threading.excepthook = self.__thread_excepthook
+
+        if hasattr(signal, "SIGUSR1"):
+            try:
+                self.__dump_hooks["signal"] = signal.signal(signal.SIGUSR1, self.__signal_dump)
+            except ValueError:
+                # Signal handlers can only be set from the main thread
+                print("[FoundryLogger] Ring dumps on SIGUSR1 need the logger to start on the main thread")
+
+    def __dump_for(self, reason, exc_info=None):
+        path = self.dump_ring(reason=reason, exc_info=exc_info)
+        if path:
+            print(f"[FoundryLogger] Recent records written to {path}", file=sys.stderr)
+
+    def __excepthook(self, exc_type, exc, tb):
+        # A Ctrl+C is not a crash
+        if not issubclass(exc_type, KeyboardInterrupt):
+            self.__dump_for(f"unhandled {exc_type.__name__}", (exc_type, exc, tb))
+        self.__dump_hooks["excepthook"](exc_type, exc, tb)
+
+    def __thread_excepthook(self, args):
+        if not issubclass(args.exc_type, SystemExit):
+            name = args.thread.name if args.thread is not None else "thread"
+            self.__dump_for(f"unhandled {args.exc_type.__name__} in {name}", (args.exc_type, args.exc_value, args.exc_traceback))
+        self.__dump_hooks["threading"](args)
+
+    def __signal_dump(self, signum, frame):
+        self.__dump_for("SIGUSR1")
+        previous = self.__dump_hooks["signal"]
+        if callable(previous):
+            previous(signum, frame)
+
+    def __update_filename(self):
+        # Point filename and log_dir at the global task's file for the current hour
+        self.filename = self.__task_path(self.task_name)
+        self.log_dir = os.path.dirname(self.filename)
+
+    def __task_path(self, task: str) -> str:
+        # base_dir / task / yyyy / yyyy-mm / yyyy-mm-dd / task_YYYYMMDD_HH00.log - the directory is created when the file is first opened
+        path = self.__paths.get(task)
+        if path is None:
+            date_path, timestamp = self.__clock.partition()
+
+            # One safe spelling for the directory and the file name, the same one task contexts use
+            tag = task_tag(task)
+            path = self.__paths[task] = os.path.join(self.base_dir, tag, date_path, f"{tag}_{timestamp}.log")
+        return path
+
+    def __roll_over(self):
+        # The hour changed - forget last hour's paths and release its files, queued lines simply reopen them
+        self.__clock.partition()
+        self.__paths = {}
+        self.__close_handles()
+        self.__update_filename()
 
     def task(self, task_name: str = None) -> str:
         # Method to set or get the current task name
         if task_name:
             self.i(f"Switching task from '{self.task_name}' to '{task_name}'")
-            self.task_name = task_name
+            self.task_name = task_tag(task_name)
             # Update the filename to reflect the new task
             self.__update_filename()
-            self.__update_directory()
         else:
             self.i(f"Set task to: {self.task_name}")
         return self.task_name
 
-    def __formatted_timestamp(self) -> str:
+    def task_context(self, task_name: str) -> TaskContext:
+        """
+        Tag records with a task for the current thread or asyncio task only - the global task is untouched.
+        ARGS:
+            task_name: Task whose files the records are routed to
+        RETURNS:
+            TaskContext: Use as `with logger.task_context("export"):` or as a decorator on functions and coroutines
+        """
+        return TaskContext(task_name)
+
+    @property
+    def current_task(self) -> str:
+        # Task records logged right now would be tagged with - the context's task, else the global one
+        return current_task.get() or self.task_name
+
+    def __formatted_timestamp(self, now_ns: int = None) -> str:
         # Return the current timestamp formatted according to date_format and decimal_digits
-        raw = datetime.now().strftime(self.date_format)
-        if "%f" in self.date_format:
-            split = raw.split(".")
-            if len(split) == 2:
-                micro = split[1][:self.decimal_digits]
-                return f"{split[0]}.{micro}"
-        return raw
-
-    def log(self, message, level: str = None):
-        # General logging method - logs if level is >= current level
+        return self.__clock.render(now_ns)
+
+    def __resolve_level(self, level) -> str:
+        # Turn whatever the caller passed into a LEVELS key - defaults to INFO if unknown
         if level is None:
-            level = "INFO" # Default to INFO if no level provided
-        else:
-            level = level.upper()
-            if level not in self.LEVELS:
-                level = "INFO"  # Default to INFO if unknown level
-        level_int = self.LEVELS[level][0]
+            return "INFO"
+        name = self.LEVEL_NAMES.get(level)
+        if name is None:
+            name = level.upper() if isinstance(level, str) else self.__find_by_level(level)
+            if name not in self.LEVELS:
+                name = "INFO"
+        return name
+
+    def is_enabled_for(self, level) -> bool:
+        """
+        Check whether a level would currently be logged - use to guard expensive debug work.
+        ARGS:
+            level: Level name ("DEBUG") or numeric value (10)
+        RETURNS:
+            bool: True if records at this level are written
+        """
+        if isinstance(level, int):
+            return level >= self.__level[0]
+        return self.LEVELS[self.__resolve_level(level)][0] >= self.__level[0]
+    isEnabledFor = is_enabled_for # Alias matching the standard library
+
+    def log(self, message, level: str = None, *args, extra: dict = None):
+        """
+        Log a message if its level is enabled.
+        ARGS:
+            message: Text, a %-style format string used with args, or a callable returning the text
+            level: Level name (default: INFO)
+            args: Values for a %-style message - only formatted when the level is enabled
+            extra: Additional fields carried by structured (LOG_FORMAT=json) records
+        """
+        level = self.__resolve_level(level)
 
         # General logging method - logs if level is >= current level
-        if level_int >= self.level[0]:
-            self.__log(message, level)
+        number = self.LEVELS[level][0]
+        if number >= self.__level[0]:
+
+            # Throttled levels need to know which line of code is logging
+            site = None
+            suppressed = 0
+            if level in self.__limiter.limits or level in self.__dedup.levels:
+                site = self.__call_site()
+
+                # Over the call site's rate - drop it, the count goes out with the next record let through
+                suppressed = self.__limiter.allow(site, level, time_ns())
+                if suppressed is None:
+                    self.__stats.rate_limited()
+                    return
+            self.__log(message, level, args, extra, site, suppressed)
 
-    def __log(self, message: str = None, level: str = "INFO"):
-        # Internal method to handle the actual logging
-        level = level.upper()
-        if level not in self.LEVELS:
-            level = "INFO"  # Default to INFO if unknown level
+        elif number >= self.__ring_level:
+            # Not written anywhere, but wanted in the ring - kept as given and only formatted if the ring is dumped
+            ring = self.__ring
+            if ring is not None:
+                ring.append((time_ns(), level, current_task.get() or self.task_name, message, args))
 
+    @staticmethod
+    def __call_site():
+        # File and line of the code that called the logger - frames in this module (info, log...) are skipped
+        frame = sys._getframe(2)
+        while frame is not None and frame.f_code.co_filename == _MODULE_FILE:
+            frame = frame.f_back
+        return (frame.f_code.co_filename, frame.f_lineno) if frame is not None else None
+
+    def __render(self, message, args) -> str:
+        # Build the final message text - deferred until we know the record is wanted
+        if callable(message):
+            message = message()
+        if args:
+            try:
+                message = str(message) % args
+            except (TypeError, ValueError):
+                message = " ".join(str(part) for part in (message,) + tuple(args))
+        return message
+
+    def __log(self, message: str = None, level: str = "INFO", args: tuple = (), extra: dict = None, site=None, suppressed: int = 0):
+        # Internal method to handle the actual logging - level is already resolved
+        message = self.__render(message, args)
+        if suppressed:
+            message = f"{message} (+{suppressed} similar suppressed)"
+
+        # Context-local task first, else the global one
+        task = current_task.get() or self.task_name
+        now = time_ns()
+
+        # Collapse a repeat of this call site's last record - counts of finished runs go out first
+        dedup = self.__dedup
+        if site is not None and level in dedup.levels:
+            write, summaries = dedup.check(site, (task, level, message), now)
+            for summary in summaries:
+                self.__emit_repeats(summary)
+            if not write:
+                self.__stats.collapsed()
+                self.__arm_repeats()
+                return
+
+        self.__emit(message, level, extra, task, now)
+
+        # Time for a summary line - checked here so an idle logger stays silent
+        if now >= self.__next_summary:
+            self.__summarize(now)
+
+    def __emit(self, message: str, level: str, extra: dict, task: str, now: int):
+        # Write a finished record to every destination - under the config lock, so a reload lands between records
+        with self.__config_lock:
+            self.__emit_record(message, level, extra, task, now)
+
+    def __emit_record(self, message: str, level: str, extra: dict, task: str, now: int):
         # Set the timestamp formatted correctly
-        timestamp = self.__formatted_timestamp()
+        timestamp = self.__formatted_timestamp(now)
         node = self.node
+        self.__stats.record(level)
+
+        # Everything written goes in the ring too, already formatted
+        ring = self.__ring
+        if ring is not None and self.LEVELS[level][0] >= self.__ring_level:
+            ring.append((now, level, task, message, ()))
 
         # Generate the log line
         line = f"[{timestamp}] [{node}] [{level}] {message}"
+        record = None
 
         # Log to file if enabled
         if self.log_to_file:
 
-            # Ensure the filename is set and directory exists
-            if not hasattr(self, 'filename'):
-                self.__update_filename()
-            
-            # Ensure the log directory exists
-            Path(self.filename).parent.mkdir(parents=True, exist_ok=True)
-            
-            # Append the log line to the file
-            self.__write(self.filename, line + "\n", retries=5, timeout=1, encoding="utf-8")
+            # Roll over to the next hourly file when the hour changes
+            if now >= self.__clock.next_rollover_ns:
+                self.__roll_over()
+            path = self.__paths.get(task) or self.__task_path(task)
+
+            # Structured mode writes one JSON object per line and feeds the side index
+            entry = None
+            file_line = line
+            if self.log_format == "json":
+                epoch = now / 1_000_000_000
+                record = build_record(timestamp, epoch, node, self.user, task, level, message, extra)
+                file_line = format_record(record)
+                entry = (epoch, level)
+
+            # Hand off to the writer thread if running in async mode - if a set_async or reload closed it meanwhile, write directly
+            writer = self.__writer
+            if writer is None or (not writer.put((path, file_line + "\n", entry)) and writer.closed):
+                # Append the log line to the open file handle
+                self.__write(path, file_line + "\n", retries=5, timeout=1, encoding="utf-8", entries=[entry] if entry else None)
 
         # Log to console if enabled
         if self.log_to_console:
-            # Get the colour
-            colour = self.LEVELS[level][1]
-            
-            # If its critical, make it bold
-            if level == "CRITICAL":
-                line = Colours.colour_text(line, colour, bold=True)
-            else:
-                line = Colours.colour_text(line, colour)
-            print(line)
+            # Prefix and suffix per level are ready-made - coloured and flushed only on a terminal
+            self.__console.write(line, level)
+
+        # Hand the structured record to any extra sinks - they queue it and return straight away
+        sinks = self.__sinks
+        if sinks:
+            level_int = self.LEVELS[level][0]
+            for min_level, sink in sinks:
+                if level_int < min_level:
+                    continue
+                if record is None:
+                    record = build_record(timestamp, now / 1_000_000_000, node, self.user, task, level, message, extra)
+                try:
+                    sink.emit(record)
+                except Exception as e:
+                    self.__stats.sink_error()
+                    print(f"[FoundryLogger] Sink {sink!r} failed: {e}")
 
     def __find_by_level(self, int_level: int = 20) -> str:
         # Using the level numeric, return the key name. Default to INFO if not found
@@ -278,24 +1094,47 @@ class Logger:
             self.level = self.LEVELS["INFO"]
         
         # Show the current level
-        self.i(f"Log level set to {self.level} ({self.__find_by_level(self.level[0])})")
-        
+        self.i("Log level set to %s (%s)", self.level, self.__find_by_level(self.level[0]))
+
+    @property
+    def level(self) -> tuple:
+        # Current level as (int, colour)
+        return self.__level
+
+    @level.setter
+    def level(self, level: tuple) -> None:
+        # Store the level and rebind the level methods so disabled ones cost a single no-op call - levels the ring keeps stay live
+        self.__level = level
+        threshold = min(level[0], self.__ring_level)
+        for name, methods in self.LEVEL_METHODS.items():
+            enabled = self.LEVELS[name][0] >= threshold
+            for method in methods:
+                if enabled:
+                    self.__dict__.pop(method, None)
+                else:
+                    self.__dict__[method] = self.__disabled
+
+    @staticmethod
+    def __disabled(*args, **kwargs):
+        # Stand-in for level methods whose level is filtered out
+        return None
+
     # INFO level logging method
-    def info(self, message):
-        self.log(message, level="INFO")
+    def info(self, message, *args, extra: dict = None):
+        self.log(message, "INFO", *args, extra=extra)
     i = info # Alias for info
     inf = info # Alias for info
     information = info # Alias for info
     
     # WARNING level logging method
-    def warning(self, message):
-        self.log(message, level="WARNING")
+    def warning(self, message, *args, extra: dict = None):
+        self.log(message, "WARNING", *args, extra=extra)
     warn = warning # Alias for warning
     w = warning # Alias for warning
 
     # ERROR level logging method
-    def error(self, message):
-        self.log(message, level="ERROR")
+    def error(self, message, *args, extra: dict = None):
+        self.log(message, "ERROR", *args, extra=extra)
     err = error # Alias for error
     e = error # Alias for error
     exception = error # Alias for error
@@ -303,17 +1142,17 @@ class Logger:
     ex = error # Alias for error
 
     # DEBUG level logging method
-    def debug(self, message):
+    def debug(self, message, *args, extra: dict = None):
         # If no message provided, return whether debug is enabled
         if message is None:
-            return self.level == self.LEVELS["DEBUG"]
-        self.log(message, level="DEBUG")
+            return self.is_enabled_for("DEBUG")
+        self.log(message, "DEBUG", *args, extra=extra)
     dbg = debug # Alias for debug
     d = debug # Alias for debug
     
     # CRITICAL level logging method
-    def critical(self, message):
-        self.log(message, level="CRITICAL")
+    def critical(self, message, *args, extra: dict = None):
+        self.log(message, "CRITICAL", *args, extra=extra)
     crit = critical # Alias for critical
     c = critical # Alias for critical
 
@@ -331,9 +1170,55 @@ class Logger:
         self.warning("This is a warning message.")
         self.error("This is an error message.")
         self.critical("This is a critical message.")
-        
-# Create a default logger instance for module-level use
-logger = Logger()
+
+class LazyLogger:
+    """
+    Stands in for a Logger until it is first used - importing a module that logs costs nothing until it logs.
+    The first attribute lookup builds the real Logger (reading the env file, host name and writing the start-up lines).
+    The proxy then takes on the Logger's class and shares its state, so later calls cost no more than on the Logger itself.
+    ARGS:
+        factory: Callable returning the Logger (default: Logger)
+    """
+
+    def __init__(self, factory=Logger):
+        object.__setattr__(self, "_LazyLogger__factory", factory)
+        object.__setattr__(self, "_LazyLogger__lock", threading.Lock())
+
+    def __resolve(self):
+        # Build the logger once - other threads wait for it rather than building their own.
+        # The class is what says the proxy is done: it changes last, after the new attribute dict is in place
+        if type(self) is not LazyLogger:
+            return self
+        lock = self.__dict__.get("_LazyLogger__lock")
+        if lock is None:
+            return self
+        with lock:
+            # Another thread got here first - this object is the logger now
+            if type(self) is not LazyLogger:
+                return self
+            instance = self.__factory()
+
+            # Become the logger - same attribute dict, so this name and the hooks the Logger registered see every change.
+            # The lock goes along with the dict until the class is swapped, so a thread looking in between still waits on it
+            instance.__dict__["_LazyLogger__lock"] = lock
+            object.__setattr__(self, "__dict__", instance.__dict__)
+            object.__setattr__(self, "__class__", type(instance))
+        instance.__dict__.pop("_LazyLogger__lock", None)
+        return self
+
+    def __getattr__(self, name):
+        # Only reached for names the proxy does not have itself - everything the Logger offers
+        return getattr(self.__resolve(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self.__resolve(), name, value)
+
+    def __repr__(self):
+        return "<LazyLogger (not started)>"
+
+
+# Default logger for module-level use - built on the first log call, not on import
+logger = LazyLogger(Logger)
 
 if __name__ == "__main__":
     # Test the logger functionality
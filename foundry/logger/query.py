@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+
+# query.py
+# Author: Luxforge
+# Query and tail the date-partitioned log archive (log_dir/task/yyyy/yyyy-mm/yyyy-mm-dd)
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+
+from foundry.logger.archive import HOURLY_FILE, READ_ERRORS, hour_span, open_log, partition_span
+from foundry.logger.config import LoggerConfig
+from foundry.logger.structured import seek_offset
+from foundry.logger.timestamps import TimestampCache
+
+# Levels in severity order - kept in step with Logger.LEVELS
+LEVELS = {"DEBUG": 10, "INFO": 20, "CHANGELOG": 25, "WARNING": 30, "ERROR": 40, "CRITICAL": 50}
+
+# Text lines as written by Logger: [ts] [node] [LEVEL] message
+TEXT_LINE = re.compile(r"^\[(?P<ts>[^\]]*)\] \[(?P<node>[^\]]*)\] \[(?P<level>[A-Z]+)\] (?P<message>.*)$")
+
+# Relative times accepted by --since/--until, e.g. 15m, 2h, 7d
+RELATIVE_TIME = re.compile(r"^(?P<amount>\d+)(?P<unit>[smhdw])$")
+UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days", "w": "weeks"}
+
+# The default DATE_FORMAT - text timestamps in it sort lexically, any other format is parsed
+TEXT_TS_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+# The logger's default env file, read for LOG_DIR and DATE_FORMAT
+ENV_PATH = os.path.join(os.path.dirname(__file__), "..", "logger.env")
+
+
+def parse_time(value: str) -> datetime:
+    """
+    Parse a --since/--until value.
+    ARGS:
+        value: ISO date/time ("2025-10-16", "2025-10-16 14:30", "2025-10-16T14:30:00") or relative ("15m", "2h", "3d")
+    RETURNS:
+        datetime: Naive local time
+    """
+    value = value.strip()
+    match = RELATIVE_TIME.match(value)
+    if match:
+        return datetime.now() - timedelta(**{UNITS[match["unit"]]: int(match["amount"])})
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Unrecognised time '{value}' - use ISO format or a relative value like 15m, 2h, 3d")
+
+
+def _overlaps(start: datetime, end: datetime, since: datetime = None, until: datetime = None) -> bool:
+    # Whether the half-open span [start, end) can hold records inside the window
+    if since is not None and end <= since:
+        return False
+    if until is not None and start > until:
+        return False
+    return True
+
+
+def _sorted_dirs(path: str) -> list:
+    # Sub-directory names in lexical (and therefore chronological) order
+    try:
+        with os.scandir(path) as entries:
+            return sorted(entry.name for entry in entries if entry.is_dir(follow_symlinks=False))
+    except OSError:
+        return []
+
+
+def iter_log_files(log_dir: str, tasks: list = None, since: datetime = None, until: datetime = None):
+    """
+    Walk the archive in chronological order per task, pruning whole directories outside the window.
+    ARGS:
+        log_dir: Base log directory (LOG_DIR)
+        tasks: Task names to include (default: all)
+        since: Earliest time of interest
+        until: Latest time of interest
+    YIELDS:
+        tuple: (task, path) for each hourly file that may hold matching records - plain or compressed
+    """
+    for task in tasks or _sorted_dirs(log_dir):
+        task_dir = os.path.join(log_dir, task)
+
+        # Year, month and day directories are each pruned by the span their name covers
+        level = [task_dir]
+        for depth in range(3):
+            children = []
+            for parent in level:
+                for name in _sorted_dirs(parent):
+                    span = partition_span(name, depth)
+                    if span and _overlaps(span[0], span[1], since, until):
+                        children.append(os.path.join(parent, name))
+            level = children
+
+        for day_dir in level:
+            hourly = []
+            try:
+                with os.scandir(day_dir) as entries:
+                    for entry in entries:
+                        match = HOURLY_FILE.search(entry.name)
+                        if not match or not entry.is_file():
+                            continue
+                        start, end = hour_span(match)
+                        if not _overlaps(start, end, since, until):
+                            continue
+                        # Older backups first within the hour - .log.5 is older than .log.1, which is older than .log
+                        backup = int(match["backup"]) if match["backup"] else 0
+                        hourly.append((start, -backup, entry.path))
+            except OSError:
+                continue
+
+            for _, _, path in sorted(hourly):
+                yield task, path
+
+
+def parse_line(line: str, task: str = None) -> dict:
+    """
+    Turn a stored line back into a record dict.
+    ARGS:
+        line: One line from a log file, text or JSON
+        task: Task the file belongs to (text lines do not carry it)
+    RETURNS:
+        dict: Record with at least ts, node, level and message - None if the line is not a record
+    """
+    if line.startswith("{"):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return None
+        return record if isinstance(record, dict) else None
+
+    match = TEXT_LINE.match(line)
+    if not match:
+        return None
+    record = match.groupdict()
+    record["task"] = task
+    return record
+
+
+class _Filter:
+    # Compiled form of the query options, cheapest checks first
+
+    def __init__(self, since=None, until=None, level=None, nodes=None, contains=None, regex=None, date_format=None):
+        if level and level.upper() not in LEVELS:
+            raise ValueError(f"Unknown level '{level}' - use one of {', '.join(LEVELS)}")
+
+        self.since_epoch = since.timestamp() if since else None
+        self.until_epoch = until.timestamp() if until else None
+        self.since_text = since.strftime(TEXT_TS_FORMAT) if since else None
+        self.until_text = until.strftime(TEXT_TS_FORMAT) if until else None
+        self.min_level = LEVELS[level.upper()] if level else 0
+
+        # Other formats may not sort as text (day first, 12-hour clock) - their timestamps are parsed instead
+        self.date_format = date_format or TEXT_TS_FORMAT
+        self.lexical = self.date_format == TEXT_TS_FORMAT
+        self.__formats = [self.date_format]
+        if "%f" in self.date_format:
+            # NUMBER_OF_DIGITS_AFTER_DECIMAL=0 leaves the fraction empty
+            self.__formats.append(self.date_format.replace(".%f", "").replace("%f", ""))
+        self.nodes = set(nodes) if nodes else None
+        self.contains = contains
+        self.regex = re.compile(regex) if regex else None
+
+    def line_may_match(self, line: str) -> bool:
+        # Cheap pre-check on the raw line before parsing it
+        return self.contains is None or self.contains in line
+
+    def matches(self, record: dict) -> bool:
+        # Time window - epoch for JSON records, text timestamps compared lexically or parsed with DATE_FORMAT
+        epoch = record.get("epoch")
+        if epoch is None and (self.since_epoch is not None or self.until_epoch is not None):
+            ts = record.get("ts", "")
+            if self.lexical:
+                if self.since_text is not None and ts < self.since_text[:len(ts)]:
+                    return False
+                if self.until_text is not None and ts > self.until_text[:len(ts)]:
+                    return False
+            else:
+                epoch = self.__parse_ts(ts)
+                if epoch is None:
+                    # Cannot place it in the window - leave it out rather than guess
+                    return False
+        if epoch is not None:
+            if self.since_epoch is not None and epoch < self.since_epoch:
+                return False
+            if self.until_epoch is not None and epoch > self.until_epoch:
+                return False
+
+        if self.min_level and LEVELS.get(record.get("level"), 0) < self.min_level:
+            return False
+        if self.nodes is not None and record.get("node") not in self.nodes:
+            return False
+        if self.regex is not None and not self.regex.search(str(record.get("message", ""))):
+            return False
+        return True
+
+    def __parse_ts(self, ts: str):
+        # Epoch seconds of a text timestamp in date_format - None if it does not fit
+        for date_format in self.__formats:
+            try:
+                return datetime.strptime(ts.rstrip("."), date_format).timestamp()
+            except ValueError:
+                continue
+        return None
+
+
+def iter_records(log_dir: str, tasks: list = None, since: datetime = None, until: datetime = None,
+                 level: str = None, nodes: list = None, contains: str = None, regex: str = None, date_format: str = None):
+    """
+    Stream matching records from the archive without loading whole files.
+    ARGS:
+        log_dir: Base log directory
+        tasks: Task names to search (default: all)
+        since / until: Time window
+        level: Minimum level name
+        nodes: Node names to include
+        contains: Substring that must appear in the line
+        regex: Regular expression matched against the message
+        date_format: DATE_FORMAT the text files were written with (default: the logger's default)
+    YIELDS:
+        tuple: (record dict, raw line)
+    """
+    check = _Filter(since, until, level, nodes, contains, regex, date_format)
+    for task, path in iter_log_files(log_dir, tasks, since, until):
+        try:
+            # JSON files carry a side index - jump straight to the first block in the window
+            with open_log(path, seek_offset(path, check.since_epoch)) as f:
+                for line in f:
+                    line = line.rstrip("\n")
+                    if not check.line_may_match(line):
+                        continue
+                    # Every line is checked - rotated segments and several writers mean a file is not strictly in time order
+                    record = parse_line(line, task)
+                    if record is None:
+                        continue
+                    if check.matches(record):
+                        yield record, line
+        except READ_ERRORS as e:
+            print(f"[FoundryLogger] Could not read {path}: {e}", file=sys.stderr)
+
+
+def current_log_file(log_dir: str, task: str, clock: TimestampCache = None) -> str:
+    # Path the logger is writing to right now for a task
+    clock = clock or TimestampCache()
+    date_path, hour_tag = clock.partition()
+    return os.path.join(log_dir, task, date_path, f"{task.replace(' ', '_')}_{hour_tag}.log")
+
+
+def follow(log_dir: str, tasks: list, interval: float = 0.5, from_start: bool = False, **filters):
+    """
+    Tail the current hourly file of each task, moving on as the hour rolls over or the file rotates.
+    ARGS:
+        log_dir: Base log directory
+        tasks: Task names to follow
+        interval: Seconds to sleep when there is nothing new
+        from_start: Read the current file from the beginning instead of the end
+        filters: since, until, level, nodes, contains, regex and date_format as for iter_records
+    YIELDS:
+        tuple: (record dict, raw line) - runs until interrupted, or until nothing is left to read after `until`
+    """
+    check = _Filter(**filters)
+    clock = TimestampCache()
+    state = {task: {"path": None, "file": None, "inode": None, "partial": ""} for task in tasks}
+
+    # Only files that already exist when following starts are skipped to their end
+    first_pass = True
+    try:
+        while True:
+            idle = True
+            for task, tail in state.items():
+                path = current_log_file(log_dir, task, clock)
+
+                # Switch files once the next hour's file exists - drain the old one first
+                if path != tail["path"] and os.path.exists(path):
+                    if tail["file"] is not None:
+                        for line in tail["file"]:
+                            yield from _emit(check, task, tail["partial"] + line)
+                            tail["partial"] = ""
+                        tail["file"].close()
+                    starting = first_pass and not from_start
+                    tail["path"], tail["file"] = path, open(path, "r", encoding="utf-8", errors="replace")
+                    tail["inode"] = os.fstat(tail["file"].fileno()).st_ino
+                    tail["partial"] = ""
+                    if starting:
+                        tail["file"].seek(0, os.SEEK_END)
+
+                handle = tail["file"]
+                if handle is None:
+                    continue
+
+                for line in handle:
+                    idle = False
+                    # Hold on to a half-written last line until its newline arrives
+                    if not line.endswith("\n"):
+                        tail["partial"] += line
+                        break
+                    yield from _emit(check, task, tail["partial"] + line)
+                    tail["partial"] = ""
+
+                # Size rotation renames the file away - finish the old handle, then reopen the new file from the top
+                try:
+                    if os.stat(tail["path"]).st_ino != tail["inode"]:
+                        for line in handle:
+                            yield from _emit(check, task, tail["partial"] + line)
+                            tail["partial"] = ""
+                        handle.close()
+                        tail["file"] = open(tail["path"], "r", encoding="utf-8", errors="replace")
+                        tail["inode"] = os.fstat(tail["file"].fileno()).st_ino
+                        tail["partial"] = ""
+                except FileNotFoundError:
+                    pass
+
+            first_pass = False
+            if idle:
+                # Everything up to the end of the window has been read - nothing later can match
+                if check.until_epoch is not None and time.time() > check.until_epoch:
+                    return
+                time.sleep(interval)
+    finally:
+        for tail in state.values():
+            if tail["file"] is not None:
+                tail["file"].close()
+
+
+def _emit(check, task, line):
+    # Parse and filter one followed line
+    line = line.rstrip("\n")
+    if not check.line_may_match(line):
+        return
+    record = parse_line(line, task)
+    if record is not None and check.matches(record):
+        yield record, line
+
+
+def build_parser(parser: argparse.ArgumentParser = None) -> argparse.ArgumentParser:
+    # Arguments for the query command - shared with `python -m foundry.logger query`
+    parser = parser or argparse.ArgumentParser(prog="python -m foundry.logger query", description="Search or tail the Foundry log archive.")
+
+    # Defaults come from the same environment and logger.env the logger itself reads
+    config = LoggerConfig(ENV_PATH)
+    parser.add_argument("--dir", default=config.get("LOG_DIR", "./logs"), help="Base log directory (default: LOG_DIR from the environment or logger.env, else ./logs)")
+    parser.add_argument("--task", action="append", dest="tasks", help="Task to search - repeat for several (default: all)")
+    parser.add_argument("--since", type=parse_time, help="Start of the window - ISO time or relative like 15m, 2h, 3d")
+    parser.add_argument("--until", type=parse_time, help="End of the window - ISO time or relative")
+    parser.add_argument("--level", type=str.upper, choices=list(LEVELS), help="Minimum level, e.g. WARNING")
+    parser.add_argument("--node", action="append", dest="nodes", help="Node name - repeat for several")
+    parser.add_argument("--grep", dest="contains", help="Substring the line must contain")
+    parser.add_argument("--regex", help="Regular expression the message must match")
+    parser.add_argument("--date-format", default=config.get("DATE_FORMAT", TEXT_TS_FORMAT),
+                        help="DATE_FORMAT of the text logs (default: DATE_FORMAT from the environment or logger.env)")
+    parser.add_argument("--follow", "-f", action="store_true", help="Tail the current hourly file across rollovers - --since and --until still apply, and following stops once --until has passed")
+    parser.add_argument("--limit", type=int, help="Stop after this many matches")
+    return parser
+
+
+def main(argv: list = None) -> int:
+    """
+    Command line entry point.
+    RETURNS:
+        int: Exit code
+    """
+    args = build_parser().parse_args(argv)
+    return run(args)
+
+
+def run(args) -> int:
+    # Execute a parsed query
+    filters = dict(level=args.level, nodes=args.nodes, contains=args.contains, regex=args.regex, date_format=args.date_format)
+
+    if args.follow:
+        tasks = args.tasks or _sorted_dirs(args.dir)
+        if not tasks:
+            print(f"[FoundryLogger] No tasks found under {args.dir}", file=sys.stderr)
+            return 1
+        matches = follow(args.dir, tasks, since=args.since, until=args.until, **filters)
+    else:
+        matches = iter_records(args.dir, args.tasks, args.since, args.until, **filters)
+
+    count = 0
+    try:
+        for _, line in matches:
+            print(line, flush=args.follow)
+            count += 1
+            if args.limit and count >= args.limit:
+                break
+    except (KeyboardInterrupt, BrokenPipeError):
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
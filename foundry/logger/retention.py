@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+
+# retention.py
+# Author: Luxforge
+# Compress finished hourly log files and prune old partitions of the archive, once or on a background thread
+
+import argparse
+import os
+import shutil
+import threading
+from datetime import datetime, timedelta
+
+from foundry.logger.archive import COMPRESSORS, HOURLY_FILE, hour_span, partition_span
+from foundry.logger.config import LoggerConfig
+from foundry.logger.structured import index_path
+
+# The logger's default env file - the maintain command reads the settings the background thread uses
+ENV_PATH = os.path.join(os.path.dirname(__file__), "..", "logger.env")
+
+# Written into a finished day directory: "<total bytes> <directory mtime ns>" - saves re-measuring it every pass
+SIZE_MARKER = ".size"
+
+# Keyword each compressor takes for its level
+LEVEL_ARGUMENT = {"gzip": "compresslevel", "lzma": "preset"}
+
+
+def _claim(lock: str) -> bool:
+    # Create the lock file exclusively, holding our pid - one left by a process that has since died is taken over
+    for _ in range(2):
+        try:
+            fd = os.open(lock, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            try:
+                with open(lock, "r") as f:
+                    os.kill(int(f.read().strip()), 0)
+                return False
+            except ProcessLookupError:
+                pass
+            except FileNotFoundError:
+                continue
+            except (ValueError, PermissionError, OSError):
+                # Half written, or a live process we may not signal - leave it alone
+                return False
+            try:
+                os.remove(lock)
+            except FileNotFoundError:
+                pass
+            continue
+        with os.fdopen(fd, "w") as f:
+            f.write(str(os.getpid()))
+        return True
+    return False
+
+
+def compress_file(path: str, method: str = "gzip", level: int = 6) -> tuple | None:
+    """
+    Compress a log file next to itself and remove the original. The side index moves with it.
+    The target is claimed with an exclusive lock file first, so two processes never compress the same hour.
+    ARGS:
+        path: Plain log file
+        method: "gzip" or "lzma" (default: "gzip")
+        level: Compression level (default: 6)
+    RETURNS:
+        tuple: (compressed path, bytes read, bytes written), or None if another process is compressing it
+    """
+    suffix, opener = COMPRESSORS[method]
+    target = path + suffix
+    lock = f"{target}.lock"
+    if not _claim(lock):
+        return None
+    try:
+        return _compress_claimed(path, target, opener, LEVEL_ARGUMENT[method], level)
+    finally:
+        os.remove(lock)
+
+
+def _compress_claimed(path: str, target: str, opener, level_argument: str, level: int) -> tuple:
+    # Caller holds the lock file - a process that held it before us may already have compressed and removed path
+    temp = f"{target}.{os.getpid()}.tmp"
+
+    # Stream through a temp file so a crash never leaves a truncated archive under the real name
+    with open(path, "rb") as source, opener(temp, "wb", **{level_argument: level}) as sink:
+        original = os.fstat(source.fileno()).st_size
+        shutil.copyfileobj(source, sink, 1024 * 1024)
+    compressed = os.path.getsize(temp)
+
+    if os.path.exists(target):
+        # A late write reopened the hour after it was compressed - concatenated members read back as one stream.
+        # Only the lock holder gets here, so the same records are never appended twice
+        with open(target, "ab") as existing, open(temp, "rb") as extra:
+            shutil.copyfileobj(extra, existing)
+        os.remove(temp)
+
+        # Offsets in the old index no longer describe the whole file
+        if os.path.exists(index_path(target)):
+            os.remove(index_path(target))
+        if os.path.exists(index_path(path)):
+            os.remove(index_path(path))
+    else:
+        os.replace(temp, target)
+
+        # Index offsets refer to the uncompressed content, which is what readers seek in
+        if os.path.exists(index_path(path)):
+            os.replace(index_path(path), index_path(target))
+
+    os.remove(path)
+    return target, original, compressed
+
+
+def _dirs(path: str) -> list:
+    # Sub-directory names, oldest partition first - hidden ones (spools, markers) are skipped
+    try:
+        with os.scandir(path) as entries:
+            return sorted(entry.name for entry in entries if entry.is_dir(follow_symlinks=False) and not entry.name.startswith("."))
+    except OSError:
+        return []
+
+
+class Retention:
+    """
+    Keep the log archive in check - compress hourly files once their hour is over and prune old partitions.
+    Whole year, month and day directories past max_age_days are removed by name alone. The size budget
+    drops the oldest finished days first. Day sizes come from one os.scandir pass per day, and are then
+    cached in a small marker file so finished days are never measured again unless their directory changes.
+    ARGS:
+        log_dir: Base log directory (LOG_DIR)
+        compress: "gzip", "lzma" or None to leave files as they are (default: "gzip")
+        compress_after: Seconds after an hour ends before its files are compressed (default: 300)
+        max_age_days: Remove partitions older than this many days, 0 keeps everything (default: 0)
+        max_size_mb: Remove the oldest days until the archive fits, 0 for no budget (default: 0)
+        interval: Seconds between passes of the background thread (default: 600)
+        level: Compression level (default: 6)
+    METHODS:
+        run_once(now, dry_run): Do one pass now and return what it did
+        start(): Run passes on a background thread
+        stop(timeout): Stop the background thread
+    """
+
+    def __init__(self, log_dir: str, compress: str = "gzip", compress_after: float = 300, max_age_days: float = 0,
+                 max_size_mb: float = 0, interval: float = 600, level: int = 6):
+
+        compress = (compress or "").lower()
+        if compress in ("", "none", "off", "false"):
+            compress = None
+        elif compress not in COMPRESSORS:
+            raise ValueError(f"Unknown compression '{compress}' - use one of {', '.join(COMPRESSORS)} or none")
+
+        self.log_dir = log_dir
+        self.compress = compress
+        self.compress_after = timedelta(seconds=float(compress_after))
+        self.max_age_days = float(max_age_days or 0)
+        self.max_bytes = int(float(max_size_mb or 0) * 1024 * 1024)
+        self.interval = float(interval)
+        self.level = int(level)
+
+        self.__thread = None
+        self.__stop = threading.Event()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.compress or self.max_age_days or self.max_bytes)
+
+    def start(self) -> None:
+        # Passes run on a daemon thread - the first one straight away
+        if self.__thread is not None and self.__thread.is_alive():
+            return
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self.__run, name="foundry-log-retention", daemon=True)
+        self.__thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self.__stop.set()
+        if self.__thread is not None and self.__thread is not threading.current_thread():
+            self.__thread.join(timeout)
+
+    def __run(self):
+        while not self.__stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"[FoundryLogger] Log maintenance failed: {e}")
+            self.__stop.wait(self.interval)
+
+    def run_once(self, now: datetime = None, dry_run: bool = False) -> dict:
+        """
+        Compress, prune by age, then prune by size.
+        ARGS:
+            now: Time to judge ages against (default: now)
+            dry_run: Report what would be done without changing anything
+        RETURNS:
+            dict: compressed (files), saved (bytes), pruned (directories), freed (bytes, where known) and size (bytes, if measured)
+        """
+        now = now or datetime.now()
+        cutoff = now - timedelta(days=self.max_age_days) if self.max_age_days else None
+        report = {"compressed": 0, "saved": 0, "pruned": [], "freed": 0, "size": None}
+
+        # Finished days per task as (day start, task, path, size) - candidates for the size budget
+        days = []
+        for task in _dirs(self.log_dir):
+            self.__walk(os.path.join(self.log_dir, task), task, 0, now, cutoff, days, report, dry_run)
+
+        if self.max_bytes:
+            total = sum(size for *_, size in days) + report.pop("open_size", 0)
+            for start, task, path, size in sorted(days, key=lambda day: (day[0], day[1])):
+                if total <= self.max_bytes:
+                    break
+                self.__prune(path, report, dry_run, size)
+                total -= size
+                if not dry_run:
+                    month = os.path.dirname(path)
+                    self.__remove_if_empty(month)
+                    self.__remove_if_empty(os.path.dirname(month))
+            report["size"] = total
+        report.pop("open_size", None)
+        return report
+
+    def __walk(self, path, task, depth, now, cutoff, days, report, dry_run):
+        # Year (0) and month (1) directories - recurse into the ones that are still wanted
+        for name in _dirs(path):
+            span = partition_span(name, depth)
+            if span is None:
+                continue
+            child = os.path.join(path, name)
+
+            # Entirely older than the cutoff - remove it without looking inside
+            if cutoff is not None and span[1] <= cutoff:
+                self.__prune(child, report, dry_run)
+                continue
+
+            if depth < 2:
+                self.__walk(child, task, depth + 1, now, cutoff, days, report, dry_run)
+                if not dry_run:
+                    self.__remove_if_empty(child)
+            else:
+                self.__day(child, task, span, now, days, report, dry_run)
+
+    def __day(self, path, task, span, now, days, report, dry_run):
+        # One day directory - compress its finished hours and measure it if there is a size budget
+        finished = span[1] + self.compress_after <= now
+        size = self.__cached_size(path) if finished else None
+
+        if size is None:
+            size, pending = 0, 0
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        match = HOURLY_FILE.search(entry.name)
+                        if not match or not entry.is_file(follow_symlinks=False):
+                            continue
+
+                        # Plain files whose hour has passed are compressed - the rest are left alone
+                        compressed = None
+                        if self.compress and not match["compressed"]:
+                            if hour_span(match)[1] + self.compress_after > now:
+                                pending += 1
+                            elif dry_run:
+                                report["compressed"] += 1
+                            else:
+                                compressed = self.__compress(entry.path, report)
+                                if compressed is None:
+                                    # Failed, or another process has it - the day is not settled yet
+                                    pending += 1
+
+                        if self.max_bytes:
+                            try:
+                                size += compressed if compressed is not None else entry.stat(follow_symlinks=False).st_size
+                            except FileNotFoundError:
+                                # Compressed by another process meanwhile - its archive is counted on the next pass
+                                pending += 1
+            except OSError as e:
+                print(f"[FoundryLogger] Could not scan {path}: {e}")
+                return
+
+            # A finished day only changes if something new is written into it - remember its size
+            if self.max_bytes and finished and not pending and not dry_run:
+                self.__store_size(path, size)
+
+        if finished:
+            days.append((span[0], task, path, size))
+        else:
+            report["open_size"] = report.get("open_size", 0) + size
+
+    def __compress(self, path, report):
+        # Compress one file - returns the bytes written so the day total stays right
+        try:
+            result = compress_file(path, self.compress, self.level)
+        except FileNotFoundError:
+            # Another process got there first
+            return None
+        except OSError as e:
+            print(f"[FoundryLogger] Could not compress {path}: {e}")
+            return None
+        if result is None:
+            # Another process is compressing it right now
+            return None
+        target, original, compressed = result
+        report["compressed"] += 1
+        report["saved"] += original - compressed
+        return compressed
+
+    @staticmethod
+    def __cached_size(path):
+        # Size from the marker, if the directory has not changed since it was written
+        try:
+            with open(os.path.join(path, SIZE_MARKER), "r") as f:
+                size, mtime = (int(part) for part in f.read().split())
+            return size if os.stat(path).st_mtime_ns == mtime else None
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def __store_size(path, size):
+        try:
+            # Creating the marker changes the directory, writing into it does not - so read the mtime once it is open
+            with open(os.path.join(path, SIZE_MARKER), "w") as f:
+                f.write(f"{size} {os.stat(path).st_mtime_ns}")
+        except OSError:
+            pass
+
+    @staticmethod
+    def __prune(path, report, dry_run, size=None):
+        report["pruned"].append(path)
+        if size:
+            report["freed"] += size
+        if not dry_run:
+            shutil.rmtree(path, ignore_errors=True)
+
+    @staticmethod
+    def __remove_if_empty(path):
+        # Tidy up month and year directories left empty by pruning
+        try:
+            os.rmdir(path)
+        except OSError:
+            pass
+
+
+def build_parser(parser: argparse.ArgumentParser = None) -> argparse.ArgumentParser:
+    # Arguments for the maintain command - defaults follow the logger's settings, from the environment or logger.env
+    parser = parser or argparse.ArgumentParser(prog="python -m foundry.logger maintain", description="Compress and prune the Foundry log archive.")
+    config = LoggerConfig(ENV_PATH)
+    parser.add_argument("--dir", default=config.get("LOG_DIR", "./logs"), help="Base log directory (default: LOG_DIR or ./logs)")
+    parser.add_argument("--compress", default=config.get("LOG_COMPRESS", "gzip").lower(), choices=[*COMPRESSORS, "none"], help="Compression for finished hours (default: LOG_COMPRESS or gzip)")
+    parser.add_argument("--compress-after", type=float, default=config.get_float("LOG_COMPRESS_AFTER", 300), help="Seconds after an hour ends before it is compressed (default: LOG_COMPRESS_AFTER or 300)")
+    parser.add_argument("--max-age-days", type=float, default=config.get_float("LOG_RETENTION_DAYS", 0), help="Remove partitions older than this, 0 keeps everything (default: LOG_RETENTION_DAYS)")
+    parser.add_argument("--max-size-mb", type=float, default=config.get_float("LOG_MAX_TOTAL_MB", 0), help="Remove the oldest days until the archive fits, 0 for no limit (default: LOG_MAX_TOTAL_MB)")
+    parser.add_argument("--dry-run", action="store_true", help="Show what would be done without changing anything")
+    return parser
+
+
+def run(args) -> int:
+    # One maintenance pass with a summary of what it did
+    try:
+        retention = Retention(args.dir, args.compress, args.compress_after, args.max_age_days, args.max_size_mb)
+    except ValueError as e:
+        print(f"[FoundryLogger] {e}")
+        return 1
+
+    report = retention.run_once(dry_run=args.dry_run)
+    pruned = len(report["pruned"])
+    for path in report["pruned"]:
+        print(f"{'Would remove' if args.dry_run else 'Removed'} {path}")
+    print(f"{'Would compress' if args.dry_run else 'Compressed'} {report['compressed']} file(s), saving {report['saved'] / 1048576:.1f} MB")
+    print(f"{'Would prune' if args.dry_run else 'Pruned'} {pruned} director{'y' if pruned == 1 else 'ies'}, freeing {report['freed'] / 1048576:.1f} MB")
+    if report["size"] is not None:
+        print(f"Archive size: {report['size'] / 1048576:.1f} MB")
+    return 0
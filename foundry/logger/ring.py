@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+
+# ring.py
+# Author: Luxforge
+# Fixed-size buffer of the most recent records - kept in memory, written out only when something goes wrong
+
+from itertools import count
+
+
+class RingBuffer:
+    """
+    The last `size` records, oldest overwritten first. Slots are allocated up front and a record is stored
+    as the tuple it arrives in, so keeping one costs a counter step and a list assignment - no lock, no I/O.
+    ARGS:
+        size: Number of records kept
+    METHODS:
+        append(item): Keep a record, overwriting the oldest once full
+        items(): The records held, oldest first
+        clear(): Forget everything
+    PROPERTIES:
+        total: Records appended since the buffer was created or cleared
+    """
+
+    def __init__(self, size: int):
+        self.size = max(1, int(size))
+        self.clear()
+
+    def clear(self) -> None:
+        self.__slots = [None] * self.size
+        self.__counter = count()
+        self.total = 0
+
+    def append(self, item) -> None:
+        # next() on a count is atomic, so threads never share a slot
+        position = next(self.__counter)
+        self.__slots[position % self.size] = item
+        self.total = position + 1
+
+    def items(self) -> list:
+        """
+        Snapshot of the buffer.
+        RETURNS:
+            list: Records oldest first - at most `size` of them
+        """
+        total, slots = self.total, list(self.__slots)
+        if total <= self.size:
+            return [item for item in slots[:total] if item is not None]
+        start = total % self.size
+        return [item for item in slots[start:] + slots[:start] if item is not None]
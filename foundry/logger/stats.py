@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+# stats.py
+# Author: Luxforge
+# Counters and a latency histogram the logger keeps about itself - what logging costs and where records go
+
+import threading
+
+
+class LatencyHistogram:
+    """
+    Log-linear histogram of durations in nanoseconds - four buckets per power of two, so a percentile
+    is never more than a quarter of its value out, in a fixed 256-slot list whatever the volume.
+    METHODS:
+        record(ns): Count one duration
+        percentile(p): Upper bound of the bucket holding the p-th percentile
+    PROPERTIES:
+        count: Durations recorded
+        total: Sum of all durations
+        max: Longest duration recorded
+    """
+
+    def __init__(self):
+        self.counts = [0] * 256
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    @staticmethod
+    def bucket(ns: int) -> int:
+        # Top three bits of the value pick the bucket - the highest says which power of two, the next two which quarter
+        if ns < 4:
+            return max(0, ns)
+        bits = ns.bit_length()
+        return (bits - 2) * 4 + ((ns >> (bits - 3)) & 3)
+
+    @staticmethod
+    def upper_bound(index: int) -> int:
+        # Largest duration that lands in a bucket
+        if index < 4:
+            return index
+        bits = index // 4 + 2
+        return ((index % 4 + 5) << (bits - 3)) - 1
+
+    def record(self, ns: int) -> None:
+        self.counts[self.bucket(ns)] += 1
+        self.count += 1
+        self.total += ns
+        if ns > self.max:
+            self.max = ns
+
+    def percentile(self, p: float) -> int:
+        """
+        Estimate a percentile.
+        ARGS:
+            p: Percentile between 0 and 100
+        RETURNS:
+            int: Nanoseconds - 0 if nothing has been recorded
+        """
+        if not self.count:
+            return 0
+        rank = max(1, round(self.count * p / 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.upper_bound(index), self.max)
+        return self.max
+
+
+class LoggerStats:
+    """
+    Running totals kept by the logger - records per level, bytes and latency of file writes, retries and records
+    dropped on the way. Updates take a lock, which costs far less than the write being measured.
+    ARGS:
+        levels: Level names to keep record counts for
+    METHODS:
+        record(level): Count a record that reached its destinations
+        wrote(nbytes, ns): Count a file write and how long it took
+        retried(): Count a failed write attempt that was tried again
+        failed(): Count a write that gave up
+        rate_limited(): Count a record dropped by the rate limiter
+        collapsed(): Count a record folded into a "repeated N times" line
+        sink_error(): Count a record a sink refused
+        snapshot(): Copy of every counter
+        reset(): Start counting again
+    """
+
+    def __init__(self, levels=()):
+        self.levels = tuple(levels)
+        self.__lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self.__lock:
+            self.records = dict.fromkeys(self.levels, 0)
+            self.bytes = 0
+            self.writes = 0
+            self.retries = 0
+            self.failures = 0
+            self.limited = 0
+            self.repeats = 0
+            self.sink_errors = 0
+            self.latency = LatencyHistogram()
+
+    def after_fork(self) -> None:
+        # A child starts with a fresh lock and its own counts
+        self.__lock = threading.Lock()
+        self.reset()
+
+    def record(self, level: str) -> None:
+        with self.__lock:
+            self.records[level] = self.records.get(level, 0) + 1
+
+    def wrote(self, nbytes: int, ns: int) -> None:
+        with self.__lock:
+            self.bytes += nbytes
+            self.writes += 1
+            self.latency.record(ns)
+
+    def retried(self) -> None:
+        with self.__lock:
+            self.retries += 1
+
+    def failed(self) -> None:
+        with self.__lock:
+            self.failures += 1
+
+    def rate_limited(self) -> None:
+        with self.__lock:
+            self.limited += 1
+
+    def collapsed(self) -> None:
+        with self.__lock:
+            self.repeats += 1
+
+    def sink_error(self) -> None:
+        with self.__lock:
+            self.sink_errors += 1
+
+    def snapshot(self) -> dict:
+        """
+        Copy every counter out at once.
+        RETURNS:
+            dict: records (per level and total), bytes, writes, write latency percentiles in microseconds,
+                  retries, failed writes, rate_limited, collapsed and sink_errors
+        """
+        with self.__lock:
+            latency = self.latency
+            return {
+                "records": dict(self.records),
+                "total_records": sum(self.records.values()),
+                "bytes": self.bytes,
+                "writes": self.writes,
+                "write_latency_us": {
+                    "p50": latency.percentile(50) / 1000,
+                    "p99": latency.percentile(99) / 1000,
+                    "max": latency.max / 1000,
+                    "mean": latency.total / latency.count / 1000 if latency.count else 0.0,
+                },
+                "retries": self.retries,
+                "failed_writes": self.failures,
+                "rate_limited": self.limited,
+                "collapsed": self.repeats,
+                "sink_errors": self.sink_errors,
+            }
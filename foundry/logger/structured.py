@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+
+# structured.py
+# Author: Luxforge
+# JSON-lines record formatting and the byte-offset side index written next to each log file
+
+import json
+import os
+
+# Fields every structured record carries - extra fields may not overwrite them
+RECORD_FIELDS = ("ts", "epoch", "node", "user", "task", "level", "message")
+
+# Suffix of the index file written alongside each log file
+INDEX_SUFFIX = ".idx"
+
+
+def format_record(record: dict) -> str:
+    """
+    Serialise a record as a single JSON line (without the trailing newline).
+    ARGS:
+        record: Record dict - values that are not JSON types are written with str()
+    RETURNS:
+        str: Compact JSON text
+    """
+    return json.dumps(record, default=str, ensure_ascii=False, separators=(",", ":"))
+
+
+def build_record(ts: str, epoch: float, node: str, user: str, task: str, level: str, message: str, extra: dict = None) -> dict:
+    """
+    Assemble a structured record, merging in extra fields that do not clash with the standard ones.
+    RETURNS:
+        dict: The record
+    """
+    record = {"ts": ts, "epoch": epoch, "node": node, "user": user, "task": task, "level": level, "message": message}
+    if extra:
+        for key, value in extra.items():
+            if key not in record:
+                record[key] = value
+    return record
+
+
+def index_path(log_path) -> str:
+    # Index file that belongs to a log file
+    return f"{log_path}{INDEX_SUFFIX}"
+
+
+def read_index(log_path) -> list:
+    """
+    Load the index entries for a log file.
+    ARGS:
+        log_path: Path of the log file (not the index)
+    RETURNS:
+        list of dict: Entries with offset, count, ts_min, ts_max and levels - empty if there is no index
+    """
+    path = index_path(log_path)
+    if not os.path.exists(path):
+        return []
+
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                # A torn final line from a crash - everything before it is still usable
+                break
+    return entries
+
+
+def seek_offset(log_path, since: float = None) -> int:
+    """
+    Find the byte offset to start reading from so no record at or after `since` is skipped.
+    Files shared by several processes hold interleaved blocks from each writer, so every writer
+    gets its own starting point - its first block reaching `since`, or the end of its last block if
+    it may still have unindexed records - and the earliest of those wins.
+    ARGS:
+        log_path: Path of the log file
+        since: Epoch seconds - None means the start of the file
+    RETURNS:
+        int: Byte offset of the first block that may contain matching records
+    """
+    if since is None:
+        return 0
+
+    # Writer (pid, or None for single-process files) -> (start offset or None, found a matching block)
+    starts = {}
+    end = 0
+    for entry in read_index(log_path):
+        end = max(end, entry.get("end", 0))
+        writer = entry.get("pid")
+        if starts.get(writer, (None, False))[1]:
+            continue
+
+        if entry.get("ts_max", 0) >= since:
+            starts[writer] = (entry.get("offset", 0), True)
+        else:
+            # Skip the block - a writer that closed cleanly has nothing unindexed after it
+            starts[writer] = (None if entry.get("last") else entry.get("end", 0), False)
+
+    offsets = [offset for offset, _ in starts.values() if offset is not None]
+    return min(offsets) if offsets else end
+
+
+class LogIndex:
+    """
+    Accumulate per-block statistics for a log file and append them to its index every N records.
+    Each index line records the byte offset of the block's first record, the offset just past its
+    last record, the record count, min/max epoch timestamps and per-level counts.
+    The index file is opened once alongside the log, so when the pair is rotated (even by another
+    process) later blocks still land in the index of the file they describe. For shared files,
+    blocks carry the writer's pid and the block written on close is marked "last".
+    ARGS:
+        log_path: Path of the log file being indexed
+        interval: Number of records per index entry (default: 1000)
+        shared: Several processes append to the log and its index (default: False)
+    METHODS:
+        add(offset, length, epoch, level): Account for one record written at a byte offset
+        close(): Write out the partial block and close the index file
+        discard(): Close the index file, dropping the partial block
+    """
+
+    def __init__(self, log_path, interval: int = 1000, shared: bool = False):
+        self.path = index_path(log_path)
+        self.interval = max(1, int(interval))
+        self.shared = shared
+        self.__block = None
+
+        # Unbuffered appends - each block is a single short write that never interleaves with other writers
+        self.__fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def add(self, offset: int, length: int, epoch: float, level: str) -> None:
+        block = self.__block
+        if block is None:
+            block = self.__block = {"offset": offset, "end": offset, "count": 0, "ts_min": epoch, "ts_max": epoch, "levels": {}}
+
+        block["end"] = offset + length
+        block["count"] += 1
+        if epoch < block["ts_min"]:
+            block["ts_min"] = epoch
+        if epoch > block["ts_max"]:
+            block["ts_max"] = epoch
+        block["levels"][level] = block["levels"].get(level, 0) + 1
+
+        if block["count"] >= self.interval:
+            self.__emit()
+
+    def close(self) -> None:
+        if self.__block is not None and self.__fd is not None:
+            self.__emit(last=True)
+        self.discard()
+
+    def discard(self) -> None:
+        self.__block = None
+        if self.__fd is not None:
+            try:
+                os.close(self.__fd)
+            finally:
+                self.__fd = None
+
+    def __emit(self, last: bool = False):
+        # One small append per block - cheap next to the records it covers
+        block, self.__block = self.__block, None
+        if self.shared:
+            block["pid"] = os.getpid()
+            if last:
+                block["last"] = True
+        os.write(self.__fd, (format_record(block) + "\n").encode("utf-8"))
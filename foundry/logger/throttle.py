@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+
+# throttle.py
+# Author: Luxforge
+# Per-call-site rate limiting and "last message repeated N times" collapsing for noisy log paths
+
+import threading
+
+
+def parse_level_settings(value: str, levels, default=None) -> dict:
+    """
+    Parse a per-level setting such as "DEBUG:10:20,INFO:5" or "10" (every level).
+    ARGS:
+        value: Comma separated LEVEL[:number[:number]] items, a bare number for every level, or ""/"off"/"0" for none
+        levels: Valid level names, in order
+        default: Numbers used for a bare level name (default: None)
+    RETURNS:
+        dict: Level name -> tuple of floats (or default) - empty when disabled
+    """
+    value = (value or "").strip()
+    if value.lower() in ("", "off", "false", "none", "0"):
+        return {}
+
+    settings = {}
+    for item in value.split(","):
+        parts = [part.strip() for part in item.split(":") if part.strip()]
+        if not parts:
+            continue
+
+        # A bare number applies to every level
+        if parts[0].replace(".", "", 1).isdigit():
+            numbers = tuple(float(part) for part in parts)
+            return {level: numbers for level in levels}
+
+        level = parts[0].upper()
+        if level not in levels:
+            print(f"[FoundryLogger] Ignoring unknown level '{parts[0]}' in '{value}'")
+            continue
+        try:
+            settings[level] = tuple(float(part) for part in parts[1:]) or default
+        except ValueError:
+            print(f"[FoundryLogger] Ignoring bad setting '{item}' in '{value}'")
+    return settings
+
+
+class RateLimiter:
+    """
+    Token bucket per call site and level - each site may log `rate` records a second with bursts of up to `burst`.
+    Records over the limit are dropped and counted; the count is handed back with the next record let through.
+    ARGS:
+        limits: Level name -> (rate, burst) - levels not listed are never limited
+    METHODS:
+        allow(site, level, now_ns): Check a record against its bucket
+        set_limit(level, rate, burst): Change or remove (rate 0) the limit for a level
+    """
+
+    def __init__(self, limits: dict = None):
+        self.limits = {}
+        for level, numbers in (limits or {}).items():
+            self.set_limit(level, *numbers[:2])
+
+        # (site, level) -> [tokens, last refill ns, suppressed since last allowed]
+        self.__buckets = {}
+        self.__lock = threading.Lock()
+
+    def set_limit(self, level: str, rate: float, burst: float = None) -> None:
+        if not rate:
+            self.limits.pop(level, None)
+            return
+        self.limits[level] = (float(rate), max(1.0, float(burst or rate)))
+
+    def allow(self, site, level: str, now_ns: int):
+        """
+        Take a token for a record.
+        ARGS:
+            site: Hashable call site, e.g. (filename, line)
+            level: Level name
+            now_ns: Current time in nanoseconds
+        RETURNS:
+            int: Records dropped at this site since the last one allowed, or None if this record must be dropped too
+        """
+        limit = self.limits.get(level)
+        if limit is None:
+            return 0
+        rate, burst = limit
+
+        key = (site, level)
+        with self.__lock:
+            bucket = self.__buckets.get(key)
+            if bucket is None:
+                bucket = self.__buckets[key] = [burst, now_ns, 0]
+            else:
+                # Refill for the time since the last record, up to the burst size
+                bucket[0] = min(burst, bucket[0] + (now_ns - bucket[1]) * rate / 1_000_000_000)
+                bucket[1] = now_ns
+
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return None
+
+            bucket[0] -= 1
+            suppressed, bucket[2] = bucket[2], 0
+        return suppressed
+
+
+class Deduplicator:
+    """
+    Collapse repeats of the same record from the same call site into a "repeated N times" summary.
+    The first record of a run is written and identical ones from that site are counted. The count is
+    written when the site logs something different, once the run has lasted `window` seconds, or on
+    drain(). Runs are tracked per site, so interleaved repeats (a key press logging three lines each
+    time) collapse as well as back-to-back ones.
+    ARGS:
+        levels: Level names whose records are collapsed
+        window: Longest a run may be held back before its summary is written (default: 30)
+    METHODS:
+        check(site, key, now_ns): Decide whether a record is written, and which summaries are due first
+        drain(): Summaries for every run still being counted
+    """
+
+    def __init__(self, levels=(), window: float = 30.0):
+        self.levels = set(levels)
+        self.window_ns = int(max(0.0, float(window)) * 1_000_000_000)
+
+        # site -> [key, repeats not yet reported, run start ns]
+        self.__runs = {}
+        self.__next_sweep = 0
+        self.__lock = threading.Lock()
+
+    def check(self, site, key, now_ns: int):
+        """
+        Account for a record.
+        ARGS:
+            site: Hashable call site, e.g. (filename, line)
+            key: Identity of the record, e.g. (task, level, message)
+            now_ns: Current time in nanoseconds
+        RETURNS:
+            (bool, list): Whether to write the record, and (key, count) summaries to write before it
+        """
+        summaries = []
+        with self.__lock:
+            run = self.__runs.get(site)
+            if run is not None and run[0] == key:
+                write = False
+                run[1] += 1
+                if now_ns - run[2] >= self.window_ns:
+                    # Long run - report it so far and keep collapsing
+                    summaries.append((key, run[1]))
+                    run[1], run[2] = 0, now_ns
+            else:
+                write = True
+                if run is not None and run[1]:
+                    summaries.append((run[0], run[1]))
+                self.__runs[site] = [key, 0, now_ns]
+
+            # Now and then, report runs from sites that have gone quiet and forget idle ones
+            if now_ns >= self.__next_sweep:
+                self.__next_sweep = now_ns + self.window_ns
+                summaries.extend(self.__sweep(now_ns))
+        return write, summaries
+
+    def drain(self) -> list:
+        # Summaries of every run with unreported repeats - the runs themselves carry on
+        with self.__lock:
+            return self.__sweep(None)
+
+    def __sweep(self, now_ns):
+        # Caller holds the lock - now_ns None reports everything pending
+        summaries = []
+        for site, run in list(self.__runs.items()):
+            if now_ns is not None and now_ns - run[2] < self.window_ns:
+                continue
+            if run[1]:
+                summaries.append((run[0], run[1]))
+                run[1] = 0
+                if now_ns is not None:
+                    run[2] = now_ns
+            elif now_ns is not None:
+                del self.__runs[site]
+        return summaries
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+# timestamps.py
+# Author: Luxforge
+# Cached timestamp rendering and hourly partition tracking for the Foundry logger
+
+import os
+import time
+from datetime import datetime, timedelta
+
+
+class TimestampCache:
+    """
+    Render log timestamps without calling strftime on every line.
+    The whole-second part of the format is rendered once per second and only the
+    sub-second digits are appended per call. The date partition (yyyy/yyyy-mm/yyyy-mm-dd)
+    and hourly file tag (YYYYMMDD_HH00) are recomputed only once the next hour starts.
+    ARGS:
+        date_format: strftime format, optionally containing %f (default: "%Y-%m-%d %H:%M:%S.%f")
+        decimal_digits: Number of fractional digits kept from %f (default: 3)
+    METHODS:
+        render(now_ns): Formatted timestamp for a time.time_ns() value
+        partition(now_ns): (date_path, hour_tag) for the hour containing now_ns
+    PROPERTIES:
+        next_rollover_ns: Epoch nanoseconds at which the current hour ends
+    """
+
+    def __init__(self, date_format: str = "%Y-%m-%d %H:%M:%S.%f", decimal_digits: int = 3):
+        self.date_format = date_format
+        self.decimal_digits = max(0, min(6, int(decimal_digits)))
+
+        # Split the format around %f - everything else only changes once per second
+        head, marker, tail = date_format.partition("%f")
+        self.__head_format = head
+        self.__tail_format = tail
+        self.__has_fraction = bool(marker)
+
+        # Per-second cache - (second, head, tail), replaced as a whole so threads never mix two seconds
+        self.__cached = (None, "", "")
+
+        # Per-hour cache - zero forces the first partition() call to compute it
+        self.next_rollover_ns = 0
+        self.date_path = ""
+        self.hour_tag = ""
+
+    def render(self, now_ns: int = None) -> str:
+        """
+        Format a timestamp.
+        ARGS:
+            now_ns: Epoch time in nanoseconds (default: now)
+        RETURNS:
+            str: The timestamp in date_format, trimmed to decimal_digits
+        """
+        if now_ns is None:
+            now_ns = time.time_ns()
+        second, remainder = divmod(now_ns, 1_000_000_000)
+
+        # Re-render the fixed part only when the second changes
+        cached_second, head, tail = self.__cached
+        if second != cached_second:
+            moment = datetime.fromtimestamp(second)
+            head = moment.strftime(self.__head_format)
+            tail = moment.strftime(self.__tail_format) if self.__tail_format else ""
+            self.__cached = (second, head, tail)
+
+        if not self.__has_fraction:
+            return head
+
+        # Append just the sub-second digits
+        digits = f"{remainder // 1000:06d}"[:self.decimal_digits]
+        return f"{head}{digits}{tail}"
+
+    def partition(self, now_ns: int = None) -> tuple:
+        """
+        Get the date partition path and hourly tag, recomputing them only after a rollover.
+        ARGS:
+            now_ns: Epoch time in nanoseconds (default: now)
+        RETURNS:
+            tuple: (date_path, hour_tag) e.g. ("2025/2025-10/2025-10-16", "20251016_1400")
+        """
+        if now_ns is None:
+            now_ns = time.time_ns()
+
+        date_path, hour_tag = self.date_path, self.hour_tag
+        if now_ns >= self.next_rollover_ns:
+            moment = datetime.fromtimestamp(now_ns // 1_000_000_000)
+            date_path = os.path.join(moment.strftime("%Y"), moment.strftime("%Y-%m"), moment.strftime("%Y-%m-%d"))
+            hour_tag = moment.strftime("%Y%m%d_%H00")
+            self.date_path, self.hour_tag = date_path, hour_tag
+
+            # Cache the start of the next hour as the rollover point
+            next_hour = moment.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+            self.next_rollover_ns = int(next_hour.timestamp()) * 1_000_000_000
+
+        # Locals, so a concurrent rollover cannot pair one hour's path with another's tag
+        return date_path, hour_tag
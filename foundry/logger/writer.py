@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+
+# writer.py
+# Author: Luxforge
+# Background queue-based writer so log calls never block on disk
+
+import atexit
+import threading
+import time
+from collections import deque
+
+from foundry.logger.forking import at_fork
+
+
+class AsyncWriter:
+    """
+    Bounded queue drained in batches by a dedicated writer thread.
+    ARGS:
+        sink: Callable receiving a list of queued items - always called on the writer thread
+        max_queue: Maximum number of pending items before the overflow policy applies (default: 10000)
+        overflow: Overflow policy - "block", "drop_oldest" or "drop_new" (default: "block")
+        batch_size: Maximum number of items handed to the sink per call (default: 512)
+        max_latency: Seconds to wait for a batch to fill before handing over what is there (default: 0, never wait)
+        name: Name of the writer thread (default: "foundry-log-writer")
+    METHODS:
+        put(item): Queue an item, applying the overflow policy when full
+        flush(timeout): Block until everything queued so far has reached the sink
+        close(timeout): Drain the queue and stop the writer thread
+    PROPERTIES:
+        dropped: Number of items discarded by the overflow policy or put after close
+        depth: Number of items currently waiting in the queue
+        peak: Deepest the queue has been
+    """
+    POLICIES = ("block", "drop_oldest", "drop_new")
+
+    def __init__(self, sink, max_queue: int = 10000, overflow: str = "block", batch_size: int = 512, max_latency: float = 0, name: str = "foundry-log-writer"):
+
+        # Validate the overflow policy - fall back to blocking so nothing is lost silently
+        overflow = (overflow or "block").lower().replace("-", "_")
+        if overflow not in self.POLICIES:
+            print(f"[FoundryLogger] Unknown overflow policy '{overflow}', defaulting to 'block'")
+            overflow = "block"
+
+        self.sink = sink
+        self.max_queue = max(1, int(max_queue))
+        self.overflow = overflow
+        self.batch_size = max(1, int(batch_size))
+        self.max_latency = max(0.0, float(max_latency))
+        self.dropped = 0
+        self.peak = 0
+
+        # One lock shared by all the conditions so state changes are seen consistently
+        self.__lock = threading.Lock()
+        self.__not_empty = threading.Condition(self.__lock)
+        self.__not_full = threading.Condition(self.__lock)
+        self.__drained = threading.Condition(self.__lock)
+        self.__pending = deque()
+
+        # Counters used by flush() - queued is every accepted item, done is every written or discarded one
+        self.__queued = 0
+        self.__done = 0
+        self.__closed = False
+
+        # Set by flush() to cut a latency wait short
+        self.__urgent = False
+
+        # Start the writer thread - daemon so a hung sink can never keep the process alive
+        self.__thread = threading.Thread(target=self.__run, name=name, daemon=True)
+        self.__thread.start()
+
+        # Drain on a clean interpreter exit
+        atexit.register(self.close)
+
+        # The thread does not survive a fork - the child gets a fresh queue and thread of its own
+        at_fork(after_in_child=self.__after_fork_child)
+
+    @property
+    def depth(self) -> int:
+        # Number of items waiting to be written
+        return len(self.__pending)
+
+    @property
+    def closed(self) -> bool:
+        return self.__closed
+
+    def put(self, item) -> bool:
+        """
+        Queue an item for the writer thread.
+        ARGS:
+            item: Anything the sink understands
+        RETURNS:
+            bool: True if the item was queued, False if it was dropped - check closed to tell a stopped writer from a full one
+        """
+        with self.__lock:
+            if self.__closed:
+                # Too late for this writer - counted, so the loss shows up unless the caller writes it some other way
+                self.dropped += 1
+                return False
+
+            if len(self.__pending) >= self.max_queue:
+
+                # Never block the writer on itself - it would wait forever
+                policy = self.overflow
+                if policy == "block" and threading.current_thread() is self.__thread:
+                    policy = "drop_new"
+
+                if policy == "drop_new":
+                    self.dropped += 1
+                    return False
+                elif policy == "drop_oldest":
+                    self.__pending.popleft()
+                    self.dropped += 1
+                    self.__done += 1
+                else:
+                    while len(self.__pending) >= self.max_queue and not self.__closed:
+                        self.__not_full.wait()
+                    if self.__closed:
+                        self.dropped += 1
+                        return False
+
+            self.__pending.append(item)
+            self.__queued += 1
+            if len(self.__pending) > self.peak:
+                self.peak = len(self.__pending)
+            self.__not_empty.notify()
+        return True
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Wait until everything queued before this call has been handed to the sink.
+        ARGS:
+            timeout: Seconds to wait (default: None, wait forever)
+        RETURNS:
+            bool: True if the queue drained in time
+        """
+        # Calling flush from the sink would deadlock, and everything before it is already in hand
+        if threading.current_thread() is self.__thread:
+            return True
+
+        with self.__lock:
+            target = self.__queued
+            self.__urgent = True
+            self.__not_empty.notify_all()
+            return self.__drained.wait_for(lambda: self.__done >= target or not self.__thread.is_alive(), timeout)
+
+    def close(self, timeout: float = 5.0) -> bool:
+        """
+        Stop accepting items, drain what is queued and stop the writer thread.
+        ARGS:
+            timeout: Seconds to wait for the drain (default: 5)
+        RETURNS:
+            bool: True if the writer stopped cleanly
+        """
+        with self.__lock:
+            if self.__closed:
+                return not self.__thread.is_alive()
+            self.__closed = True
+            self.__not_empty.notify_all()
+            self.__not_full.notify_all()
+
+        # No longer needed at exit
+        atexit.unregister(self.close)
+
+        if threading.current_thread() is not self.__thread:
+            self.__thread.join(timeout)
+        return not self.__thread.is_alive()
+
+    def __after_fork_child(self):
+        # Locks may have been held by threads that no longer exist, and queued items are the parent's to write
+        self.__lock = threading.Lock()
+        self.__not_empty = threading.Condition(self.__lock)
+        self.__not_full = threading.Condition(self.__lock)
+        self.__drained = threading.Condition(self.__lock)
+        self.__pending = deque()
+        self.__queued = self.__done = 0
+        self.__urgent = False
+        if not self.__closed:
+            self.__thread = threading.Thread(target=self.__run, name=self.__thread.name, daemon=True)
+            self.__thread.start()
+
+    def __run(self):
+        # Writer loop - take up to batch_size items at a time and hand them to the sink
+        while True:
+            with self.__lock:
+                while not self.__pending and not self.__closed:
+                    self.__not_empty.wait()
+
+                # Closed and fully drained - exit
+                if not self.__pending:
+                    self.__drained.notify_all()
+                    return
+
+                # Give a partial batch up to max_latency to fill, unless someone is waiting on it
+                if self.max_latency and len(self.__pending) < self.batch_size:
+                    deadline = time.monotonic() + self.max_latency
+                    while len(self.__pending) < self.batch_size and not self.__closed and not self.__urgent:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self.__not_empty.wait(remaining)
+
+                count = min(self.batch_size, len(self.__pending))
+                batch = [self.__pending.popleft() for _ in range(count)]
+
+                # A flush stays urgent until everything queued before it has been taken
+                if not self.__pending:
+                    self.__urgent = False
+                self.__not_full.notify_all()
+
+            # Write outside the lock so producers can keep queueing
+            try:
+                self.sink(batch)
+            except Exception as e:
+                print(f"[FoundryLogger] Writer failed to flush {len(batch)} item(s): {e}")
+
+            with self.__lock:
+                self.__done += len(batch)
+                self.__drained.notify_all()
@@ -112,18 +112,18 @@ class KeyHandler:
         Interpret the raw key input and return a standardized representation.
         PARAM raw_key: The raw key input from get_key()
         """
-        logger.debug(f"Interpreting raw key: {raw_key}")
+        logger.debug("Interpreting raw key: %s", raw_key)
 
         mapping = self.mapping
 
         # Full alphabet mapping - passthrough
         if len(raw_key) == 1 and raw_key.isalpha():
-            logger.debug(f"Alphabetic key detected: {raw_key}")
+            logger.debug("Alphabetic key detected: %s", raw_key)
             return raw_key.upper()
 
         # Digit passthrough
         if len(raw_key) == 1 and raw_key.isdigit():
-            logger.debug(f"Digit key detected: {raw_key}")
+            logger.debug("Digit key detected: %s", raw_key)
             return raw_key
 
         # Return mapped value or the raw key if not found
@@ -131,13 +131,13 @@ class KeyHandler:
 
         # Log if no mapping found
         if mapped_key is None:
-            logger.warning(f"Unrecognized key input: {raw_key}. Returning raw key.")
+            logger.warning("Unrecognized key input: %s. Returning raw key.", raw_key)
             return raw_key
 
         if mapped_key == raw_key:
-            logger.error(f"Seem to be in a loop with key: {raw_key}. Check calls.")
+            logger.error("Seem to be in a loop with key: %s. Check calls.", raw_key)
         else:
-            logger.debug(f"Mapped key: {raw_key} -> {mapped_key}")
+            logger.debug("Mapped key: %s -> %s", raw_key, mapped_key)
         return mapped_key
 
     def __get_windows_key(self):
@@ -149,7 +149,7 @@ class KeyHandler:
         
         first = self.msvcrt.getch()
         if first in {b'\x00', b'\xe0'}:
-            logger.debug(f"Special key prefix detected: {first}. Waiting for second byte...")
+            logger.debug("Special key prefix detected: %s. Waiting for second byte...", first)
             second = self.msvcrt.getch()
             # Set a break if in debug mode
             if logger.debug:
@@ -160,7 +160,7 @@ class KeyHandler:
             if logger.debug:
                 pass
                 # input(f"DEBUG -- Regular key detected: {first}. Press Enter to continue...")
-            logger.debug(f"Regular key detected: {first}. ")
+            logger.debug("Regular key detected: %s. ", first)
             
             # Append to typed buffer if alphanumeric - need to keep ENTER, BACKSPACE, etc out
             if first.decode(errors='ignore').isalnum():
@@ -67,11 +67,18 @@ class Menu(ABC):
         # Set the main variables used by all subclasses
         self.selected_option = selected_option
 
+        # Tag this menu's records with its own task - routed to its own files without switching the global task
+        task = self.MENU_META.get("name", "Menu").strip().replace(" ", "_").lower()
+        self.log_context = logger.task_context(task)
+
+        with self.log_context:
+            self.__setup(task, selected_option, previous_menu)
+
+    def __setup(self, task: str, selected_option: str = None, previous_menu = None):
+        # Build the options and key handler - runs inside the menu's task context
         from pathlib import Path
         import sys
 
-       # Switch the logger to this menu's name
-        task = logger.task(self.MENU_META.get("name", "Menu").strip().replace(" ", "_").lower())
         logger.info(f"Initializing menu: {task}")
         logger.debug(f"Menu description: {self.MENU_META.get('desc', 'A nice menu description')}")
         logger.debug(f"[🧬] Loader running from: {self.__class__.__module__}")
@@ -133,13 +140,14 @@ class Menu(ABC):
         PARAM: selected_option - Option to launch directly, if None, show menu
         """
 
-        # Begin the menu loop
-        while True:
-            # If we have a selected option, validate and launch it
-            if selected_option:
-                self.__handle_option(selected_option)
-            else:
-                self.__show_menu()
+        # Begin the menu loop - everything logged from here is tagged with this menu's task
+        with self.log_context:
+            while True:
+                # If we have a selected option, validate and launch it
+                if selected_option:
+                    self.__handle_option(selected_option)
+                else:
+                    self.__show_menu()
 
     def _set_options(self):
         """
@@ -223,7 +231,7 @@ class Menu(ABC):
         all_options = self.valid_options_as_list + self.exit_options
 
         # Validate user input against a list of valid options
-        logger.debug(f"Validating user input: {choice} against options: {all_options}")
+        logger.debug("Validating user input: %s against options: %s", choice, all_options)
 
         if choice not in all_options:
             self.__print(f"[!] Invalid input: {choice}. Please choose from: ({self.valid_options_as_str}) to proceed or ({self.exit_options_as_str}) to exit.", "red")
@@ -236,7 +244,7 @@ class Menu(ABC):
             sys.exit(0)
 
         # Return the value if valid
-        logger.debug(f"User input '{choice}' is valid.")
+        logger.debug("User input '%s' is valid.", choice)
         
         # Pause only when in debug mode to allow for faster navigation in normal use
         if logger.level == 10: # DEBUG
@@ -523,10 +531,10 @@ class Menu(ABC):
             self.__boxify_top_bottom(title=False, top=False) # Bottom border
 
             # Handle key
-            logger.d(f"Selected option: {keys[selected]}. Waiting for keypress...")
+            logger.d("Selected option: %s. Waiting for keypress...", keys[selected])
             
             action = self.key_handler.get_key()
-            logger.i(f"Key action: {action}")
+            logger.i("Key action: %s", action)
             
             # Hang the screen for debugging
             if logger.debug:
@@ -668,18 +676,18 @@ class Menu(ABC):
     def __load_menu_meta(self,mod_path):
         try:
             mod = importlib.import_module(mod_path)
-            logger.debug(f"Loaded module: {mod_path}")
-            logger.debug(f"Module attributes: {dir(mod)}")
+            logger.debug("Loaded module: %s", mod_path)
+            logger.debug(lambda: f"Module attributes: {dir(mod)}")
 
             for attr_name in dir(mod):
                 attr = getattr(mod, attr_name)
                 if isinstance(attr, type) and hasattr(attr, "MENU_META"):
                     meta = getattr(attr, "MENU_META")
-                    logger.debug(f"Found MENU_META in class: {attr_name} → {meta}")
+                    logger.debug("Found MENU_META in class: %s → %s", attr_name, meta)
                     if isinstance(meta, dict):
                         # Skip this super class
                         if meta.get("name") == "MenuName":
-                            logger.debug(f"Skipping base Menu class in {mod_path}")
+                            logger.debug("Skipping base Menu class in %s", mod_path)
                             continue
                         return [{
                             "name": meta.get("name"),
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+# concurrent_writes.py
+# Author: Luxforge
+# Stress test for LOG_CONCURRENT - several processes appending to one task file, then every record checked
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+from time import time_ns
+
+# Short records and ones longer than a pipe buffer - all of them go through the file lock
+SIZES = (40, 300, 3000, 9000)
+
+TASK = "concurrent_writes"
+
+
+def run(processes: int = 8, records: int = 2000, log_dir: str = None, max_size_mb: float = 1) -> bool:
+    """
+    Fork workers that all log to one task file through a shared-mode Logger, then check that every record
+    is in the files exactly once and intact. Small rotation limits make the workers rotate under each other too.
+    ARGS:
+        processes: Worker processes (default: 8)
+        records: Records per worker (default: 2000)
+        log_dir: Where the files go (default: a temporary directory, removed afterwards)
+        max_size_mb: MAX_LOG_SIZE_MB for the run (default: 1)
+    RETURNS:
+        bool: True if nothing was missing, duplicated or torn
+    """
+    try:
+        context = multiprocessing.get_context("fork")
+    except ValueError:
+        print("Concurrent write test needs fork - not available on this platform")
+        return False
+
+    temporary = log_dir is None
+    log_dir = log_dir or tempfile.mkdtemp(prefix="foundry-concurrent-")
+
+    # Shared handles, no console, every level on, no throttling, and keep every rotated file for checking
+    os.environ.update({
+        "LOG_DIR": log_dir,
+        "LOG_CONCURRENT": "true",
+        "LOG_TO_CONSOLE": "false",
+        "LOGLEVEL": "DEBUG",
+        "LOG_RATE_LIMIT": "off",
+        "LOG_DEDUPLICATE": "off",
+        "MAX_LOG_SIZE_MB": str(max_size_mb),
+        "MAX_LOG_BACKUP_COUNT": "100000",
+    })
+    from foundry.logger.logger import Logger
+    from foundry.logger.query import parse_line
+
+    # No env file - the settings above are the whole configuration
+    logger = Logger(env_path=os.path.join(log_dir, "none.env"))
+    logger.task(TASK)
+    task_dir = logger.log_dir
+
+    # Records from earlier runs into the same directory share the files - only this run's are checked
+    tag = f"concurrent {os.getpid()}-{time_ns()} "
+
+    def worker(number):
+        for record in range(records):
+            logger.d("%s%d %d %s", tag, number, record, "x" * SIZES[record % len(SIZES)])
+        logger.close()
+
+    try:
+        workers = [context.Process(target=worker, args=(n,)) for n in range(processes)]
+        for process in workers:
+            process.start()
+        for process in workers:
+            process.join()
+
+        # Every line must be a whole record and every record must be there exactly once
+        seen, torn = set(), 0
+        for name in os.listdir(task_dir):
+            if not name.startswith(f"{TASK}_") or name.endswith(".idx"):
+                continue
+            with open(os.path.join(task_dir, name), encoding="utf-8") as f:
+                for line in f:
+                    record = parse_line(line.rstrip("\n"))
+                    message = (record or {}).get("message", "")
+                    if not message.startswith(tag):
+                        torn += record is None
+                        continue
+                    number, index, padding = message[len(tag):].split(" ")[:3]
+                    if len(padding) != SIZES[int(index) % len(SIZES)] or (number, index) in seen:
+                        torn += 1
+                    seen.add((number, index))
+    finally:
+        logger.close()
+        if temporary:
+            shutil.rmtree(log_dir, ignore_errors=True)
+
+    missing = processes * records - len(seen)
+    passed = not missing and not torn
+    print(f"Concurrent write test: {processes} processes x {records} records, {missing} missing, {torn} torn - {'passed' if passed else 'FAILED'}")
+    return passed
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Stress shared-file logging from several processes and verify every record.")
+    parser.add_argument("--processes", type=int, default=8, help="Worker processes (default: 8)")
+    parser.add_argument("--records", type=int, default=2000, help="Records per worker (default: 2000)")
+    parser.add_argument("--dir", help="Log directory to use and keep (default: a temporary one)")
+    parser.add_argument("--max-size-mb", type=float, default=1, help="MAX_LOG_SIZE_MB for the run (default: 1)")
+    args = parser.parse_args(argv)
+    return 0 if run(args.processes, args.records, args.dir, args.max_size_mb) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())